@@ -0,0 +1,135 @@
+"""
+Modo batch do LMTagScript: muitos arquivos em um único processo de CLI
+
+Expande diretórios, globs e listas de arquivos e parseia os scripts em um
+ProcessPoolExecutor, pagando a inicialização do Python uma única vez. Cada
+arquivo gera uma saída JSON própria (--output-dir) ou uma linha de um stream
+NDJSON combinado. Uma falha em um arquivo é registrada e o batch continua.
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from cache import ParseCache
+from tagscript_parser import parse_tagscript
+
+TAG_EXTENSION = '.tag'
+_GLOB_CHARS = '*?['
+
+# Cache do processo worker, criado no primeiro arquivo
+_worker_cache = None
+
+
+def collect_inputs(patterns: Iterable[str], files_from: Optional[str] = None) -> List[str]:
+    """Expande diretórios (recursivamente, *.tag), globs e uma lista de arquivos.
+
+    files_from é um arquivo com um caminho por linha ('-' para stdin). O
+    resultado é ordenado e sem repetições.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                paths.extend(os.path.join(root, name) for name in names if name.endswith(TAG_EXTENSION))
+        elif any(char in pattern for char in _GLOB_CHARS):
+            paths.extend(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        else:
+            paths.append(pattern)
+
+    if files_from:
+        if files_from == '-':
+            listing = sys.stdin.read()
+        else:
+            with open(files_from, 'r', encoding='utf-8') as f:
+                listing = f.read()
+        paths.extend(line.strip() for line in listing.splitlines() if line.strip())
+
+    return sorted(set(os.path.normpath(path) for path in paths))
+
+
+def output_paths(paths: List[str], output_dir: str) -> List[str]:
+    """Caminho do JSON de cada entrada, espelhando a estrutura sob output_dir"""
+    if not paths:
+        return []
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    return [
+        os.path.join(output_dir, os.path.splitext(os.path.relpath(os.path.abspath(path), base))[0] + '.json')
+        for path in paths
+    ]
+
+
+def parse_file(task: Tuple[str, Optional[str]], encoding: str = 'utf-8',
+               cache_dir: Optional[str] = None, pretty: bool = False) -> Dict[str, Any]:
+    """Parseia um arquivo no worker.
+
+    task é (entrada, saída). Com saída, o JSON é gravado pelo próprio worker e
+    apenas o status volta ao processo principal; sem saída, o resultado volta
+    para o stream NDJSON.
+    """
+    global _worker_cache
+    path, output_path = task
+    try:
+        with open(path, 'r', encoding=encoding) as f:
+            content = f.read()
+        if cache_dir is not None and _worker_cache is None:
+            _worker_cache = ParseCache(cache_dir)
+        result = parse_tagscript(content, cache=_worker_cache if cache_dir is not None else None)
+
+        if output_path is None:
+            return {'file': path, 'ok': True, 'result': result}
+
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'w', encoding=encoding) as f:
+            json.dump(result, f, ensure_ascii=False, indent=2 if pretty else None)
+        return {'file': path, 'ok': True, 'output': output_path}
+    except Exception as e:
+        return {'file': path, 'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+
+def iter_batch(paths: List[str], output_dir: Optional[str] = None, workers: Optional[int] = None,
+               chunksize: Optional[int] = None, encoding: str = 'utf-8',
+               cache_dir: Optional[str] = None, pretty: bool = False) -> Iterator[Dict[str, Any]]:
+    """Parseia os arquivos em paralelo e gera um registro por arquivo, na ordem de paths.
+
+    workers=None usa todos os núcleos; workers=1 roda no próprio processo.
+    chunksize=None distribui cerca de quatro lotes por worker.
+    """
+    outputs = output_paths(paths, output_dir) if output_dir else [None] * len(paths)
+    tasks = list(zip(paths, outputs))
+    worker = partial(parse_file, encoding=encoding, cache_dir=cache_dir, pretty=pretty)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        yield from map(worker, tasks)
+        return
+
+    if chunksize is None:
+        chunksize = max(1, min(64, len(tasks) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        yield from executor.map(worker, tasks, chunksize=chunksize)
+
+
+def run_batch(paths: List[str], out: Optional[TextIO] = None, **options) -> Dict[str, Any]:
+    """Executa o batch, escrevendo os registros em NDJSON em out (se houver).
+
+    Retorna um resumo com totais, falhas por arquivo e tempo decorrido.
+    """
+    started = time.perf_counter()
+    summary = {'total': len(paths), 'ok': 0, 'failed': 0, 'failures': []}
+    for record in iter_batch(paths, **options):
+        if record['ok']:
+            summary['ok'] += 1
+        else:
+            summary['failed'] += 1
+            summary['failures'].append((record['file'], record['error']))
+        if out is not None:
+            out.write(json.dumps(record, ensure_ascii=False))
+            out.write('\n')
+    summary['seconds'] = time.perf_counter() - started
+    return summary
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória da internação de identificadores e chaves
+
+Simula um worker de vida longa que mantém muitos workflows parseados:
+parseia scripts sintéticos (benchmarks/generator.py, sementes distintas) com
+parse_ast() e mede, com tracemalloc, a memória retida pelo conjunto sem
+internação e com um InternTable compartilhado (incluindo a própria tabela).
+Mostra também o tempo de parse e as estatísticas da tabela.
+
+Uso:
+  python benchmarks/bench_interning.py
+  python benchmarks/bench_interning.py --scripts 500 --params 20
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Adicionar o diretório do interpretador ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_nodes import retained_bytes
+from generator import generate_script
+from interning import InternTable
+from tagscript_parser import parse_ast
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark de memória da internação de identificadores')
+    parser.add_argument('--scripts', type=int, default=200, help='Workflows mantidos (padrão: 200)')
+    parser.add_argument('--statements', type=int, default=500,
+                        help='Statements por workflow (padrão: 500)')
+    parser.add_argument('--params', type=int, default=5,
+                        help='Chaves por bloco de parâmetros (padrão: 5)')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    scripts = [generate_script(args.statements, params=args.params, seed=seed) for seed in range(args.scripts)]
+
+    print(f"{'modo':<12} {'retido (MiB)':>13} {'parse (s)':>10}")
+    print('-' * 37)
+    retained = {}
+    for name in ('sem tabela', 'InternTable'):
+        def build():
+            table = InternTable() if name == 'InternTable' else None
+            return table, [parse_ast(script, interning=table) for script in scripts]
+
+        retained[name] = retained_bytes(build)
+        start = time.perf_counter()
+        table, _ = build()
+        seconds = time.perf_counter() - start
+        print(f"{name:<12} {retained[name] / 1024 / 1024:>13.1f} {seconds:>10.2f}")
+
+    stats = table.stats()
+    print(f"\n{stats['unique']} textos únicos para {stats['total']} vistos "
+          f"({stats['hit_rate']:.0%} reaproveitados)")
+    print(f"InternTable retém {1 - retained['InternTable'] / retained['sem tabela']:.0%} menos memória")
+
+
+if __name__ == "__main__":
+    main()
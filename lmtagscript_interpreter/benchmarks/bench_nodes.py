@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória dos nós da AST (__slots__) contra os dicts
+
+Mede, para um script sintético (benchmarks/generator.py):
+  - por tipo de nó: tamanho médio do objeto (sys.getsizeof) do nó com
+    __slots__ e do dict equivalente, sem contar os dados compartilhados
+    (parâmetros, payloads, condições)
+  - memória retida pelo resultado completo de parse_ast() e de
+    parse_tagscript() (tracemalloc)
+
+Uso:
+  python benchmarks/bench_nodes.py
+  python benchmarks/bench_nodes.py --statements 50000
+"""
+
+import argparse
+import gc
+import logging
+import os
+import sys
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+# Adicionar o diretório do interpretador ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from generator import generate_script
+from tagscript_parser import parse_ast, parse_tagscript
+from nodes import Node
+
+
+def retained_bytes(build: Callable[[], Any]) -> int:
+    """Memória ainda alocada pelo objeto construído, após coletar o lixo"""
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return current
+
+
+def node_sizes(result: Dict[str, Any]) -> Dict[str, list]:
+    """Soma dos tamanhos por tipo: [quantidade, bytes do nó, bytes do dict]"""
+    sizes = defaultdict(lambda: [0, 0, 0])
+    for value in result.values():
+        items = value if isinstance(value, list) else [value]
+        for item in items:
+            if isinstance(item, Node):
+                entry = sizes[type(item).__name__]
+                entry[0] += 1
+                entry[1] += sys.getsizeof(item)
+                entry[2] += sys.getsizeof(item.to_dict())
+    return sizes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark de memória dos nós da AST')
+    parser.add_argument('--statements', type=int, default=20000,
+                        help='Statements do script sintético (padrão: 20000)')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    script = generate_script(args.statements)
+
+    print(f"{'nó':<14} {'quantidade':>10} {'slots (B)':>10} {'dict (B)':>10} {'economia':>9}")
+    print('-' * 58)
+    for name, (count, slots, plain) in sorted(node_sizes(parse_ast(script)).items()):
+        print(f"{name:<14} {count:>10} {slots / count:>10.0f} {plain / count:>10.0f} "
+              f"{1 - slots / plain:>8.0%}")
+
+    as_nodes = retained_bytes(lambda: parse_ast(script))
+    as_dicts = retained_bytes(lambda: parse_tagscript(script))
+    print(f"\nResultado completo ({args.statements} statements, incluindo parâmetros e TAGs):")
+    print(f"  parse_tagscript (dicts): {as_dicts / 1024:>10.0f} KiB")
+    print(f"  parse_ast (nós):         {as_nodes / 1024:>10.0f} KiB  ({1 - as_nodes / as_dicts:.0%} menos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Suíte de benchmarks do parser com baseline e gate de regressão
+
+Para cada workload sintético (benchmarks/generator.py) mede:
+  - vazão de parse_tagscript em linhas/s e statements/s (melhor de N execuções)
+  - pico de memória alocada durante o parsing (tracemalloc)
+  - vazão e pico de memória de validate_tagscript, e o ganho sobre o parse
+  - tempo, chamadas e pico de memória de cada handler _parse_* do parser
+
+Os resultados podem ser gravados em um baseline JSON (--save) e comparados
+com um baseline anterior (--compare): o processo sai com código 1 quando a
+vazão cai ou o pico de memória cresce além do limite (--threshold), ou
+quando a validação deixa de ser mais rápida que o parse completo.
+
+Uso:
+  python benchmarks/bench_parser.py --save baseline.json
+  python benchmarks/bench_parser.py --compare baseline.json --threshold 0.10
+  python benchmarks/bench_parser.py --statements 20000 --handlers
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+# Adicionar o diretório do interpretador ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from generator import generate_script
+from tagscript_parser import TagScriptParser, parse_tagscript, validate_tagscript
+
+BASELINE_FORMAT = 1
+
+# Workloads: nome -> parâmetros de generate_script (além de statements)
+WORKLOADS = {
+    'misto': {},
+    'referencias': {'mix': {'ref': 3, 'api': 1}, 'params': 20, 'depth': 3},
+    'condicionais': {'mix': {'if': 3, 'for': 1, 'tag': 1}, 'depth': 4},
+    'chamadas': {'mix': {'call': 3, 'tag': 1}},
+    'definicoes': {'mix': {'function': 1, 'class': 1}, 'params': 10},
+}
+
+
+def _instrument(parser: TagScriptParser, measure: Callable[[Callable, tuple], Any],
+                stats: Dict[str, Dict[str, float]]) -> None:
+    """Substitui os handlers do parser por versões que acumulam estatísticas"""
+    for token_type, handler in list(parser._handlers.items()):
+        entry = stats.setdefault(handler.__name__, {'calls': 0, 'total_ms': 0.0, 'peak_kib': 0.0})
+
+        def wrapped(*args, _handler=handler, _entry=entry):
+            _entry['calls'] += 1
+            return measure(_handler, args, _entry)
+
+        parser._handlers[token_type] = wrapped
+
+
+def _timed(handler: Callable, args: tuple, entry: Dict[str, float]) -> Any:
+    started = time.perf_counter()
+    try:
+        return handler(*args)
+    finally:
+        entry['total_ms'] += (time.perf_counter() - started) * 1000
+
+
+def _traced(handler: Callable, args: tuple, entry: Dict[str, float]) -> Any:
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    try:
+        return handler(*args)
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        entry['peak_kib'] = max(entry['peak_kib'], (peak - current) / 1024)
+
+
+def _best_time(function: Callable[[str], Any], text: str, repeat: int, min_time: float) -> float:
+    """Melhor tempo de pelo menos repeat execuções, repetindo até somar min_time segundos"""
+    # Como no timeit, o coletor de lixo fica desligado durante a medição
+    best = float('inf')
+    gc.collect()
+    gc.disable()
+    try:
+        runs = elapsed = 0
+        while runs < repeat or elapsed < min_time:
+            started = time.perf_counter()
+            function(text)
+            duration = time.perf_counter() - started
+            best = min(best, duration)
+            elapsed += duration
+            runs += 1
+    finally:
+        gc.enable()
+    return best
+
+
+def _peak_memory(function: Callable[[str], Any], text: str) -> int:
+    """Pico de memória alocada (tracemalloc) durante uma execução"""
+    tracemalloc.start()
+    function(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def measure_workload(text: str, statements: int, repeat: int, min_time: float = 1.0) -> Dict[str, Any]:
+    """Mede vazão, pico de memória e custo por handler de um script.
+
+    A vazão usa a melhor de pelo menos repeat execuções, repetindo até somar
+    min_time segundos, o que reduz o ruído de máquinas compartilhadas.
+    """
+    lines = text.count('\n') + 1
+
+    best = _best_time(parse_tagscript, text, repeat, min_time)
+    peak = _peak_memory(parse_tagscript, text)
+    validate_best = _best_time(validate_tagscript, text, repeat, min_time)
+    validate_peak = _peak_memory(validate_tagscript, text)
+
+    handlers = {}
+    parser = TagScriptParser()
+    _instrument(parser, _timed, handlers)
+    parser.parse(text)
+
+    tracemalloc.start()
+    parser = TagScriptParser()
+    _instrument(parser, _traced, handlers)
+    parser.parse(text)
+    tracemalloc.stop()
+
+    for entry in handlers.values():
+        # As chamadas foram contadas nas duas passagens
+        entry['calls'] //= 2
+        entry['us_per_call'] = entry['total_ms'] * 1000 / entry['calls'] if entry['calls'] else 0.0
+
+    return {
+        'lines': lines,
+        'statements': statements,
+        'bytes': len(text.encode('utf-8')),
+        'seconds': best,
+        'lines_per_sec': lines / best,
+        'statements_per_sec': statements / best,
+        'peak_kib': peak / 1024,
+        'validate_lines_per_sec': lines / validate_best,
+        'validate_peak_kib': validate_peak / 1024,
+        'validate_speedup': best / validate_best,
+        'handlers': {name: entry for name, entry in sorted(handlers.items()) if entry['calls']},
+    }
+
+
+def run_suite(statements: int, repeat: int, names: List[str], min_time: float = 1.0) -> Dict[str, Any]:
+    cases = {}
+    for name in names:
+        text = generate_script(statements, **WORKLOADS[name])
+        cases[name] = measure_workload(text, statements, repeat, min_time)
+    return {
+        'format': BASELINE_FORMAT,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'statements': statements,
+        'cases': cases,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressões de current em relação a baseline além do limite relativo
+
+    Validar que não é mais rápido que o parse completo também é regressão,
+    mesmo sem baseline para o caso.
+    """
+    regressions = []
+    for name, case in current['cases'].items():
+        if 'validate_speedup' in case and case['validate_speedup'] <= 1.0:
+            regressions.append(f"{name}: validação {case['validate_speedup']:.2f}x o parse completo "
+                               f"({case['validate_lines_per_sec']:.0f} linhas/s)")
+        previous = baseline.get('cases', {}).get(name)
+        if previous is None:
+            continue
+        if case['lines_per_sec'] < previous['lines_per_sec'] * (1 - threshold):
+            change = case['lines_per_sec'] / previous['lines_per_sec'] - 1
+            regressions.append(f"{name}: vazão {change:+.1%} "
+                               f"({previous['lines_per_sec']:.0f} -> {case['lines_per_sec']:.0f} linhas/s)")
+        if case['peak_kib'] > previous['peak_kib'] * (1 + threshold):
+            change = case['peak_kib'] / previous['peak_kib'] - 1
+            regressions.append(f"{name}: memória {change:+.1%} "
+                               f"({previous['peak_kib']:.0f} -> {case['peak_kib']:.0f} KiB)")
+        # Baselines anteriores à validação não têm a vazão de validate_tagscript
+        if 'validate_lines_per_sec' in case and 'validate_lines_per_sec' in previous \
+                and case['validate_lines_per_sec'] < previous['validate_lines_per_sec'] * (1 - threshold):
+            change = case['validate_lines_per_sec'] / previous['validate_lines_per_sec'] - 1
+            regressions.append(f"{name}: vazão da validação {change:+.1%} "
+                               f"({previous['validate_lines_per_sec']:.0f} -> "
+                               f"{case['validate_lines_per_sec']:.0f} linhas/s)")
+    return regressions
+
+
+def print_report(report: Dict[str, Any], baseline: Dict[str, Any] = None, handlers: bool = False) -> None:
+    print(f"{'caso':<14} {'linhas':>8} {'linhas/s':>12} {'stmts/s':>11} {'pico KiB':>10} {'vs base':>8}"
+          f" {'validar/s':>12} {'pico KiB':>10} {'ganho':>7}")
+    print('-' * 100)
+    for name, case in report['cases'].items():
+        previous = (baseline or {}).get('cases', {}).get(name)
+        delta = f"{case['lines_per_sec'] / previous['lines_per_sec'] - 1:+.1%}" if previous else '-'
+        print(f"{name:<14} {case['lines']:>8} {case['lines_per_sec']:>12.0f} "
+              f"{case['statements_per_sec']:>11.0f} {case['peak_kib']:>10.0f} {delta:>8} "
+              f"{case['validate_lines_per_sec']:>12.0f} {case['validate_peak_kib']:>10.0f} "
+              f"{case['validate_speedup']:>6.2f}x")
+
+    if handlers:
+        for name, case in report['cases'].items():
+            print(f"\n{name}: handlers")
+            print(f"  {'handler':<34} {'chamadas':>9} {'total ms':>10} {'µs/chamada':>11} {'pico KiB':>9}")
+            for handler, entry in sorted(case['handlers'].items(), key=lambda item: -item[1]['total_ms']):
+                print(f"  {handler:<34} {entry['calls']:>9} {entry['total_ms']:>10.2f} "
+                      f"{entry['us_per_call']:>11.2f} {entry['peak_kib']:>9.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Suíte de benchmarks do parser LMTagScript')
+    parser.add_argument('--statements', type=int, default=5000,
+                        help='Statements por workload (padrão: 5000)')
+    parser.add_argument('--repeat', type=int, default=7,
+                        help='Execuções por medição de vazão (padrão: 7)')
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help='Tempo mínimo de medição por workload, em segundos (padrão: 1.0)')
+    parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS), default=list(WORKLOADS),
+                        help='Workloads a executar (padrão: todos)')
+    parser.add_argument('--save', type=str, default=None,
+                        help='Grava os resultados em um baseline JSON')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Compara com um baseline JSON e falha em caso de regressão')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Regressão relativa tolerada (padrão: 0.10 = 10%%)')
+    parser.add_argument('--handlers', action='store_true',
+                        help='Mostra o custo de cada handler _parse_*')
+    args = parser.parse_args()
+
+    # Os avisos de linhas inválidas não fazem parte da medição
+    logging.disable(logging.WARNING)
+
+    report = run_suite(args.statements, args.repeat, args.workloads, args.min_time)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline, args.handlers)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline gravado em {args.save}")
+
+    if baseline is not None:
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n❌ Regressões acima de {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"   • {regression}")
+            sys.exit(1)
+        print(f"\n✅ Sem regressões acima de {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória do modo spans do parser
+
+Simula um serviço que mantém um conjunto de workflows parseados em memória:
+gera scripts sintéticos (benchmarks/generator.py) até o tamanho pedido e
+mede, com tracemalloc, a memória retida pelos resultados de
+parse_ast(conteudo) e de parse_ast(conteudo, spans=True).
+
+O conteúdo de cada script é decodificado dentro da medição: sem spans ele é
+descartado depois do parse; com spans fica retido uma vez no SourceBuffer e
+entra na conta (o resumo mostra também o ganho sem ele, para serviços que já
+mantêm o conteúdo). Também mede o tempo de parse e o de to_plain() (que
+materializa os trechos) nos dois modos.
+
+Uso:
+  python benchmarks/bench_spans.py
+  python benchmarks/bench_spans.py --megabytes 100
+  python benchmarks/bench_spans.py --params 20
+"""
+
+import argparse
+import gc
+import logging
+import os
+import sys
+import time
+from typing import List
+
+# Adicionar o diretório do interpretador ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_nodes import retained_bytes
+from generator import generate_script
+from nodes import to_plain
+from tagscript_parser import parse_ast
+
+
+def workflow_set(megabytes: float, statements: int, params: int) -> List[bytes]:
+    """Scripts de `statements` statements (sementes distintas) somando ao menos `megabytes` MB"""
+    scripts, total, seed = [], 0, 0
+    while total < megabytes * 1024 * 1024:
+        script = generate_script(statements, params=params, seed=seed).encode('utf-8')
+        scripts.append(script)
+        total += len(script)
+        seed += 1
+    return scripts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark de memória do modo spans do parser')
+    parser.add_argument('--megabytes', type=float, default=20,
+                        help='Tamanho total do conjunto de workflows em MB (padrão: 20)')
+    parser.add_argument('--statements', type=int, default=2000,
+                        help='Statements por script (padrão: 2000)')
+    parser.add_argument('--params', type=int, default=5,
+                        help='Chaves por bloco de parâmetros (padrão: 5)')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    scripts = workflow_set(args.megabytes, args.statements, args.params)
+    size = sum(map(len, scripts))
+    print(f"{len(scripts)} scripts, {size / 1024 / 1024:.1f} MB\n")
+
+    print(f"{'modo':<10} {'retido (MiB)':>13} {'parse (s)':>10} {'to_plain (s)':>13}")
+    print('-' * 49)
+    retained = {}
+    for spans in (False, True):
+        name = 'spans' if spans else 'cópias'
+        retained[spans] = retained_bytes(lambda: [parse_ast(script.decode('utf-8'), spans=spans)
+                                                  for script in scripts])
+        gc.collect()
+        start = time.perf_counter()
+        results = [parse_ast(script.decode('utf-8'), spans=spans) for script in scripts]
+        parse_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for result in results:
+            to_plain(result)
+        plain_seconds = time.perf_counter() - start
+        del results
+        print(f"{name:<10} {retained[spans] / 1024 / 1024:>13.1f} {parse_seconds:>10.2f} {plain_seconds:>13.2f}")
+
+    # O conteúdo decodificado (str) retido pelos SourceBuffers
+    source = sum(sys.getsizeof(script.decode('utf-8')) for script in scripts)
+    print(f"\nspans=True retém {1 - retained[True] / retained[False]:.0%} menos memória, "
+          f"incluindo o conteúdo ({source / 1024 / 1024:.1f} MiB);")
+    print(f"{1 - (retained[True] - source) / retained[False]:.0%} menos quando o serviço já "
+          f"mantém o conteúdo de qualquer forma")
+
+
+if __name__ == "__main__":
+    main()
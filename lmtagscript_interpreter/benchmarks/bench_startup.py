@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark de cold start: import do parser e latência do primeiro parse
+
+Cada medição roda em um processo Python novo, como um handler serverless:
+  - import: tempo cumulativo do módulo segundo `python -X importtime`, e os
+    módulos mais caros que ele puxa
+  - primeiro parse: tempo de parse_tagscript logo após o import, com os
+    handlers, regexes e caches ainda frios
+
+O bytecode é compilado antes (compileall), como em uma imagem de produção.
+Resultados podem ser gravados (--save) e comparados com um baseline anterior
+(--compare): o processo sai com código 1 quando algum tempo cresce além do
+limite (--threshold).
+
+Uso:
+  python benchmarks/bench_startup.py
+  python benchmarks/bench_startup.py --module main --runs 20
+  python benchmarks/bench_startup.py --save startup.json
+  python benchmarks/bench_startup.py --compare startup.json --threshold 0.15
+"""
+
+import argparse
+import compileall
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
+
+INTERPRETER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASELINE_FORMAT = 1
+
+# Script pequeno e representativo, com uma construção de cada tipo
+FIRST_PARSE_SCRIPT = '\n'.join([
+    'TASK: Analisar vendas',
+    'ACTION: Consultar base',
+    'GOAL: Relatório',
+    '@db:vendas { limit: 10, filtros: { regiao: "sul" } }',
+    'CALL API relatorios.gerar WITH { formato: "pdf" }',
+    'IF total > 100 THEN',
+    '  notificar',
+    'ELSE',
+    '  arquivar',
+    'END',
+    'FOR EACH item IN itens DO',
+    'LOOPGUARD: max_iterations=10',
+    'CALL processar(item)',
+])
+
+_FIRST_PARSE_PROGRAM = """
+import json, sys, time
+started = time.perf_counter()
+import {module} as parser_module
+imported = time.perf_counter()
+parser_module.parse_tagscript({script!r})
+parsed = time.perf_counter()
+sys.stdout.write(json.dumps({{'import_ms': (imported - started) * 1000,
+                              'first_parse_ms': (parsed - imported) * 1000}}))
+"""
+
+
+def _environment() -> Dict[str, str]:
+    env = dict(os.environ)
+    # Os .pyc já foram gerados por compileall; não importa se podem ser gravados
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env['PYTHONPATH'] = INTERPRETER_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def measure_importtime(module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """Tempo cumulativo do import (ms) e os módulos de maior tempo cumulativo"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               capture_output=True, text=True, env=_environment(),
+                               cwd=INTERPRETER_DIR, check=True)
+    modules = []
+    total = None
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        try:
+            microseconds = int(cumulative)
+        except ValueError:
+            # Linha de cabeçalho
+            continue
+        # Filhos aparecem antes do pai; um import de nível superior que não é
+        # o módulo medido (site, encodings) fecha a árvore anterior
+        nested = name.startswith('  ')
+        if nested:
+            modules.append((name.strip(), microseconds / 1000))
+        elif name.strip() == module:
+            total = microseconds / 1000
+            break
+        else:
+            modules = []
+    if total is None:
+        raise RuntimeError(f"O módulo {module} não apareceu na saída de -X importtime")
+    return total, modules
+
+
+def measure_first_parse(module: str) -> Dict[str, float]:
+    """Import e primeiro parse medidos dentro de um processo novo"""
+    program = _FIRST_PARSE_PROGRAM.format(module=module, script=FIRST_PARSE_SCRIPT)
+    completed = subprocess.run([sys.executable, '-c', program], capture_output=True, text=True,
+                               env=_environment(), cwd=INTERPRETER_DIR, check=True)
+    return json.loads(completed.stdout)
+
+
+def run_startup(module: str, runs: int, top: int = 8) -> Dict[str, Any]:
+    """Medianas de runs processos novos para cada métrica"""
+    compileall.compile_dir(INTERPRETER_DIR, maxlevels=0, quiet=1)
+
+    importtimes = []
+    slowest = {}
+    for _ in range(runs):
+        total, modules = measure_importtime(module)
+        importtimes.append(total)
+        for name, milliseconds in modules:
+            slowest.setdefault(name, []).append(milliseconds)
+
+    first_parse = [measure_first_parse(module) for _ in range(runs)]
+    return {
+        'format': BASELINE_FORMAT,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'module': module,
+        'runs': runs,
+        'importtime_ms': statistics.median(importtimes),
+        'import_ms': statistics.median(entry['import_ms'] for entry in first_parse),
+        'first_parse_ms': statistics.median(entry['first_parse_ms'] for entry in first_parse),
+        'slowest_imports': sorted(((name, statistics.median(values)) for name, values in slowest.items()),
+                                  key=lambda item: -item[1])[:top],
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Métricas de current que cresceram além do limite relativo"""
+    regressions = []
+    for metric in ('importtime_ms', 'first_parse_ms'):
+        previous = baseline.get(metric)
+        if previous and current[metric] > previous * (1 + threshold):
+            change = current[metric] / previous - 1
+            regressions.append(f"{metric}: {change:+.1%} ({previous:.1f} -> {current[metric]:.1f} ms)")
+    return regressions
+
+
+def print_report(report: Dict[str, Any], baseline: Dict[str, Any] = None) -> None:
+    print(f"Módulo: {report['module']} (mediana de {report['runs']} processos)")
+    for metric, label in (('importtime_ms', 'import (-X importtime)'),
+                          ('import_ms', 'import (relógio)'),
+                          ('first_parse_ms', 'primeiro parse')):
+        previous = (baseline or {}).get(metric)
+        delta = f"  ({report[metric] / previous - 1:+.1%} vs base)" if previous else ''
+        print(f"  {label:<24} {report[metric]:>8.2f} ms{delta}")
+    print("\nImports mais caros (cumulativo):")
+    for name, milliseconds in report['slowest_imports']:
+        print(f"  {name:<24} {milliseconds:>8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark de cold start do parser LMTagScript')
+    parser.add_argument('--module', type=str, default='tagscript_parser',
+                        help='Módulo importado (padrão: tagscript_parser; main mede a CLI)')
+    parser.add_argument('--runs', type=int, default=11,
+                        help='Processos novos por métrica (padrão: 11)')
+    parser.add_argument('--save', type=str, default=None,
+                        help='Grava os resultados em um baseline JSON')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Compara com um baseline JSON e falha em caso de regressão')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Regressão relativa tolerada (padrão: 0.15 = 15%%)')
+    args = parser.parse_args()
+
+    report = run_startup(args.module, args.runs)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline gravado em {args.save}")
+
+    if baseline is not None:
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n❌ Regressões acima de {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"   • {regression}")
+            sys.exit(1)
+        print(f"\n✅ Sem regressões acima de {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
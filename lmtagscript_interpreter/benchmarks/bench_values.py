@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do parser de valores
+
+Compara values.parse_literal com as implementações anteriores de
+_parse_json_like / _parse_array_like (reproduzidas abaixo como referência)
+em arrays longos e em estruturas aninhadas.
+
+Uso:
+  python benchmarks/bench_values.py
+  python benchmarks/bench_values.py --sizes 1000 10000 --depths 10 50
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from typing import Any, Callable, List
+
+# Adicionar o diretório do interpretador ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from values import parse_literal
+
+
+def legacy_parse_json_like(json_str: str) -> Any:
+    """Implementação anterior de TagScriptParser._parse_json_like"""
+    try:
+        if json_str.startswith('{') and json_str.endswith('}'):
+            json_str = json_str[1:-1]
+
+        if json_str.startswith('[') and json_str.endswith(']'):
+            return legacy_parse_array_like(json_str)
+
+        result = {}
+        pairs = json_str.split(',')
+        for pair in pairs:
+            if ':' in pair:
+                key, value = pair.split(':', 1)
+                key = key.strip().strip('"')
+                value = value.strip().strip('"')
+                try:
+                    if '.' in value:
+                        value = float(value)
+                    else:
+                        value = int(value)
+                except ValueError:
+                    pass
+                result[key] = value
+        return result
+    except Exception:
+        return {'raw': json_str}
+
+
+def legacy_parse_array_like(array_str: str) -> List[Any]:
+    """Implementação anterior de TagScriptParser._parse_array_like"""
+    try:
+        content = array_str[1:-1].strip()
+        if not content:
+            return []
+
+        elements = []
+        current_element = ""
+        brace_count = 0
+        bracket_count = 0
+
+        for char in content:
+            if char == '{':
+                brace_count += 1
+            elif char == '}':
+                brace_count -= 1
+            elif char == '[':
+                bracket_count += 1
+            elif char == ']':
+                bracket_count -= 1
+            elif char == ',' and brace_count == 0 and bracket_count == 0:
+                elements.append(current_element.strip())
+                current_element = ""
+                continue
+
+            current_element += char
+
+        if current_element.strip():
+            elements.append(current_element.strip())
+
+        parsed_elements = []
+        for element in elements:
+            element = element.strip()
+            if element.startswith('{') and element.endswith('}'):
+                parsed_elements.append(legacy_parse_json_like(element))
+            elif element.startswith('[') and element.endswith(']'):
+                parsed_elements.append(legacy_parse_array_like(element))
+            else:
+                try:
+                    if '.' in element:
+                        parsed_elements.append(float(element))
+                    else:
+                        parsed_elements.append(int(element))
+                except ValueError:
+                    parsed_elements.append(element.strip('"'))
+
+        return parsed_elements
+    except Exception:
+        return []
+
+
+def make_flat_array(size: int) -> str:
+    """Array com inteiros, strings e decimais alternados"""
+    items = []
+    for i in range(size):
+        if i % 3 == 0:
+            items.append(str(i))
+        elif i % 3 == 1:
+            items.append(f'"item_{i}@empresa.com"')
+        else:
+            items.append(f'{i}.5')
+    return '[' + ', '.join(items) + ']'
+
+
+def make_nested_array(depth: int) -> str:
+    """Arrays aninhados com alguns elementos por nível"""
+    text = '[1, 2, 3]'
+    for level in range(depth - 1):
+        text = f'[{level}, "nivel", {text}, {level}.5]'
+    return text
+
+
+def make_nested_object(depth: int) -> str:
+    """Objetos aninhados com algumas chaves por nível"""
+    text = '{ valor: 1 }'
+    for level in range(depth - 1):
+        text = f'{{ nivel: {level}, nome: "n{level}", filho: {text} }}'
+    return text
+
+
+def measure(function: Callable[[str], Any], text: str, repeat: int) -> float:
+    """Melhor tempo médio por chamada, em milissegundos"""
+    number = max(1, repeat)
+    best = min(timeit.repeat(lambda: function(text), number=number, repeat=3))
+    return best / number * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Micro-benchmark do parser de valores')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='Tamanhos dos arrays planos (padrão: 100 1000 10000)')
+    parser.add_argument('--depths', type=int, nargs='+', default=[5, 10, 25, 50],
+                        help='Profundidades de aninhamento (padrão: 5 10 25 50)')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='Chamadas por medição (padrão: 20)')
+    args = parser.parse_args()
+
+    cases = []
+    for size in args.sizes:
+        cases.append((f'array plano n={size}', make_flat_array(size)))
+    for depth in args.depths:
+        cases.append((f'array aninhado d={depth}', make_nested_array(depth)))
+        cases.append((f'objeto aninhado d={depth}', make_nested_object(depth)))
+
+    # 'igual' indica se a implementação anterior produz o mesmo valor; nos
+    # objetos aninhados ela divide em toda vírgula e o resultado é incorreto
+    print(f"{'caso':<28} {'bytes':>8} {'anterior (ms)':>14} {'novo (ms)':>10} {'ganho':>7} {'igual':>6}")
+    print('-' * 78)
+    for name, text in cases:
+        legacy = measure(legacy_parse_json_like, text, args.repeat)
+        current = measure(parse_literal, text, args.repeat)
+        same = 'sim' if legacy_parse_json_like(text) == parse_literal(text) else 'não'
+        print(f"{name:<28} {len(text):>8} {legacy:>14.3f} {current:>10.3f} "
+              f"{legacy / current:>6.1f}x {same:>6}")
+
+
+if __name__ == "__main__":
+    main()
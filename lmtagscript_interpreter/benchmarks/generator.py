@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Gerador de scripts .tag sintéticos para benchmarks
+
+Produz scripts válidos com quantidade de statements, mistura de tipos
+(TAG, IF, FOR EACH, CALL, @referência, CALL API, DEFINE FUNCTION, CLASS),
+tamanho dos blocos de parâmetros e profundidade de aninhamento
+configuráveis. A saída é determinística para uma mesma semente.
+
+Uso:
+  python benchmarks/generator.py --statements 10000 -o grande.tag
+  python benchmarks/generator.py --mix ref=5,if=1 --params 20 --depth 4
+"""
+
+import argparse
+import random
+import sys
+from typing import Dict, List, Optional
+
+DEFAULT_MIX = {
+    'tag': 3,
+    'if': 2,
+    'for': 1,
+    'call': 2,
+    'ref': 3,
+    'api': 1,
+    'function': 1,
+    'class': 1,
+}
+
+_REFERENCE_KINDS = ('db', 'tool', 'project', 'file')
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """Converte 'ref=5,if=1' em pesos; tipos omitidos ficam com peso 0"""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"tipo de statement desconhecido: {name!r}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def _parameter_block(rng: random.Random, size: int, depth: int, indent: str) -> List[str]:
+    """Bloco {...} multilinha com size chaves e objetos aninhados até depth"""
+    inner = indent + '  '
+    lines = ['{']
+    for index in range(size):
+        choice = index % 4
+        if depth > 1 and index == size - 1:
+            nested = _parameter_block(rng, max(1, size // 2), depth - 1, inner)
+            lines.append(f'{inner}filho_{depth}: ' + nested[0])
+            lines.extend(nested[1:])
+            continue
+        if choice == 0:
+            value = str(rng.randrange(10000))
+        elif choice == 1:
+            value = f'"valor {rng.randrange(1000)}, texto"'
+        elif choice == 2:
+            value = '[' + ', '.join(str(rng.randrange(100)) for _ in range(5)) + ']'
+        else:
+            value = rng.choice(('true', 'false', 'null', 'lead.score', '@db:clientes'))
+        lines.append(f'{inner}campo_{index}: {value},')
+    lines[-1] = lines[-1].rstrip(',')
+    lines.append(indent + '}')
+    return lines
+
+
+def _statement(kind: str, number: int, rng: random.Random, params: int, depth: int) -> List[str]:
+    if kind == 'tag':
+        tag = ('TASK', 'ACTION', 'GOAL')[number % 3]
+        return [f'{tag}: Etapa {number} do processamento de dados']
+    if kind == 'call':
+        return [f'CALL processar_{number % 50}(lead_{number}, {rng.randrange(100)})']
+    if kind == 'ref':
+        reference = _REFERENCE_KINDS[number % len(_REFERENCE_KINDS)]
+        block = _parameter_block(rng, params, depth, '')
+        return [f'@{reference}:recurso_{number} ' + block[0]] + block[1:]
+    if kind == 'api':
+        block = _parameter_block(rng, params, depth, '')
+        return [f'CALL API eventos.registrar_{number} WITH ' + block[0]] + block[1:]
+    if kind == 'if':
+        lines = []
+        for level in range(depth):
+            lines.append('  ' * level + f'IF score_{number} > {level * 10} THEN')
+        lines.append('  ' * depth + f'encaminhar lead {number}')
+        for level in reversed(range(depth)):
+            if level == depth - 1:
+                lines.append('  ' * level + 'ELSE')
+                lines.append('  ' * (level + 1) + f'arquivar lead {number}')
+            lines.append('  ' * level + 'END')
+        return lines
+    if kind == 'for':
+        return [
+            f'FOR EACH item IN lista_{number} DO',
+            f'  CALL tratar_item(item, {number})',
+            'END',
+        ]
+    if kind == 'function':
+        return [
+            f'DEFINE FUNCTION funcao_{number}(contexto)',
+            f'  TASK: Tarefa da função {number}',
+            '  ACTION: Processar contexto',
+            '  GOAL: Contexto processado',
+            '',
+        ]
+    if kind == 'class':
+        return [f'CLASS Entidade{number}'] + [f'  campo_{i}: string' for i in range(params)] + ['']
+    raise ValueError(f"tipo de statement desconhecido: {kind!r}")
+
+
+def generate_script(statements: int = 1000, mix: Optional[Dict[str, int]] = None,
+                    params: int = 5, depth: int = 2, seed: int = 0) -> str:
+    """Gera um script com o número pedido de statements de nível superior.
+
+    mix: pesos por tipo de statement (padrão: DEFAULT_MIX).
+    params: chaves por bloco de parâmetros (e campos por CLASS).
+    depth: profundidade dos objetos aninhados nos parâmetros e dos IFs.
+    """
+    rng = random.Random(seed)
+    weights = mix or DEFAULT_MIX
+    kinds = [kind for kind, weight in weights.items() if weight > 0]
+    chosen = rng.choices(kinds, weights=[weights[kind] for kind in kinds], k=statements)
+
+    lines = ['# Script sintético gerado por benchmarks/generator.py', '']
+    for number, kind in enumerate(chosen):
+        lines.extend(_statement(kind, number, rng, params, max(1, depth)))
+    lines.append('LOOPGUARD { max_depth: 5, max_iterations: 100 }')
+    return '\n'.join(lines) + '\n'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Gera scripts .tag sintéticos para benchmarks')
+    parser.add_argument('--statements', type=int, default=1000,
+                        help='Statements de nível superior (padrão: 1000)')
+    parser.add_argument('--mix', type=parse_mix, default=None,
+                        help='Pesos por tipo, ex.: ref=5,if=1 (tipos: ' + ', '.join(DEFAULT_MIX) + ')')
+    parser.add_argument('--params', type=int, default=5,
+                        help='Chaves por bloco de parâmetros (padrão: 5)')
+    parser.add_argument('--depth', type=int, default=2,
+                        help='Profundidade de aninhamento (padrão: 2)')
+    parser.add_argument('--seed', type=int, default=0, help='Semente (padrão: 0)')
+    parser.add_argument('-o', '--output', type=str, default=None,
+                        help='Arquivo de saída (padrão: stdout)')
+    args = parser.parse_args()
+
+    script = generate_script(args.statements, args.mix, args.params, args.depth, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(script)
+    else:
+        sys.stdout.write(script)
+
+
+if __name__ == "__main__":
+    main()
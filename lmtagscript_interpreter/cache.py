@@ -0,0 +1,249 @@
+"""
+Cache de parsing endereçado por conteúdo
+
+O parsing é uma função pura do texto e da versão do parser, então o
+resultado pode ser reaproveitado entre execuções. A chave é o SHA-256 do
+conteúdo combinado com um carimbo de versão (hash do código-fonte dos módulos
+do parser): qualquer alteração no parser invalida o cache automaticamente.
+
+Dois níveis, ambos com limite e descarte do menos usado:
+  - memória: LRU com número máximo de entradas
+  - disco: um arquivo JSON por entrada, com limite total em bytes
+
+Os resultados são guardados como JSON serializado, então cada acerto
+devolve uma cópia independente que o chamador pode alterar. Os textos entre
+aspas (values.QuotedString) continuam marcados na volta, para que o plano e
+o runtime vejam o mesmo resultado com e sem cache (encode_result e
+decode_result, usados também pelo .tagc).
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+from values import QuotedString
+
+logger = logging.getLogger(__name__)
+
+# Módulos cujo código define o resultado do parsing
+_PARSER_MODULES = ('lexer.py', 'values.py', 'spans.py', 'nodes.py', 'conditions.py', 'tagscript_parser.py')
+_ENTRY_SUFFIX = '.json'
+# Codificação dos resultados guardados; entra na versão do parser
+_RESULT_ENCODING = b'quoted-marker-1'
+# No JSON guardado, "\x00q..." é um QuotedString e "\x00s..." um texto comum
+# que começava com \x00 (json.dumps sempre escreve o \x00 como \u0000)
+_MARK = '\x00'
+
+_parser_version = None
+
+
+def parser_version() -> str:
+    """Carimbo de versão do parser: hash do código-fonte dos seus módulos"""
+    global _parser_version
+    if _parser_version is None:
+        digest = hashlib.sha256(_RESULT_ENCODING)
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in _PARSER_MODULES:
+            with open(os.path.join(directory, name), 'rb') as f:
+                digest.update(f.read())
+        _parser_version = digest.hexdigest()[:16]
+    return _parser_version
+
+
+def _mark(value: Any) -> Any:
+    if isinstance(value, str):
+        if type(value) is QuotedString:
+            return _MARK + 'q' + value
+        return _MARK + 's' + value if value.startswith(_MARK) else value
+    if isinstance(value, dict):
+        return {key: _mark(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_mark(item) for item in value]
+    return value
+
+
+def _unmark(value: Any) -> Any:
+    # Dicts já passaram por _unmark_object (object_hook decodifica de dentro para fora)
+    if isinstance(value, str):
+        if value.startswith(_MARK):
+            return QuotedString(value[2:]) if value[1:2] == 'q' else value[2:]
+    elif isinstance(value, list):
+        return [_unmark(item) for item in value]
+    return value
+
+
+def _unmark_object(data: Dict[str, Any]) -> Dict[str, Any]:
+    for key, value in data.items():
+        if isinstance(value, (str, list)):
+            data[key] = _unmark(value)
+    return data
+
+
+def encode_result(value: Any, **options: Any) -> str:
+    """JSON de um resultado, com os textos entre aspas marcados (options vão para json.dumps)"""
+    return json.dumps(_mark(value), ensure_ascii=False, **options)
+
+
+def decode_result(data: Union[str, bytes]) -> Any:
+    """Inverso de encode_result: devolve os textos entre aspas como QuotedString"""
+    marker = '\\u0000' if isinstance(data, str) else b'\\u0000'
+    if marker not in data:
+        return json.loads(data)
+    return _unmark(json.loads(data, object_hook=_unmark_object))
+
+
+def default_cache_dir() -> str:
+    """Diretório padrão do cache em disco (LMTAGSCRIPT_CACHE_DIR ou ~/.cache/lmtagscript)"""
+    configured = os.environ.get('LMTAGSCRIPT_CACHE_DIR')
+    if configured:
+        return configured
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'lmtagscript')
+
+
+class ParseCache:
+    """Cache de resultados de parse_tagscript em memória e/ou em disco"""
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 256,
+                 max_bytes: int = 64 * 1024 * 1024, memory: bool = True):
+        self.directory = directory
+        self.max_entries = max_entries if memory else 0
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._disk_bytes = None
+
+    def key(self, content: str) -> str:
+        """Chave do conteúdo: SHA-256 do texto combinado com a versão do parser"""
+        digest = hashlib.sha256(parser_version().encode('ascii'))
+        digest.update(content.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, content: str) -> Optional[Dict[str, Any]]:
+        """Resultado em cache para o conteúdo, ou None"""
+        key = self.key(content)
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+        elif self.directory:
+            data = self._read_entry(key)
+            if data is not None:
+                self._remember(key, data)
+
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return decode_result(data)
+
+    def put(self, content: str, result: Dict[str, Any]) -> None:
+        """Guarda o resultado do parsing do conteúdo"""
+        key = self.key(content)
+        data = encode_result(result)
+        self._remember(key, data)
+        if self.directory:
+            self._write_entry(key, data)
+
+    def invalidate(self) -> int:
+        """Remove todas as entradas (memória e disco) e retorna quantas eram"""
+        removed = len(self._memory)
+        self._memory.clear()
+        if self.directory and os.path.isdir(self.directory):
+            removed = 0
+            for name in os.listdir(self.directory):
+                if name.endswith(_ENTRY_SUFFIX):
+                    os.remove(os.path.join(self.directory, name))
+                    removed += 1
+        self._disk_bytes = 0
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de acertos, faltas e descartes"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'memory_entries': len(self._memory),
+        }
+
+    def _remember(self, key: str, data: str) -> None:
+        """Insere no LRU em memória, descartando as entradas mais antigas"""
+        if not self.max_entries:
+            return
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _ENTRY_SUFFIX)
+
+    def _read_entry(self, key: str) -> Optional[str]:
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = f.read()
+            # Atualiza o horário de acesso usado no descarte por LRU
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Erro ao ler entrada do cache {path}: {e}")
+            return None
+
+    def _write_entry(self, key: str, data: str) -> None:
+        path = self._entry_path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Escrita atômica: outro processo nunca lê uma entrada pela metade
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.warning(f"Erro ao gravar entrada do cache {path}: {e}")
+            return
+
+        if self._disk_bytes is None:
+            self._disk_bytes = self._scan_disk_bytes()
+        else:
+            self._disk_bytes += len(data.encode('utf-8'))
+        if self._disk_bytes > self.max_bytes:
+            self._evict_disk(keep=path)
+
+    def _scan_disk_bytes(self) -> int:
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(_ENTRY_SUFFIX):
+                total += entry.stat().st_size
+        return total
+
+    def _evict_disk(self, keep: str) -> None:
+        """Remove as entradas acessadas há mais tempo até caber no limite"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(_ENTRY_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._disk_bytes = total
@@ -0,0 +1,629 @@
+"""
+Condições de IF: parse com precedência, compilação e avaliação em lote
+
+parse_condition transforma o texto de `IF ... THEN` na árvore emitida pelo
+parser (if_blocks[].condition). Precedência, da menor para a maior:
+OR, AND, NOT, comparação; parênteses agrupam. Comparações:
+  =  ==  !=  <>  <  <=  >  >=  IN  NOT IN  CONTAINS  IS NULL  IS NOT NULL
+Operandos: números, strings ("..." ou '...'), true/false/null, listas
+[a, b], nomes com acesso a campos (lead.score, @db:crm.total) e chamadas
+de função (len(itens), lower(lead.email)).
+
+Nós da árvore:
+  {'type': 'logical', 'operator': 'AND'|'OR', 'left': nó, 'right': nó}
+  {'type': 'logical', 'operator': 'NOT', 'operand': nó}
+  {'type': 'comparison', 'left': 'operando', 'operator': '>=', 'right': 'operando'}
+  {'type': 'function', 'name': 'f', 'arguments': ['operando', ...]}
+  {'type': 'raw', 'value': 'operando'}   (valor testado como verdadeiro/falso)
+Os operandos ficam como texto; um texto que não é uma condição válida vira
+um único nó raw com o texto todo.
+
+compile_condition compila uma condição (texto ou árvore) uma vez, com cache,
+em uma Condition:
+  - condition(scope): avalia para um escopo (nome -> valor)
+  - condition.evaluate_many(registros, variable='lead', scope=ctx): avalia
+    para uma coleção inteira de uma vez, coluna a coluna; com NumPy
+    instalado, colunas numéricas e de texto são comparadas vetorizadas
+  - condition.select(...): os registros para os quais a condição vale
+Nomes ausentes valem None; comparações entre tipos incompatíveis
+(None > 3, "a" < 1) são falsas em vez de levantar erro.
+"""
+
+import json
+import operator
+import re
+from collections import abc
+from functools import lru_cache
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from values import ValueParseError, parse_literal
+
+# NumPy é opcional e só é importado na primeira avaliação em lote (ver _load_numpy)
+numpy = None
+_numpy_checked = False
+
+_TOKEN_PATTERN = re.compile(r'''\s*(?:
+    (?P<STRING>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<NUMBER>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w.]))
+  | (?P<OP><=|>=|!=|<>|==|=|<|>)
+  | (?P<PUNCT>[()\[\],])
+  | (?P<NAME>(?:@\w+:)?[A-Za-z_]\w*(?:\.\w+)*)
+)''', re.VERBOSE)
+_SPACE_PATTERN = re.compile(r'\s*')
+_FUNCTION_PATTERN = re.compile(r'([A-Za-z_]\w*)\s*\((.*)\)', re.DOTALL)
+_PATH_PATTERN = re.compile(r'[A-Za-z_]\w*(?:\.\w+)*')
+_REFERENCE_PREFIX_PATTERN = re.compile(r'^@\w+:')
+
+_KEYWORDS = frozenset(('AND', 'OR', 'NOT', 'IN', 'IS', 'CONTAINS', 'NULL'))
+_CONSTANTS = {'true': True, 'false': False, 'null': None, 'none': None}
+_OPERATOR_ALIASES = {'==': '=', '<>': '!='}
+
+_FUNCTIONS = {
+    'len': len, 'lower': lambda value: str(value).lower(), 'upper': lambda value: str(value).upper(),
+    'abs': abs, 'min': min, 'max': max, 'round': round, 'int': int, 'float': float, 'str': str,
+    'bool': bool, 'exists': lambda value: value is not None,
+}
+
+_MISSING = object()
+_NUMERIC_TYPES = frozenset((bool, int, float))
+
+
+class ConditionError(ValueError):
+    """Condição que não pode ser compilada: sintaxe inválida ou função desconhecida"""
+
+
+def _load_numpy() -> None:
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy as module
+        except ImportError:  # sem NumPy o modo em lote usa listas
+            return
+        numpy = module
+
+
+# Tokenização e parse
+
+def _tokenize(text: str) -> List[Tuple[str, str, int, int]]:
+    """(tipo, texto, início, fim) de cada token; palavras-chave viram KEYWORD"""
+    tokens = []
+    pos = 0
+    while True:
+        pos = _SPACE_PATTERN.match(text, pos).end()
+        if pos >= len(text):
+            return tokens
+        match = _TOKEN_PATTERN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise ConditionError(f"Caractere inesperado na posição {pos}: {text[pos:pos + 10]!r}")
+        kind = match.lastgroup
+        start, end = match.start(kind), match.end(kind)
+        value = match.group(kind)
+        if kind == 'NAME' and value.upper() in _KEYWORDS:
+            kind, value = 'KEYWORD', value.upper()
+        tokens.append((kind, value, start, end))
+        pos = end
+
+
+class _Parser:
+    """Descida recursiva sobre os tokens de uma condição"""
+
+    __slots__ = ('text', 'tokens', 'pos')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def parse(self) -> Dict[str, Any]:
+        node = self._or()
+        if self.pos != len(self.tokens):
+            raise ConditionError(f"Conteúdo inesperado: {self.text[self.tokens[self.pos][2]:]!r}")
+        return node
+
+    def _peek(self, offset: int = 0) -> Optional[Tuple[str, str, int, int]]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def _accept(self, kind: str, value: Optional[str] = None) -> Optional[Tuple[str, str, int, int]]:
+        token = self._peek()
+        if token is not None and token[0] == kind and (value is None or token[1] == value):
+            self.pos += 1
+            return token
+        return None
+
+    def _expect(self, kind: str, value: str) -> Tuple[str, str, int, int]:
+        token = self._accept(kind, value)
+        if token is None:
+            raise ConditionError(f"Esperado {value!r} em {self.text!r}")
+        return token
+
+    def _or(self) -> Dict[str, Any]:
+        node = self._and()
+        while self._accept('KEYWORD', 'OR'):
+            node = {'type': 'logical', 'operator': 'OR', 'left': node, 'right': self._and()}
+        return node
+
+    def _and(self) -> Dict[str, Any]:
+        node = self._not()
+        while self._accept('KEYWORD', 'AND'):
+            node = {'type': 'logical', 'operator': 'AND', 'left': node, 'right': self._not()}
+        return node
+
+    def _not(self) -> Dict[str, Any]:
+        if self._accept('KEYWORD', 'NOT'):
+            return {'type': 'logical', 'operator': 'NOT', 'operand': self._not()}
+        return self._comparison()
+
+    def _comparison(self) -> Dict[str, Any]:
+        if self._accept('PUNCT', '('):
+            node = self._or()
+            self._expect('PUNCT', ')')
+            return node
+
+        left = self._operand()
+        token = self._peek()
+        if token is None:
+            return self._single(left)
+        kind, value = token[0], token[1]
+        if kind == 'OP':
+            self.pos += 1
+            operator_name = _OPERATOR_ALIASES.get(value, value)
+        elif (kind, value) == ('KEYWORD', 'IS'):
+            self.pos += 1
+            operator_name = 'IS NOT' if self._accept('KEYWORD', 'NOT') else 'IS'
+            self._expect('KEYWORD', 'NULL')
+            return {'type': 'comparison', 'left': left, 'operator': operator_name, 'right': 'NULL'}
+        elif (kind, value) == ('KEYWORD', 'NOT') and self._peek(1) is not None and self._peek(1)[1] == 'IN':
+            self.pos += 2
+            operator_name = 'NOT IN'
+        elif kind == 'KEYWORD' and value in ('IN', 'CONTAINS'):
+            self.pos += 1
+            operator_name = value
+        else:
+            return self._single(left)
+        return {'type': 'comparison', 'left': left, 'operator': operator_name, 'right': self._operand()}
+
+    @staticmethod
+    def _single(operand: str) -> Dict[str, Any]:
+        call = _FUNCTION_PATTERN.fullmatch(operand)
+        if call:
+            return {'type': 'function', 'name': call.group(1), 'arguments': _split_arguments(call.group(2))}
+        return {'type': 'raw', 'value': operand}
+
+    def _operand(self) -> str:
+        """Texto de um operando: literal, nome, lista ou chamada de função"""
+        start = self._peek()
+        if start is None:
+            raise ConditionError(f"Operando ausente em {self.text!r}")
+        self._skip_operand()
+        return self.text[start[2]:self.tokens[self.pos - 1][3]]
+
+    def _skip_operand(self) -> None:
+        token = self._peek()
+        if token is None:
+            raise ConditionError(f"Operando ausente em {self.text!r}")
+        kind, value = token[0], token[1]
+        self.pos += 1
+        if kind in ('STRING', 'NUMBER'):
+            return
+        if kind == 'NAME':
+            if self._accept('PUNCT', '('):
+                self._skip_sequence(')')
+            return
+        if (kind, value) == ('KEYWORD', 'NULL'):
+            return
+        if (kind, value) == ('PUNCT', '['):
+            self._skip_sequence(']')
+            return
+        raise ConditionError(f"Operando inválido {value!r} em {self.text!r}")
+
+    def _skip_sequence(self, closing: str) -> None:
+        if self._accept('PUNCT', closing):
+            return
+        while True:
+            self._skip_operand()
+            if self._accept('PUNCT', closing):
+                return
+            self._expect('PUNCT', ',')
+
+
+def _split_arguments(text: str) -> List[str]:
+    """Argumentos de uma chamada, separados nas vírgulas de primeiro nível"""
+    if not text.strip():
+        return []
+    parser = _Parser(text)
+    arguments = []
+    while True:
+        arguments.append(parser._operand())
+        if parser._peek() is None:
+            return arguments
+        parser._expect('PUNCT', ',')
+
+
+def parse_condition(text: str) -> Dict[str, Any]:
+    """Árvore da condição; texto inválido vira {'type': 'raw', 'value': texto}"""
+    text = text.strip()
+    try:
+        return _Parser(text).parse()
+    except ConditionError:
+        return {'type': 'raw', 'value': text}
+
+
+# Compilação
+
+def _lookup(value: Any, parts: Iterable[str]) -> Any:
+    """Campos parts a partir de value; _MISSING se algum não existir"""
+    for part in parts:
+        # abc.Mapping: o isinstance com typing.Mapping é várias vezes mais lento
+        if type(value) is dict or isinstance(value, abc.Mapping):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, (list, tuple)) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            value = getattr(value, part, _MISSING)
+        if value is _MISSING:
+            return value
+    return value
+
+
+def _getter(path: str) -> Callable[[Mapping[str, Any]], Any]:
+    """Leitura de a.b.c em um escopo como loops.resolve_path (chave mais longa primeiro), ou None"""
+    parts = path.split('.')
+    prefixes = [('.'.join(parts[:size]), parts[size:]) for size in range(len(parts), 0, -1)]
+
+    def get(scope: Mapping[str, Any]) -> Any:
+        for key, fields in prefixes:
+            value = scope.get(key, _MISSING)
+            if value is not _MISSING:
+                value = _lookup(value, fields)
+                return None if value is _MISSING else value
+        return None
+
+    return get
+
+
+def _safe(function: Callable[[Any, Any], Any]) -> Callable[[Any, Any], bool]:
+    def compare(left: Any, right: Any) -> bool:
+        try:
+            return bool(function(left, right))
+        except TypeError:
+            return False
+    return compare
+
+
+_COMPARISONS = {
+    '=': operator.eq, '!=': operator.ne,
+    '<': _safe(operator.lt), '<=': _safe(operator.le), '>': _safe(operator.gt), '>=': _safe(operator.ge),
+    'IN': _safe(lambda left, right: left in right), 'NOT IN': _safe(lambda left, right: left not in right),
+    'CONTAINS': _safe(lambda left, right: right in left),
+    'IS': lambda left, right: left is None, 'IS NOT': lambda left, right: left is not None,
+}
+_VECTOR_COMPARISONS = {'=': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+                       '>': operator.gt, '>=': operator.ge}
+
+
+class _Constant:
+    """Coluna com o mesmo valor em todas as linhas"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+class _Operand:
+    """Operando compilado: valor por escopo (row) e coluna por lote (column)"""
+
+    __slots__ = ('row', 'column')
+
+    def __init__(self, row: Callable[[Mapping[str, Any]], Any], column: Callable[['_Batch'], Any]):
+        self.row = row
+        self.column = column
+
+
+class _Batch:
+    """Registros avaliados juntos e como os nomes são resolvidos neles"""
+
+    __slots__ = ('records', 'variable', 'scope', 'columns')
+
+    def __init__(self, records: List[Any], variable: Optional[str], scope: Mapping[str, Any]):
+        self.records = records
+        self.variable = variable
+        self.scope = scope
+        # Coluna de cada nome, extraída uma única vez por lote
+        self.columns = {}
+
+    def name(self, path: str) -> Any:
+        column = self.columns.get(path)
+        if column is None:
+            column = self.columns[path] = self._extract(path)
+        return column
+
+    def _extract(self, path: str) -> Any:
+        parts = path.split('.')
+        get = _getter(path)
+        if self.variable is None:
+            column = []
+            for record in self.records:
+                value = get(record) if isinstance(record, abc.Mapping) else None
+                column.append(get(self.scope) if value is None else value)
+            return _column(column)
+        if parts[0] != self.variable:
+            return _Constant(get(self.scope))
+        fields = parts[1:]
+        if len(fields) == 1:
+            field = fields[0]
+            try:
+                # Caso comum: registros dict com o campo presente
+                return _column([record[field] for record in self.records])
+            except (KeyError, TypeError, IndexError):
+                pass
+        column = [_lookup(record, fields) for record in self.records]
+        return _column([None if value is _MISSING else value for value in column])
+
+
+def _column(values: List[Any]) -> Any:
+    """Com NumPy, colunas só de números (ou só de strings) viram arrays"""
+    if numpy is None or not values:
+        return values
+    types = set(map(type, values))
+    if types <= _NUMERIC_TYPES or types == {str}:
+        array = numpy.asarray(values)
+        # Inteiros fora do int64 viram dtype object: ficam como lista
+        if array.dtype.kind in 'biufU':
+            return array
+    return values
+
+
+def _operand(text: str, functions: Mapping[str, Callable]) -> _Operand:
+    token_kind = _tokenize(text)[0][0] if text.strip() else None
+    if token_kind in ('STRING', 'NUMBER'):
+        value = _literal(text)
+        return _Operand(lambda scope: value, lambda batch: _Constant(value))
+    if text.strip().upper() == 'NULL' or text.strip().lower() in _CONSTANTS:
+        value = _CONSTANTS.get(text.strip().lower())
+        return _Operand(lambda scope: value, lambda batch: _Constant(value))
+
+    if text.lstrip().startswith('['):
+        items = [_operand(item, functions) for item in _split_arguments(text.strip()[1:-1])]
+        return _Operand(lambda scope: [item.row(scope) for item in items],
+                        lambda batch: _map_rows(list, [item.column(batch) for item in items], batch, star=False))
+
+    call = _FUNCTION_PATTERN.fullmatch(text.strip())
+    if call:
+        name = call.group(1)
+        function = functions.get(name)
+        if function is None:
+            raise ConditionError(f"Função desconhecida na condição: {name}")
+        arguments = [_operand(argument, functions) for argument in _split_arguments(call.group(2))]
+        return _Operand(lambda scope: function(*[argument.row(scope) for argument in arguments]),
+                        lambda batch: _map_rows(function, [argument.column(batch) for argument in arguments], batch))
+
+    path = _REFERENCE_PREFIX_PATTERN.sub('', text.strip())
+    if not _PATH_PATTERN.fullmatch(path):
+        raise ConditionError(f"Operando inválido na condição: {text!r}")
+    return _Operand(_getter(path), lambda batch: batch.name(path))
+
+
+def _literal(text: str) -> Any:
+    text = text.strip()
+    if text.startswith("'"):
+        return re.sub(r"\\(.)", r'\1', text[1:-1])
+    try:
+        return parse_literal(text)
+    except ValueParseError as error:
+        raise ConditionError(f"Literal inválido na condição: {text!r}") from error
+
+
+def _map_rows(function: Callable, columns: List[Any], batch: _Batch, star: bool = True) -> Any:
+    """Aplica function linha a linha; só constantes geram uma constante"""
+    if all(isinstance(column, _Constant) for column in columns):
+        values = [column.value for column in columns]
+        return _Constant(function(*values) if star else function(values))
+    size = len(batch.records)
+    expanded = [[column.value] * size if isinstance(column, _Constant) else column for column in columns]
+    if star:
+        return [function(*values) for values in zip(*expanded)]
+    return [function(values) for values in zip(*expanded)]
+
+
+def _compare_columns(name: str, left: Any, right: Any, size: int) -> Optional[List[Any]]:
+    """Comparação linha a linha com map sobre o operador (em C); None se algum par levantar TypeError"""
+    if name in ('IS', 'IS NOT'):
+        return [(value is None) == (name == 'IS') for value in left]
+    left = repeat(left.value, size) if isinstance(left, _Constant) else left
+    right = repeat(right.value, size) if isinstance(right, _Constant) else right
+    try:
+        if name == 'IN':
+            return list(map(operator.contains, right, left))
+        if name == 'NOT IN':
+            return [not value for value in map(operator.contains, right, left)]
+        if name == 'CONTAINS':
+            return list(map(operator.contains, left, right))
+        return list(map(_VECTOR_COMPARISONS[name], left, right))
+    except TypeError:
+        return None
+
+
+def _vectorizable(left: Any, right: Any) -> bool:
+    """Os dois lados podem ser comparados pelo NumPy sem mudar o resultado"""
+    if numpy is None:
+        return False
+    kinds = []
+    for side in (left, right):
+        if isinstance(side, _Constant):
+            value = side.value
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                return False
+            kinds.append('U' if isinstance(value, str) else 'n')
+        elif isinstance(side, numpy.ndarray):
+            kinds.append('U' if side.dtype.kind == 'U' else 'n')
+        else:
+            return False
+    return kinds[0] == kinds[1]
+
+
+def _compile_node(node: Any, functions: Mapping[str, Callable]) -> Tuple[Callable, Callable]:
+    """(row, column): avaliação por escopo e por lote de um nó da árvore"""
+    if not isinstance(node, dict):
+        raise ConditionError(f"Nó de condição inválido: {node!r}")
+    kind = node.get('type')
+
+    if kind == 'logical':
+        name = node.get('operator')
+        if name == 'NOT':
+            row, column = _compile_node(node.get('operand'), functions)
+            return (lambda scope: not row(scope)), (lambda batch: _negate(column(batch)))
+        left_row, left_column = _compile_node(node.get('left'), functions)
+        right_row, right_column = _compile_node(node.get('right'), functions)
+        if name == 'AND':
+            return ((lambda scope: left_row(scope) and right_row(scope)),
+                    lambda batch: _combine(left_column(batch), right_column(batch), batch, True))
+        if name == 'OR':
+            return ((lambda scope: left_row(scope) or right_row(scope)),
+                    lambda batch: _combine(left_column(batch), right_column(batch), batch, False))
+        raise ConditionError(f"Operador lógico desconhecido: {name!r}")
+
+    if kind == 'comparison':
+        name = node.get('operator')
+        compare = _COMPARISONS.get(name)
+        if compare is None:
+            raise ConditionError(f"Operador de comparação desconhecido: {name!r}")
+        left = _operand(node['left'], functions)
+        right = left if name in ('IS', 'IS NOT') else _operand(node['right'], functions)
+        left_row, right_row = left.row, right.row
+
+        def column(batch: _Batch) -> Any:
+            left_values, right_values = left.column(batch), right.column(batch)
+            if name in _VECTOR_COMPARISONS and _vectorizable(left_values, right_values):
+                return _VECTOR_COMPARISONS[name](_unwrap(left_values), _unwrap(right_values))
+            if name in ('IS', 'IS NOT') and numpy is not None and isinstance(left_values, numpy.ndarray):
+                # Arrays só são montados sem None
+                return numpy.full(len(batch.records), name == 'IS NOT')
+            if not isinstance(left_values, _Constant) or not isinstance(right_values, _Constant):
+                fast = _compare_columns(name, left_values, right_values, len(batch.records))
+                if fast is not None:
+                    return fast
+            return _map_rows(compare, [left_values, right_values], batch)
+
+        return (lambda scope: compare(left_row(scope), right_row(scope))), column
+
+    if kind == 'function':
+        call = f"{node.get('name')}({', '.join(node.get('arguments') or ())})"
+        operand = _operand(call, functions)
+        return (lambda scope: bool(operand.row(scope))), (lambda batch: _truth(operand.column(batch)))
+
+    if kind == 'raw':
+        operand = _operand(str(node.get('value', '')), functions)
+        return (lambda scope: bool(operand.row(scope))), (lambda batch: _truth(operand.column(batch)))
+
+    raise ConditionError(f"Tipo de nó de condição desconhecido: {kind!r}")
+
+
+def _unwrap(column: Any) -> Any:
+    return column.value if isinstance(column, _Constant) else column
+
+
+def _truth(column: Any) -> Any:
+    if isinstance(column, _Constant):
+        return _Constant(bool(column.value))
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        return column.astype(bool) if column.dtype.kind != 'U' else column != ''
+    return [bool(value) for value in column]
+
+
+def _negate(column: Any) -> Any:
+    if isinstance(column, _Constant):
+        return _Constant(not column.value)
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        return ~column.astype(bool)
+    return [not value for value in column]
+
+
+def _combine(left: Any, right: Any, batch: _Batch, conjunction: bool) -> Any:
+    for constant, other in ((left, right), (right, left)):
+        if isinstance(constant, _Constant):
+            # Constante decide sozinha (False em AND, True em OR) ou devolve o outro lado
+            if bool(constant.value) != conjunction:
+                return _Constant(not conjunction)
+            return _truth(other)
+    if numpy is not None and (isinstance(left, numpy.ndarray) or isinstance(right, numpy.ndarray)):
+        combine = numpy.logical_and if conjunction else numpy.logical_or
+        return combine(numpy.asarray(left, dtype=bool), numpy.asarray(right, dtype=bool))
+    if conjunction:
+        return [bool(a and b) for a, b in zip(left, right)]
+    return [bool(a or b) for a, b in zip(left, right)]
+
+
+class Condition:
+    """Condição compilada; chame com um escopo ou avalie uma coleção com evaluate_many"""
+
+    __slots__ = ('tree', '_row', '_column')
+
+    def __init__(self, tree: Dict[str, Any], functions: Optional[Mapping[str, Callable]] = None):
+        self.tree = tree
+        self._row, self._column = _compile_node(tree, dict(_FUNCTIONS, **(functions or {})))
+
+    def __call__(self, scope: Optional[Mapping[str, Any]] = None) -> bool:
+        return bool(self._row(scope or {}))
+
+    def evaluate_many(self, records: Iterable[Any], variable: Optional[str] = None,
+                      scope: Optional[Mapping[str, Any]] = None) -> List[bool]:
+        """Resultado para cada registro, avaliado coluna a coluna.
+
+        Com variable, nomes `variable.campo` são lidos de cada registro e os
+        demais de scope; sem variable, cada registro é o escopo dos nomes
+        (com scope como reserva).
+        """
+        records = records if isinstance(records, list) else list(records)
+        if not records:
+            return []
+        _load_numpy()
+        column = self._column(_Batch(records, variable, scope or {}))
+        if isinstance(column, _Constant):
+            return [bool(column.value)] * len(records)
+        if numpy is not None and isinstance(column, numpy.ndarray):
+            return column.astype(bool).tolist()
+        return [bool(value) for value in column]
+
+    def select(self, records: Iterable[Any], variable: Optional[str] = None,
+               scope: Optional[Mapping[str, Any]] = None) -> List[Any]:
+        """Registros para os quais a condição é verdadeira"""
+        records = records if isinstance(records, list) else list(records)
+        return [record for record, keep in zip(records, self.evaluate_many(records, variable, scope)) if keep]
+
+    def __repr__(self) -> str:
+        return f"Condition({json.dumps(self.tree, ensure_ascii=False)})"
+
+
+def compile_condition(condition: Union[str, Dict[str, Any]],
+                      functions: Optional[Mapping[str, Callable]] = None) -> Condition:
+    """Condition para um texto de condição ou uma árvore de if_blocks[].condition.
+
+    Sem functions extras, o resultado é cacheado: a mesma condição é
+    compilada uma única vez.
+    """
+    if functions:
+        tree = _tree(condition)
+        return Condition(tree, functions)
+    if isinstance(condition, str):
+        return _compile_text(condition.strip())
+    return _compile_tree(json.dumps(condition, sort_keys=True))
+
+
+def _tree(condition: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    if isinstance(condition, str):
+        return _Parser(condition.strip()).parse()
+    return condition
+
+
+@lru_cache(maxsize=1024)
+def _compile_text(text: str) -> Condition:
+    return Condition(_Parser(text).parse())
+
+
+@lru_cache(maxsize=1024)
+def _compile_tree(key: str) -> Condition:
+    return Condition(json.loads(key))
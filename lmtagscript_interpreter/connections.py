@@ -0,0 +1,309 @@
+"""
+Conexões de serviços declaradas com CONNECT
+
+Cada `CONNECT TO api AS servico { url: "...", token: ENV("VAR") }` vira um
+pool de conexões HTTP keep-alive para o serviço, reutilizado por todos os
+`CALL API servico.endpoint WITH {...}` da execução: o handshake TCP/TLS é
+feito uma vez por conexão, e não uma vez por chamada.
+
+Propriedades reconhecidas em CONNECT (as demais ficam em ServiceConfig.extra):
+  - url: URL base; CALL API servico.a.b faz POST em <url>/a/b
+  - token: enviado como "Authorization: Bearer <token>"
+  - timeout: timeout de conexão/leitura em segundos
+  - pool_size: máximo de conexões simultâneas com o serviço
+  - idle_timeout: conexões ociosas por mais tempo que isso são fechadas
+
+Valores ENV("VAR") são resolvidos uma única vez, no primeiro uso do serviço,
+e ficam em cache no ConnectionManager.
+
+Uso:
+    result = parse_tagscript(source)
+    registry = HandlerRegistry()
+    with ConnectionManager(pool_size=8) as connections:
+        connections.configure(result)
+        connections.register(registry)
+        run_workflow(result, registry)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from nodes import to_plain
+
+logger = logging.getLogger(__name__)
+
+# Falhas que indicam uma conexão keep-alive fechada pelo servidor enquanto ociosa
+_STALE_CONNECTION_ERRORS = (HTTPException, ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+class ServiceConfigError(ValueError):
+    """CONNECT inválido: sem url, esquema não suportado ou ENV(...) não definido"""
+
+
+class ServiceCallError(RuntimeError):
+    """Resposta HTTP de erro (status >= 400) de um serviço"""
+
+    def __init__(self, service: str, status: int, reason: str, body: Any):
+        self.service = service
+        self.status = status
+        self.body = body
+        super().__init__(f"{service}: HTTP {status} {reason}")
+
+
+class ServiceConfig:
+    """Configuração resolvida de um serviço (ENV(...) já substituídos)"""
+
+    __slots__ = ('name', 'scheme', 'host', 'port', 'base_path', 'headers', 'timeout',
+                 'pool_size', 'idle_timeout', 'extra')
+
+    def __init__(self, name: str, url: str, token: Optional[str] = None, timeout: float = 10.0,
+                 pool_size: int = 4, idle_timeout: float = 30.0, extra: Optional[Dict[str, Any]] = None):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ServiceConfigError(f"Serviço {name}: url inválida {url!r}")
+        if pool_size < 1:
+            raise ServiceConfigError(f"Serviço {name}: pool_size deve ser pelo menos 1")
+        self.name = name
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if token:
+            self.headers['Authorization'] = f"Bearer {token}"
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.extra = extra or {}
+
+    def path(self, endpoint: str) -> str:
+        """Caminho HTTP de um endpoint (partes separadas por '.' viram segmentos)"""
+        return f"{self.base_path}/{endpoint.replace('.', '/')}"
+
+
+class ConnectionPool:
+    """Pool keep-alive de conexões HTTP com um serviço, seguro entre threads.
+
+    No máximo pool_size conexões ficam em uso ao mesmo tempo; as demais
+    chamadas esperam uma conexão ser devolvida. A conexão ociosa usada mais
+    recentemente é reaproveitada primeiro, e as ociosas há mais de
+    idle_timeout segundos são fechadas.
+    """
+
+    def __init__(self, config: ServiceConfig):
+        self.config = config
+        self._idle = []  # (conexão, instante da devolução), da mais antiga à mais recente
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(config.pool_size)
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _connect(self) -> HTTPConnection:
+        config = self.config
+        connection_class = HTTPSConnection if config.scheme == 'https' else HTTPConnection
+        self.created += 1
+        return connection_class(config.host, config.port, timeout=config.timeout)
+
+    def _acquire(self) -> Tuple[HTTPConnection, bool]:
+        """Conexão ociosa (reused=True) ou nova; o chamador já tem uma vaga"""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()[0], True
+            return self._connect(), False
+
+    def _release(self, connection: HTTPConnection) -> None:
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+
+    def _evict_idle(self, now: float) -> None:
+        """Fecha as conexões ociosas há mais de idle_timeout (chamado com o lock)"""
+        limit = now - self.config.idle_timeout
+        expired = 0
+        while expired < len(self._idle) and self._idle[expired][1] < limit:
+            self._idle[expired][0].close()
+            expired += 1
+        if expired:
+            del self._idle[:expired]
+            self.evicted += expired
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None) -> Tuple[int, str, bytes]:
+        """Executa uma requisição e retorna (status, motivo, corpo da resposta)"""
+        headers = self.config.headers
+        if not self._slots.acquire(timeout=self.config.timeout):
+            raise TimeoutError(f"Serviço {self.config.name}: nenhuma conexão livre no pool")
+        try:
+            connection, reused = self._acquire()
+            try:
+                try:
+                    status, reason, data, will_close = self._send(connection, method, path, body, headers)
+                except _STALE_CONNECTION_ERRORS:
+                    if not reused:
+                        raise
+                    # O servidor fechou a conexão ociosa: uma nova tentativa com conexão nova
+                    logger.debug("Conexão keep-alive com %s encerrada pelo servidor; reconectando",
+                                 self.config.name)
+                    connection.close()
+                    with self._lock:
+                        connection = self._connect()
+                    status, reason, data, will_close = self._send(connection, method, path, body, headers)
+            except BaseException:
+                connection.close()
+                raise
+            if will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            return status, reason, data
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _send(connection: HTTPConnection, method: str, path: str, body: Optional[bytes],
+              headers: Dict[str, str]) -> Tuple[int, str, bytes, bool]:
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        # A resposta precisa ser lida inteira antes de a conexão ser reaproveitada
+        data = response.read()
+        return response.status, response.reason, data, response.will_close
+
+    def idle(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    def stats(self) -> Dict[str, int]:
+        return {'created': self.created, 'reused': self.reused, 'evicted': self.evicted,
+                'idle': self.idle()}
+
+    def close(self) -> None:
+        with self._lock:
+            for connection, _ in self._idle:
+                connection.close()
+            self._idle = []
+
+
+class ConnectionManager:
+    """Serviços declarados com CONNECT e seus pools de conexões.
+
+    pool_size, idle_timeout e timeout são os padrões; cada CONNECT pode
+    sobrescrevê-los com as propriedades de mesmo nome. environ é a origem dos
+    ENV(...) (padrão: os.environ).
+    """
+
+    def __init__(self, pool_size: int = 4, idle_timeout: float = 30.0, timeout: float = 10.0,
+                 environ: Optional[Mapping[str, str]] = None):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.environ = os.environ if environ is None else environ
+        self._declared = {}
+        self._pools = {}
+        self._secrets = {}
+        self._lock = threading.Lock()
+
+    def configure(self, result: Dict[str, Any]) -> List[str]:
+        """Declara todos os CONNECT de um resultado do parser; retorna os nomes"""
+        names = []
+        for connection in to_plain(result).get('connections', []):
+            self.declare(connection['name'], connection['config'])
+            names.append(connection['name'])
+        return names
+
+    def declare(self, name: str, config: Dict[str, Any]) -> None:
+        """Declara (ou redeclara) um serviço; a resolução acontece no primeiro uso"""
+        with self._lock:
+            pool = self._pools.pop(name, None)
+            self._declared[name] = dict(config)
+        if pool is not None:
+            pool.close()
+
+    @property
+    def services(self) -> List[str]:
+        return list(self._declared)
+
+    def pool(self, name: str) -> ConnectionPool:
+        """Pool do serviço, criado (e com ENV(...) resolvidos) no primeiro uso"""
+        pool = self._pools.get(name)
+        if pool is not None:
+            return pool
+        with self._lock:
+            if name not in self._pools:
+                if name not in self._declared:
+                    raise LookupError(f"Serviço {name} não declarado com CONNECT")
+                self._pools[name] = ConnectionPool(self._resolve(name, self._declared[name]))
+            return self._pools[name]
+
+    def _secret(self, variable: str) -> str:
+        """Valor de ENV(variable), lido do ambiente uma única vez"""
+        if variable not in self._secrets:
+            try:
+                self._secrets[variable] = self.environ[variable]
+            except KeyError:
+                raise ServiceConfigError(f"Variável de ambiente {variable} não definida") from None
+        return self._secrets[variable]
+
+    def _resolve(self, name: str, config: Dict[str, Any]) -> ServiceConfig:
+        values = {}
+        for key, value in config.items():
+            if isinstance(value, dict) and set(value) == {'env'}:
+                value = self._secret(value['env'])
+            values[key] = value
+        if 'url' not in values:
+            raise ServiceConfigError(f"Serviço {name}: CONNECT sem url")
+        try:
+            return ServiceConfig(
+                name, values.pop('url'), values.pop('token', None),
+                timeout=float(values.pop('timeout', self.timeout)),
+                pool_size=int(values.pop('pool_size', self.pool_size)),
+                idle_timeout=float(values.pop('idle_timeout', self.idle_timeout)),
+                extra=values)
+        except ServiceConfigError:
+            raise
+        except (TypeError, ValueError) as e:
+            raise ServiceConfigError(f"Serviço {name}: {e}") from None
+
+    def call(self, service: str, endpoint: str, payload: Any = None) -> Any:
+        """POST do payload em JSON no endpoint; retorna a resposta decodificada"""
+        pool = self.pool(service)
+        body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        status, reason, data = pool.request('POST', pool.config.path(endpoint), body)
+        try:
+            response = json.loads(data) if data else None
+        except ValueError:
+            response = data.decode('utf-8', 'replace')
+        if status >= 400:
+            raise ServiceCallError(service, status, reason, response)
+        return response
+
+    def handle(self, step: Any, ctx: Dict[str, Any]) -> Any:
+        """Handler síncrono de passos 'api' para o HandlerRegistry do runtime"""
+        service, endpoint = step.target.split('.', 1)
+        return self.call(service, endpoint, step.params)
+
+    def register(self, registry: Any) -> None:
+        """Registra handle() para cada serviço declarado (CALL API servico.*)"""
+        for name in self._declared:
+            registry.register('api', self.handle, name)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: pool.stats() for name, pool in self._pools.items()}
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    def __enter__(self) -> 'ConnectionManager':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
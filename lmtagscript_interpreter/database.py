@@ -0,0 +1,417 @@
+"""
+Execução de referências @db
+
+`@db:crm { operation: "insert", table: "leads", values: {...} }` e
+`@db:vendas { query: "SELECT ...", limit: 100 }` são executados contra o
+banco registrado com o nome da referência:
+
+  - uma conexão por banco, aberta no primeiro uso e reaproveitada
+  - o SQL de cada operação (tipo, tabela, colunas) é montado uma vez e
+    guardado em um StatementCache; o driver reaproveita o statement
+    preparado para o mesmo texto (cached_statements no sqlite3)
+  - inserts/updates consecutivos com o mesmo SQL, submetidos enquanto o lote
+    está aberto (ex.: itens de um FOR EACH), viram um único executemany em
+    uma transação; o lote fecha na primeira volta do event loop sem novas
+    operações, ao atingir batch_size ou quando chega outra operação (no
+    runtime, cada escrita ocupa uma vaga de concurrency até o lote rodar).
+    Se o lote falhar, cada operação é refeita na sua própria transação: só
+    a que falha de fato recebe o erro, como sem agrupamento
+  - SELECTs devolvem um RowStream, que busca as linhas em blocos
+    (fetchmany) à medida que é iterado; cada nova iteração (outro FOR EACH
+    sobre o mesmo resultado) refaz a consulta em um cursor próprio
+
+Parâmetros da referência:
+  - query (+ params, limit, order_by): consulta; order_by é um trecho SQL
+  - operation "insert": table e values (um dict ou uma lista de dicts)
+  - operation "update": table, values e where (trecho SQL, + where_params)
+
+Tabelas e colunas precisam ser identificadores simples; os valores sempre
+vão como parâmetros. Valores que não são escalares (dicts, listas) são
+gravados como JSON.
+
+SQLiteAdapter é o adaptador local (e dos testes); outro banco precisa de um
+objeto com connect() que devolva uma conexão DB-API 2 com parâmetros '?'.
+
+Uso com o runtime:
+    databases = DatabaseExecutor({'crm': SQLiteAdapter('crm.db')})
+    databases.register(registry)
+    run_workflow(result, registry)
+"""
+
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER_PATTERN = re.compile(r'[A-Za-z_]\w*')
+WRITE_OPERATIONS = ('insert', 'update')
+
+
+class DatabaseReferenceError(ValueError):
+    """Referência @db inválida: banco não registrado, operação ou identificador inválido"""
+
+
+class SQLiteAdapter:
+    """Banco SQLite em arquivo (ou ':memory:')"""
+
+    def __init__(self, path: str = ':memory:', timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+
+    def connect(self, cached_statements: int = 256) -> sqlite3.Connection:
+        # A conexão é compartilhada entre threads do executor; o acesso é serializado pelo lock do banco
+        return sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=cached_statements)
+
+
+class StatementCache:
+    """LRU do texto SQL por forma da operação (tipo, tabela, colunas, where)"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._statements = OrderedDict()
+
+    def get(self, key: Tuple, build: Any) -> str:
+        sql = self._statements.get(key)
+        if sql is not None:
+            self.hits += 1
+            self._statements.move_to_end(key)
+            return sql
+        self.misses += 1
+        sql = self._statements[key] = build()
+        if len(self._statements) > self.max_entries:
+            self._statements.popitem(last=False)
+        return sql
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+
+class RowStream:
+    """Linhas de um SELECT como dicts, buscadas em blocos de arraysize
+
+    A primeira iteração lê o cursor já executado; as seguintes chamam
+    reopen() para refazer a consulta em um cursor novo (sem reopen, uma
+    segunda iteração levanta DatabaseReferenceError).
+    """
+
+    # Ligado a uma conexão do banco: o ResultCache não guarda para outra execução
+    cacheable = False
+
+    def __init__(self, cursor: Any, lock: threading.RLock, arraysize: int = 1000,
+                 reopen: Optional[Callable[[], Any]] = None):
+        self._cursor = cursor
+        self._lock = lock
+        self._reopen = reopen
+        self.arraysize = arraysize
+        self.columns = [column[0] for column in cursor.description or ()]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            cursor, self._cursor = self._cursor, None
+            if cursor is None:
+                if self._reopen is None:
+                    raise DatabaseReferenceError("RowStream já foi consumido")
+                cursor = self._reopen()
+        columns = self.columns
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(self.arraysize)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(zip(columns, row))
+        finally:
+            with self._lock:
+                cursor.close()
+
+    def close(self) -> None:
+        """Fecha o cursor ainda não iterado (as iterações fecham os seus ao terminar)"""
+        with self._lock:
+            cursor, self._cursor = self._cursor, None
+            if cursor is not None:
+                cursor.close()
+
+    def __repr__(self) -> str:
+        return f"RowStream({self.columns})"
+
+
+class _Database:
+    """Conexão compartilhada de um banco e o lock que serializa o acesso a ela"""
+
+    __slots__ = ('adapter', 'connection', 'lock', 'pending', 'tail')
+
+    def __init__(self, adapter: Any):
+        self.adapter = adapter
+        self.connection = None
+        self.lock = threading.RLock()
+        # Lote de escrita aberto (ver DatabaseExecutor.submit) e a última execução encadeada
+        self.pending = None
+        self.tail = None
+
+
+class _WriteBatch:
+    """Operações de escrita com o mesmo SQL, executadas em um único executemany"""
+
+    __slots__ = ('sql', 'operation', 'table', 'rows', 'waiters', 'seen')
+
+    def __init__(self, sql: str, operation: str, table: str):
+        self.sql = sql
+        self.operation = operation
+        self.table = table
+        self.rows = []
+        # (future, quantidade de linhas da operação)
+        self.waiters = []
+        # Operações no lote na última volta do loop (ver DatabaseExecutor._linger)
+        self.seen = 0
+
+
+class DatabaseExecutor:
+    """Executa referências @db nos bancos registrados"""
+
+    def __init__(self, databases: Optional[Dict[str, Any]] = None, batch_size: int = 1000,
+                 statement_cache_size: int = 256, arraysize: int = 1000):
+        self.batch_size = batch_size
+        self.arraysize = arraysize
+        self.statements = StatementCache(statement_cache_size)
+        self.batches = 0
+        self.batched_operations = 0
+        self._databases = {}
+        for name, adapter in (databases or {}).items():
+            self.add_database(name, adapter)
+
+    def add_database(self, name: str, adapter: Any) -> None:
+        self._databases[name] = _Database(adapter)
+
+    def _database(self, name: str) -> _Database:
+        database = self._databases.get(name)
+        if database is None:
+            raise DatabaseReferenceError(f"Banco {name} não registrado")
+        with database.lock:
+            if database.connection is None:
+                database.connection = database.adapter.connect(self.statements.max_entries)
+        return database
+
+    # Montagem do SQL
+
+    def prepare(self, params: Dict[str, Any]) -> Tuple[str, str, Optional[str], List[tuple]]:
+        """(SQL, operação, tabela, linhas de parâmetros) de uma referência @db"""
+        params = params or {}
+        if 'query' in params:
+            return self._prepare_query(params)
+        operation = str(params.get('operation', '')).lower()
+        if operation not in WRITE_OPERATIONS:
+            raise DatabaseReferenceError(f"Operação @db não suportada: {operation!r}")
+        table = _identifier(params.get('table'), 'tabela')
+        values = params.get('values')
+        records = values if isinstance(values, list) else [values]
+        if not records or not all(isinstance(record, dict) and record for record in records):
+            raise DatabaseReferenceError(f"{operation} em {table}: values deve ser um dict ou lista de dicts")
+        columns = tuple(_identifier(column, 'coluna') for column in records[0])
+        if any(tuple(record) != columns for record in records[1:]):
+            raise DatabaseReferenceError(f"{operation} em {table}: todos os registros precisam das mesmas colunas")
+
+        if operation == 'insert':
+            sql = self.statements.get(('insert', table, columns), lambda: (
+                f'INSERT INTO {_quote(table)} ({", ".join(map(_quote, columns))}) '
+                f'VALUES ({", ".join("?" * len(columns))})'))
+            rows = [tuple(_column_value(record[column]) for column in columns) for record in records]
+            return sql, operation, table, rows
+
+        where = params.get('where')
+        where_params = tuple(params.get('where_params') or ())
+        sql = self.statements.get(('update', table, columns, where), lambda: (
+            f'UPDATE {_quote(table)} SET {", ".join(_quote(column) + " = ?" for column in columns)}'
+            + (f' WHERE {where}' if where else '')))
+        rows = [tuple(_column_value(record[column]) for column in columns) + where_params for record in records]
+        return sql, operation, table, rows
+
+    def _prepare_query(self, params: Dict[str, Any]) -> Tuple[str, str, None, List[tuple]]:
+        query = str(params['query']).strip().rstrip(';')
+        arguments = params.get('params') or ()
+        order_by = params.get('order_by')
+        limit = params.get('limit')
+        if order_by or limit is not None:
+            query = f'SELECT * FROM ({query})'
+            if order_by:
+                query += f' ORDER BY {order_by}'
+            if limit is not None:
+                query += ' LIMIT ?'
+                arguments = list(arguments) + [int(limit)]
+        return query, 'query', None, [arguments if isinstance(arguments, dict) else tuple(arguments)]
+
+    # Execução síncrona (sem agrupamento)
+
+    def execute(self, name: str, params: Dict[str, Any]) -> Any:
+        """Executa uma referência @db: RowStream para consultas, resumo para escritas"""
+        sql, operation, table, rows = self.prepare(params)
+        database = self._database(name)
+        if operation == 'query':
+            return self._query(database, sql, rows[0])
+        count = self._write(database, sql, rows)
+        return {'operation': operation, 'table': table, 'rows': len(rows), 'batch': 1, 'rowcount': count}
+
+    def _query(self, database: _Database, sql: str, arguments: Any) -> RowStream:
+        def execute() -> Any:
+            with database.lock:
+                if database.connection is None:
+                    raise DatabaseReferenceError("Banco fechado")
+                cursor = database.connection.cursor()
+                cursor.execute(sql, arguments)
+                return cursor
+
+        return RowStream(execute(), database.lock, self.arraysize, reopen=execute)
+
+    def _write(self, database: _Database, sql: str, rows: List[tuple]) -> int:
+        with database.lock:
+            connection = database.connection
+            with connection:
+                cursor = connection.executemany(sql, rows) if len(rows) > 1 else connection.execute(sql, rows[0])
+            return cursor.rowcount
+
+    # Execução assíncrona com agrupamento de escritas
+
+    async def submit(self, name: str, params: Dict[str, Any]) -> Any:
+        """Como execute(), agrupando escritas consecutivas de mesmo SQL em um executemany"""
+        sql, operation, table, rows = self.prepare(params)
+        database = self._database(name)
+        loop = asyncio.get_running_loop()
+
+        if operation == 'query':
+            self._seal(database, loop)
+            return await self._chain(database, loop, lambda: self._query(database, sql, rows[0]))
+
+        batch = database.pending
+        if batch is None or batch.sql != sql or len(batch.rows) + len(rows) > self.batch_size:
+            # Uma escrita diferente encerra o lote aberto, preservando a ordem
+            self._seal(database, loop)
+            batch = database.pending = _WriteBatch(sql, operation, table)
+            loop.call_soon(self._linger, database, loop, batch)
+        future = loop.create_future()
+        batch.rows.extend(rows)
+        batch.waiters.append((future, len(rows)))
+        return await future
+
+    def _linger(self, database: _Database, loop: asyncio.AbstractEventLoop, batch: _WriteBatch) -> None:
+        """Mantém o lote aberto enquanto chegam operações a cada volta do loop"""
+        if database.pending is not batch:
+            return
+        if len(batch.waiters) != batch.seen:
+            batch.seen = len(batch.waiters)
+            loop.call_soon(self._linger, database, loop, batch)
+        else:
+            self._seal(database, loop, batch)
+
+    def _seal(self, database: _Database, loop: asyncio.AbstractEventLoop,
+              batch: Optional[_WriteBatch] = None) -> None:
+        """Fecha o lote aberto (se ainda for o mesmo) e encadeia a sua execução"""
+        pending = database.pending
+        if pending is None or (batch is not None and pending is not batch):
+            return
+        database.pending = None
+        task = self._chain(database, loop, lambda: self._write_batch(database, pending))
+        task.add_done_callback(lambda done: self._settle(pending, done))
+
+    def _write_batch(self, database: _Database, batch: _WriteBatch) -> Tuple[List[Any], int]:
+        """(rowcount ou exceção de cada operação, tamanho do lote em que ela rodou)"""
+        try:
+            return [self._write(database, batch.sql, batch.rows)] * len(batch.waiters), len(batch.waiters)
+        except Exception as e:
+            if len(batch.waiters) == 1:
+                return [e], 1
+            # A transação do lote foi desfeita: cada operação é refeita sozinha
+            logger.debug("Lote de %d operações em %s falhou (%r); refazendo uma a uma",
+                         len(batch.waiters), batch.table, e)
+        outcomes = []
+        start = 0
+        for _, rows in batch.waiters:
+            try:
+                outcomes.append(self._write(database, batch.sql, batch.rows[start:start + rows]))
+            except Exception as e:
+                outcomes.append(e)
+            start += rows
+        return outcomes, 1
+
+    def _chain(self, database: _Database, loop: asyncio.AbstractEventLoop, work: Any) -> 'asyncio.Future':
+        """Executa work em uma thread depois da execução anterior do mesmo banco"""
+        previous = database.tail
+        if previous is not None and (previous.done() or previous.get_loop() is not loop):
+            # Execução já terminada, ou de um event loop anterior (outro asyncio.run)
+            previous = None
+
+        async def run() -> Any:
+            if previous is not None:
+                await asyncio.wait([previous])
+            return await loop.run_in_executor(None, work)
+
+        database.tail = task = asyncio.ensure_future(run())
+        return task
+
+    def _settle(self, batch: _WriteBatch, done: 'asyncio.Future') -> None:
+        self.batches += 1
+        self.batched_operations += len(batch.waiters)
+        error = None if done.cancelled() else done.exception()
+        outcomes, size = ([None] * len(batch.waiters), 0) if done.cancelled() or error else done.result()
+        for (future, rows), outcome in zip(batch.waiters, outcomes):
+            if future.done():
+                continue
+            if done.cancelled():
+                future.cancel()
+            elif error is not None:
+                future.set_exception(error)
+            elif isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result({'operation': batch.operation, 'table': batch.table, 'rows': rows,
+                                   'batch': size, 'rowcount': outcome})
+        if error is not None:
+            logger.debug("Lote de %d operações em %s falhou: %r", len(batch.waiters), batch.table, error)
+
+    async def handle(self, step: Any, ctx: Dict[str, Any]) -> Any:
+        """Handler de passos 'database' para o HandlerRegistry do runtime"""
+        return await self.submit(step.target, step.params)
+
+    def register(self, registry: Any) -> None:
+        registry.register('database', self.handle)
+
+    def stats(self) -> Dict[str, int]:
+        return {'batches': self.batches, 'batched_operations': self.batched_operations,
+                'statement_hits': self.statements.hits, 'statement_misses': self.statements.misses}
+
+    def close(self) -> None:
+        for database in self._databases.values():
+            with database.lock:
+                if database.connection is not None:
+                    database.connection.close()
+                    database.connection = None
+
+    def __enter__(self) -> 'DatabaseExecutor':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _identifier(name: Any, what: str) -> str:
+    if not isinstance(name, str) or not _IDENTIFIER_PATTERN.fullmatch(name):
+        raise DatabaseReferenceError(f"Nome de {what} inválido: {name!r}")
+    return name
+
+
+def _quote(name: str) -> str:
+    return f'"{name}"'
+
+
+def _column_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
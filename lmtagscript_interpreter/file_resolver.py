@@ -0,0 +1,321 @@
+"""
+Resolução de referências @file sem carregar os arquivos na memória
+
+`@file:"/dados/vendas.csv" { permission: "read", format: "csv" }` vira um
+FileReference: um objeto leve que abre o arquivo sob demanda e expõe o
+conteúdo como iteradores (linhas, registros CSV, objetos JSON Lines ou
+blocos de bytes). Arquivos de vários GB são lidos em blocos de chunk_size e
+nunca são materializados inteiros; blocos binários são fatias (memoryview)
+de um mmap somente leitura, sem cópia.
+
+Parâmetros da referência:
+  - permission: "read" (padrão), "write" ou "read_write"
+  - format: "text" (padrão), "csv", "jsonl", "json" ou "binary"
+  - encoding: codificação do texto (padrão utf-8)
+  - delimiter, header: para CSV (header: false gera listas em vez de dicts)
+
+prefetch(result) parte do plano do workflow: abre e mapeia em paralelo, em
+threads, todos os @file de leitura com caminho fixo e pede ao kernel a
+leitura antecipada (posix_fadvise/madvise WILLNEED), de modo que o primeiro
+acesso de cada passo já encontre as páginas em cache.
+
+Uso com o runtime:
+    with FileResolver(root='/srv/dados') as files:
+        files.register(registry)
+        files.prefetch(result)
+        run_workflow(result, registry)
+"""
+
+import csv
+import json
+import logging
+import mmap
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+from nodes import to_plain
+from planner import block_parents, enclosing_block, plan_workflow
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('text', 'csv', 'jsonl', 'json', 'binary')
+_PERMISSIONS = {'read': (True, False), 'write': (False, True), 'read_write': (True, True)}
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class FileReferenceError(ValueError):
+    """Parâmetros inválidos em uma referência @file ou caminho fora da raiz"""
+
+
+class FileReference:
+    """Arquivo referenciado por @file, aberto sob demanda e lido em blocos"""
+
+    __slots__ = ('path', 'format', 'encoding', 'params', 'can_read', 'can_write', 'chunk_size', '_mmap')
+
+    def __init__(self, path: str, params: Optional[Dict[str, Any]] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        params = dict(params or {})
+        permission = str(params.get('permission', 'read')).lower().replace('-', '_')
+        if permission not in _PERMISSIONS:
+            raise FileReferenceError(f"@file:{path}: permission inválida {permission!r}")
+        file_format = str(params.get('format', 'text')).lower()
+        if file_format not in FORMATS:
+            raise FileReferenceError(f"@file:{path}: format {file_format!r} não suportado "
+                                     f"(use {', '.join(FORMATS)})")
+        self.path = path
+        self.format = file_format
+        self.encoding = params.get('encoding', 'utf-8')
+        self.params = params
+        self.can_read, self.can_write = _PERMISSIONS[permission]
+        self.chunk_size = chunk_size
+        self._mmap = None
+
+    def _check(self, reading: bool) -> None:
+        if reading and not self.can_read:
+            raise PermissionError(f"@file:{self.path} não tem permissão de leitura")
+        if not reading and not self.can_write:
+            raise PermissionError(f"@file:{self.path} não tem permissão de escrita")
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def mapped(self) -> Optional[mmap.mmap]:
+        """mmap somente leitura do arquivo (None para arquivo vazio ou não mapeável)"""
+        self._check(reading=True)
+        if self._mmap is None:
+            with open(self.path, 'rb') as f:
+                try:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, OSError):
+                    # Arquivo vazio, pipe ou dispositivo: leitura em blocos
+                    return None
+        return self._mmap
+
+    def chunks(self) -> Iterator[memoryview]:
+        """Blocos de até chunk_size bytes; fatias do mmap, sem cópia, quando possível"""
+        mapped = self.mapped()
+        if mapped is not None:
+            view = memoryview(mapped)
+            try:
+                for start in range(0, len(view), self.chunk_size):
+                    yield view[start:start + self.chunk_size]
+            finally:
+                view.release()
+            return
+        with open(self.path, 'rb', buffering=0) as f:
+            for block in iter(lambda: f.read(self.chunk_size), b''):
+                yield memoryview(block)
+
+    def lines(self) -> Iterator[str]:
+        """Linhas de texto (sem a quebra de linha), lidas em blocos de chunk_size"""
+        self._check(reading=True)
+        with self._open_text() as f:
+            for line in f:
+                yield line.rstrip('\r\n')
+
+    def rows(self) -> Iterator[Any]:
+        """Registros CSV: dicts pelo cabeçalho, ou listas com header: false"""
+        self._check(reading=True)
+        delimiter = self.params.get('delimiter', ',')
+        with self._open_text(newline='') as f:
+            if self.params.get('header', True) in (False, 'false'):
+                yield from csv.reader(f, delimiter=delimiter)
+            else:
+                yield from csv.DictReader(f, delimiter=delimiter)
+
+    def records(self) -> Iterator[Any]:
+        """Objetos de um arquivo JSON Lines, um por linha não vazia"""
+        for line in self.lines():
+            if line.strip():
+                yield json.loads(line)
+
+    def load(self) -> Any:
+        """Conteúdo de um arquivo JSON (único formato lido por inteiro)"""
+        self._check(reading=True)
+        with self._open_text() as f:
+            return json.load(f)
+
+    def __iter__(self) -> Iterator[Any]:
+        """Itera pelo conteúdo conforme o format da referência"""
+        if self.format == 'csv':
+            return self.rows()
+        if self.format == 'jsonl':
+            return self.records()
+        if self.format == 'binary':
+            return self.chunks()
+        if self.format == 'json':
+            return iter(self.load())
+        return self.lines()
+
+    def open_write(self, append: bool = False) -> TextIO:
+        """Arquivo de texto aberto para escrita (cria os diretórios que faltarem)"""
+        self._check(reading=False)
+        self._release()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        newline = '' if self.format == 'csv' else None
+        return open(self.path, 'a' if append else 'w', encoding=self.encoding, newline=newline)
+
+    def write_rows(self, rows: Iterator[Any], append: bool = False) -> int:
+        """Grava registros em streaming conforme o format; retorna quantos foram gravados"""
+        if self.format == 'binary':
+            raise FileReferenceError(f"@file:{self.path}: write_rows não grava format 'binary'")
+        count = 0
+        with self.open_write(append) as f:
+            if self.format == 'csv':
+                writer = csv.writer(f, delimiter=self.params.get('delimiter', ','))
+                for row in rows:
+                    if isinstance(row, dict):
+                        if not count and not append and self.params.get('header', True) not in (False, 'false'):
+                            writer.writerow(list(row))
+                        row = list(row.values())
+                    writer.writerow(row)
+                    count += 1
+            elif self.format == 'json':
+                # Um único documento: o único formato gravado por inteiro
+                rows = list(rows)
+                json.dump(rows, f, ensure_ascii=False)
+                count = len(rows)
+            else:
+                for row in rows:
+                    f.write((json.dumps(row, ensure_ascii=False) if self.format == 'jsonl' else str(row)) + '\n')
+                    count += 1
+        return count
+
+    def prefetch(self) -> None:
+        """Mapeia o arquivo e pede ao kernel a leitura antecipada das páginas"""
+        with open(self.path, 'rb') as f:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        mapped = self.mapped()
+        if mapped is not None and hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_WILLNEED'):
+            mapped.madvise(mmap.MADV_WILLNEED)
+
+    def _open_text(self, newline: Optional[str] = None) -> TextIO:
+        return open(self.path, 'r', encoding=self.encoding, newline=newline, buffering=self.chunk_size)
+
+    def _release(self) -> None:
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Ainda há blocos de chunks() em uso; o mmap é fechado quando forem liberados
+                pass
+            self._mmap = None
+
+    def close(self) -> None:
+        self._release()
+
+    def __repr__(self) -> str:
+        return f"FileReference({self.path!r}, format={self.format!r})"
+
+
+class FileResolver:
+    """Resolve referências @file em FileReference, com prefetch a partir do plano.
+
+    Com root, os caminhos do script (absolutos ou relativos) são tratados
+    como relativos a root e não podem sair dele. As referências resolvidas
+    ficam em cache por caminho e parâmetros, compartilhando o mmap.
+    """
+
+    def __init__(self, root: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 workers: int = 8):
+        self.root = os.path.realpath(root) if root is not None else None
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self._references = {}
+        self._prefetching = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def resolve_path(self, path: str) -> str:
+        """Caminho no sistema de arquivos de um caminho do script"""
+        if self.root is None:
+            return path
+        resolved = os.path.realpath(os.path.join(self.root, path.lstrip('/\\')))
+        if os.path.commonpath([self.root, resolved]) != self.root:
+            raise FileReferenceError(f"@file:{path} está fora de {self.root}")
+        return resolved
+
+    def _key(self, path: str, params: Optional[Dict[str, Any]]) -> tuple:
+        return self.resolve_path(path), json.dumps(params or {}, sort_keys=True, default=str)
+
+    def _reference(self, key: tuple, params: Optional[Dict[str, Any]]) -> FileReference:
+        with self._lock:
+            reference = self._references.get(key)
+            if reference is None:
+                reference = FileReference(key[0], params, self.chunk_size)
+                self._references[key] = reference
+            return reference
+
+    def open(self, path: str, params: Optional[Dict[str, Any]] = None) -> FileReference:
+        """FileReference de um @file (reaproveitada, e já pré-carregada se houve prefetch)"""
+        key = self._key(path, params)
+        pending = self._prefetching.get(key)
+        if pending is not None:
+            try:
+                pending.result()
+            except OSError as e:
+                logger.debug("Prefetch de %s falhou: %s", path, e)
+        return self._reference(key, params)
+
+    def paths(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Referências @file de leitura do workflow cujo caminho é fixo (sem variáveis)"""
+        result = to_plain(result)
+        parents = block_parents(result)
+        found = []
+        for node in plan_workflow(result).nodes.values():
+            if node.kind != 'file' or node.depends_on:
+                continue
+            if enclosing_block(node.source, parents, 'for_loops') is not None:
+                # Dentro de um FOR EACH o caminho costuma vir da variável do laço
+                continue
+            reference = result[node.source[0]][node.source[1]]
+            params = reference.get('parameters') or {}
+            if str(params.get('permission', 'read')).lower() in ('read', 'read_write'):
+                found.append({'path': reference['path'], 'parameters': reference.get('parameters')})
+        return found
+
+    def prefetch(self, result: Dict[str, Any]) -> List[Future]:
+        """Inicia em paralelo o prefetch dos @file do workflow; não bloqueia"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='file-prefetch')
+        futures = []
+        for entry in self.paths(result):
+            try:
+                key = self._key(entry['path'], entry['parameters'])
+                reference = self._reference(key, entry['parameters'])
+            except FileReferenceError as e:
+                logger.warning("Prefetch ignorado: %s", e)
+                continue
+            if key in self._prefetching or not os.path.isfile(reference.path):
+                continue
+            future = self._executor.submit(reference.prefetch)
+            self._prefetching[key] = future
+            futures.append(future)
+        return futures
+
+    def handle(self, step: Any, ctx: Dict[str, Any]) -> FileReference:
+        """Handler de passos 'file' para o HandlerRegistry do runtime"""
+        return self.open(step.target, step.params)
+
+    def register(self, registry: Any) -> None:
+        registry.register('file', self.handle)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._prefetching.clear()
+        for reference in self._references.values():
+            reference.close()
+        self._references.clear()
+
+    def __enter__(self) -> 'FileResolver':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
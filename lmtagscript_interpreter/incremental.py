@@ -0,0 +1,175 @@
+"""
+Parsing incremental do LMTagScript para editores e LSP
+
+Mantém um índice dos statements de nível superior com o intervalo de linhas
+de cada um. A cada edição apenas os statements afetados são re-parseados; os
+demais são reaproveitados, com os números de linha deslocados quando a
+edição muda a quantidade de linhas do documento.
+"""
+
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from tagscript_parser import TagScriptParser, iter_parsed_statements, iter_statement_chunks, merge_results
+
+if TYPE_CHECKING:
+    from interning import InternTable
+
+# Chaves cujo conteúdo são dados do script e não nós do parser
+_DATA_KEYS = ('parameters', 'payload', 'properties', 'config', 'condition')
+_LINE_KEYS = ('line_number', 'end_line')
+
+
+class Statement:
+    """Statement de nível superior com o seu intervalo de linhas (0-based, inclusivo)"""
+
+    __slots__ = ('start', 'end', 'kind', 'result')
+
+    def __init__(self, start: int, end: int, kind: str, result: Dict[str, Any]):
+        self.start = start
+        self.end = end
+        self.kind = kind
+        self.result = result
+
+    @property
+    def line_number(self) -> int:
+        """Primeira linha do statement (1-based)"""
+        return self.start + 1
+
+    def __repr__(self) -> str:
+        return f"Statement({self.kind!r}, linhas {self.start + 1}-{self.end + 1})"
+
+
+class EditResult:
+    """Resumo de uma edição: statements re-parseados, removidos e deslocamento"""
+
+    __slots__ = ('changed', 'removed', 'line_delta')
+
+    def __init__(self, changed: List[Statement], removed: List[Statement], line_delta: int):
+        self.changed = changed
+        self.removed = removed
+        self.line_delta = line_delta
+
+
+class IncrementalParser:
+    """Documento TagScript que se re-parseia apenas nas regiões editadas"""
+
+    def __init__(self, content: str = '', interning: Optional['InternTable'] = None):
+        # Com muitos documentos abertos, uma tabela compartilhada (interning.shared_table())
+        # evita uma cópia por documento dos mesmos nomes e chaves
+        self._interning = interning
+        self._parser = TagScriptParser(interning=interning)
+        self._lines = content.split('\n')
+        self._result = None
+        self.statements = self._parse_from(0)
+
+    @property
+    def text(self) -> str:
+        """Conteúdo atual do documento"""
+        return '\n'.join(self._lines)
+
+    @property
+    def result(self) -> Dict[str, Any]:
+        """Resultado completo, no mesmo formato de parse_tagscript"""
+        if self._result is None:
+            self._result = merge_results(statement.result for statement in self.statements)
+        return self._result
+
+    def statement_at(self, line: int) -> Optional[Statement]:
+        """Statement que contém a linha (0-based), se houver"""
+        index = self._first_ending_at_or_after(line)
+        if index < len(self.statements) and self.statements[index].start <= line:
+            return self.statements[index]
+        return None
+
+    def apply_edit(self, start_line: int, start_column: int, end_line: int, end_column: int,
+                   text: str) -> EditResult:
+        """Substitui o intervalo [início, fim) pelo texto, no estilo de TextEdit do LSP.
+
+        Linhas e colunas são 0-based. Retorna os statements re-parseados e os
+        que foram substituídos.
+        """
+        prefix = self._lines[start_line][:start_column]
+        suffix = self._lines[end_line][end_column:]
+        new_lines = (prefix + text + suffix).split('\n')
+        self._lines[start_line:end_line + 1] = new_lines
+        line_delta = len(new_lines) - (end_line - start_line + 1)
+        self._result = None
+
+        # Um statement que termina logo antes da edição pode absorver as novas
+        # linhas (corpo de CLASS/DEFINE FUNCTION), então o re-parse começa nele
+        first = self._first_ending_at_or_after(start_line - 1)
+        restart = start_line
+        if first < len(self.statements):
+            restart = min(restart, self.statements[first].start)
+
+        changed = []
+        reuse_from = len(self.statements)
+        old_index = first
+        pending = None
+        for start, kind, chunk in iter_statement_chunks(islice(self._lines, restart, None), restart):
+            end = start + len(chunk) - 1
+            if pending is not None:
+                # IF deixado aberto pela recuperação de erros continua aqui
+                result = self._parser.parse_statement(chunk, start, resume=True)
+            else:
+                # Avança sobre statements antigos que já ficaram para trás
+                while (old_index < len(self.statements)
+                       and self.statements[old_index].start + line_delta < start):
+                    old_index += 1
+                # Statement antigo que começa após a edição na mesma posição:
+                # dali em diante o conteúdo não mudou e pode ser reaproveitado
+                if (old_index < len(self.statements)
+                        and self.statements[old_index].start > end_line
+                        and self.statements[old_index].start + line_delta == start):
+                    reuse_from = old_index
+                    break
+                pending = start, kind
+                result = self._parser.parse_statement(chunk, start)
+            if not self._parser.in_block:
+                changed.append(Statement(pending[0], end, pending[1], result))
+                pending = None
+        if pending is not None:
+            changed.append(Statement(pending[0], end, pending[1], result))
+
+        removed = self.statements[first:reuse_from]
+        reused = self.statements[reuse_from:]
+        if line_delta:
+            for statement in reused:
+                statement.start += line_delta
+                statement.end += line_delta
+                _shift_line_numbers(statement.result, line_delta)
+        self.statements = self.statements[:first] + changed + reused
+        return EditResult(changed, removed, line_delta)
+
+    def _parse_from(self, line: int) -> List[Statement]:
+        """Parseia todos os statements a partir de uma linha"""
+        lines = islice(self._lines, line, None)
+        return [Statement(start, end, kind, result)
+                for start, end, kind, result in iter_parsed_statements(lines, line, interning=self._interning)]
+
+    def _first_ending_at_or_after(self, line: int) -> int:
+        """Índice do primeiro statement cujo fim é >= line (busca binária)"""
+        low, high = 0, len(self.statements)
+        while low < high:
+            middle = (low + high) // 2
+            if self.statements[middle].end < line:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+def _shift_line_numbers(node: Any, delta: int) -> None:
+    """Desloca os campos line_number/end_line dos nós de um resultado parcial"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in _LINE_KEYS:
+                if value is not None:
+                    node[key] = value + delta
+            elif key not in _DATA_KEYS and isinstance(value, (dict, list)):
+                _shift_line_numbers(value, delta)
+    elif isinstance(node, list):
+        for item in node:
+            if isinstance(item, (dict, list)):
+                _shift_line_numbers(item, delta)
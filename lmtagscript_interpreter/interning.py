@@ -0,0 +1,108 @@
+"""
+Tabela de internação de identificadores e chaves
+
+Em processos de vida longa (workers de API, servidor de linguagem) os mesmos
+nomes se repetem em milhares de workflows parseados: ferramentas
+(google_drive, email_service), chaves de parâmetros (action, query,
+format), bancos, propriedades de classes. Sem internação, cada parse guarda
+uma cópia própria de cada um.
+
+Com um InternTable o parser devolve sempre a mesma instância para um texto
+já visto:
+  - nomes de funções, classes e propriedades, variáveis e coleções de FOR
+    EACH, serviços/endpoints de CALL API, tipos e nomes de CONNECT
+  - alvos de referências @tool/@file/@project/@db
+  - chaves dos objetos {...} (parâmetros, payloads, configurações)
+
+Valores de parâmetros e textos livres não são internados: raramente se
+repetem e encheriam a tabela.
+
+A tabela é limitada: cheia, os textos novos passam sem ser guardados (os já
+internados continuam sendo reaproveitados), sem despejo e sem custo extra.
+shared_table() devolve uma tabela única por processo.
+
+Uso:
+    from interning import shared_table
+    result = parse_ast(conteudo, interning=shared_table())
+    shared_table().stats()
+"""
+
+import sys
+import threading
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_SIZE = 65536
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+class InternTable:
+    """Textos internados, com limite de tamanho e contadores de uso
+
+    A instância é chamável: table(texto) devolve a cópia canônica. O acesso
+    ao dict é seguro entre threads; os contadores são aproximados sob
+    concorrência.
+    """
+
+    __slots__ = ('max_size', 'total', 'hits', 'saved_bytes', '_strings')
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        if max_size < 0:
+            raise ValueError(f"max_size deve ser >= 0: {max_size}")
+        self.max_size = max_size
+        self.total = 0
+        self.hits = 0
+        # Bytes das cópias descartadas em favor de uma instância já internada
+        self.saved_bytes = 0
+        self._strings = {}
+
+    def __call__(self, text: str) -> str:
+        self.total += 1
+        cached = self._strings.get(text)
+        if cached is not None:
+            if cached is not text:
+                self.hits += 1
+                self.saved_bytes += sys.getsizeof(text)
+            return cached
+        if len(self._strings) < self.max_size:
+            # setdefault: se outra thread internou o mesmo texto, vale o dela
+            return self._strings.setdefault(text, text)
+        return text
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def __contains__(self, text: Any) -> bool:
+        return text in self._strings
+
+    @property
+    def full(self) -> bool:
+        return len(self._strings) >= self.max_size
+
+    def stats(self) -> Dict[str, Any]:
+        """Textos únicos guardados contra o total de textos vistos"""
+        return {
+            'unique': len(self._strings),
+            'total': self.total,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.total if self.total else 0.0,
+            'saved_bytes': self.saved_bytes,
+            'max_size': self.max_size,
+            'full': self.full,
+        }
+
+    def clear(self) -> None:
+        """Esvazia a tabela e zera os contadores"""
+        self._strings.clear()
+        self.total = self.hits = self.saved_bytes = 0
+
+
+def shared_table(max_size: Optional[int] = None) -> InternTable:
+    """Tabela única do processo, criada na primeira chamada (max_size só vale nela)"""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = InternTable(DEFAULT_MAX_SIZE if max_size is None else max_size)
+    return _shared
@@ -0,0 +1,79 @@
+"""
+Lexer do LMTagScript
+
+Classifica cada linha do script com um único padrão mestre pré-compilado e
+emite tokens tipados com linha e coluna. O parser consome esses tokens e
+despacha cada um por tabela, de forma que o custo por linha não cresce com
+o número de palavras-chave da linguagem.
+"""
+
+import re
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+# Tipos de token (um por palavra-chave de início de linha)
+TASK = 'TASK'
+ACTION = 'ACTION'
+GOAL = 'GOAL'
+CLASS = 'CLASS'
+DEFINE_FUNCTION = 'DEFINE_FUNCTION'
+CALL_API = 'CALL_API'
+CALL = 'CALL'
+IF = 'IF'
+ELSE = 'ELSE'
+END = 'END'
+REFERENCE = 'REFERENCE'
+FOR_EACH = 'FOR_EACH'
+LOOPGUARD = 'LOOPGUARD'
+ON_ERROR = 'ON_ERROR'
+CONNECT = 'CONNECT'
+TEXT = 'TEXT'
+
+# Padrão mestre: cada alternativa é um grupo nomeado com o tipo do token.
+# A ordem importa apenas entre prefixos em comum (CALL API antes de CALL).
+_MASTER_PATTERN = re.compile(r"""
+    (?P<TASK>TASK:)
+  | (?P<ACTION>ACTION:)
+  | (?P<GOAL>GOAL:)
+  | (?P<CLASS>CLASS\b)
+  | (?P<DEFINE_FUNCTION>DEFINE\s+FUNCTION\b)
+  | (?P<CALL_API>CALL\s+API\b)
+  | (?P<CALL>CALL\b)
+  | (?P<IF>IF\b)
+  | (?P<ELSE>ELSE\b)
+  | (?P<END>END\b)
+  | (?P<REFERENCE>@)
+  | (?P<FOR_EACH>FOR\s+EACH\b)
+  | (?P<LOOPGUARD>LOOPGUARD\b)
+  | (?P<ON_ERROR>ON\s+ERROR\b)
+  | (?P<CONNECT>CONNECT\b)
+""", re.VERBOSE)
+
+
+class Token(NamedTuple):
+    """Token de linha produzido pelo lexer"""
+    type: str     # Tipo do token (TASK, CALL_API, REFERENCE, TEXT, ...)
+    text: str     # Linha sem espaços nas bordas
+    value: str    # Conteúdo após a palavra-chave, sem espaços nas bordas
+    line: int     # Número da linha (1-based)
+    column: int   # Coluna do primeiro caractere não-branco (1-based)
+
+
+def classify_line(raw_line: str, line_number: int) -> Optional[Token]:
+    """Classifica uma linha; retorna None para linhas vazias e comentários"""
+    text = raw_line.strip()
+    if not text or text[0] == '#':
+        return None
+
+    column = raw_line.index(text[0]) + 1
+    match = _MASTER_PATTERN.match(text)
+    if match is None:
+        return Token(TEXT, text, text, line_number, column)
+    return Token(match.lastgroup, text, text[match.end():].strip(), line_number, column)
+
+
+def tokenize(lines: Iterable[str], first_line: int = 1) -> Iterator[Token]:
+    """Gera os tokens de todas as linhas significativas"""
+    for line_number, raw_line in enumerate(lines, first_line):
+        token = classify_line(raw_line, line_number)
+        if token is not None:
+            yield token
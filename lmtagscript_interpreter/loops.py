@@ -0,0 +1,168 @@
+"""
+Execução de FOR EACH: coleções, variáveis do laço, lotes e LOOPGUARD
+
+Peças usadas pelo runtime (runtime.py) para rodar o corpo de um FOR EACH
+uma vez por item:
+  - resolve_collection: encontra a coleção (`itens`, `pedido.itens`,
+    `@db:crm.leads`) nas saídas dos passos anteriores ou no ctx
+  - bind: substitui nos parâmetros do corpo os valores sem aspas que
+    referenciam a variável do laço (`lead.id` -> o id do item corrente);
+    "lead" entre aspas continua sendo o texto
+  - batches: fatia a coleção (lista ou iterador) em lotes, sem materializá-la
+  - LoopGuard: limites do LOOPGUARD aplicados durante a execução
+
+LOOPGUARD { max_depth: 3, max_iterations: 10000, allow_repeat: false }
+  - max_depth: profundidade máxima de FOR EACH aninhados (1 = sem aninhar)
+  - max_iterations: itens executados por laço
+  - allow_repeat: com false, itens iguais a um anterior são pulados
+Com vários LOOPGUARD no script vale a combinação mais restritiva.
+"""
+
+import re
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+from values import QuotedString
+
+# Valor que referencia uma variável: nome com acesso a campos (lead.id, itens.0.sku)
+_PATH_PATTERN = re.compile(r'[A-Za-z_]\w*(?:\.\w+)*')
+_REFERENCE_PREFIX_PATTERN = re.compile(r'@\w+:')
+
+
+class LoopError(RuntimeError):
+    """Falha de um FOR EACH: coleção inválida ou itens que falharam"""
+
+
+class LoopGuardError(LoopError):
+    """Limite do LOOPGUARD excedido"""
+
+
+class LoopGuard:
+    """Limites de LOOPGUARD em vigor (None: sem limite)"""
+
+    __slots__ = ('max_depth', 'max_iterations', 'allow_repeat')
+
+    def __init__(self, max_depth: Optional[int] = None, max_iterations: Optional[int] = None,
+                 allow_repeat: bool = True):
+        self.max_depth = max_depth
+        self.max_iterations = max_iterations
+        self.allow_repeat = allow_repeat
+
+    @classmethod
+    def from_params(cls, guards: Iterable[Dict[str, Any]]) -> 'LoopGuard':
+        """Combina os parâmetros de loop_guards, ficando com o limite mais restritivo"""
+        guard = cls()
+        for params in guards:
+            for name in ('max_depth', 'max_iterations'):
+                if params.get(name) is not None:
+                    limit = int(params[name])
+                    current = getattr(guard, name)
+                    setattr(guard, name, limit if current is None else min(current, limit))
+            if params.get('allow_repeat') in (False, 'false'):
+                guard.allow_repeat = False
+        return guard
+
+    def check_depth(self, depth: int) -> None:
+        if self.max_depth is not None and depth > self.max_depth:
+            raise LoopGuardError(f"FOR EACH aninhado em profundidade {depth} (max_depth={self.max_depth})")
+
+    def check_iterations(self, count: int) -> None:
+        if self.max_iterations is not None and count > self.max_iterations:
+            raise LoopGuardError(f"FOR EACH com mais de {self.max_iterations} itens (max_iterations)")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'max_depth': self.max_depth, 'max_iterations': self.max_iterations,
+                'allow_repeat': self.allow_repeat}
+
+
+class ItemResult:
+    """Resultado do corpo do laço para um item; status é 'ok', 'failed' ou 'skipped'"""
+
+    __slots__ = ('index', 'item', 'status', 'outputs', 'failure')
+
+    def __init__(self, index: int, item: Any, status: str, outputs: Optional[Dict[int, Any]] = None,
+                 failure: Any = None):
+        self.index = index
+        self.item = item
+        self.status = status
+        # Saída dos passos do corpo, por linha
+        self.outputs = outputs or {}
+        # StepResult do passo do corpo que falhou
+        self.failure = failure
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'index': self.index, 'status': self.status, 'outputs': self.outputs}
+        if self.failure is not None:
+            data['failure'] = self.failure.to_dict()
+        return data
+
+    def __repr__(self) -> str:
+        return f"ItemResult({self.index}, {self.status})"
+
+
+def resolve_path(path: str, scope: Mapping[str, Any]) -> Any:
+    """Valor de a.b.c em scope: a chave mais longa (a.b, depois a) e então os campos.
+
+    Levanta LookupError se algum trecho não existir.
+    """
+    parts = path.split('.')
+    for size in range(len(parts), 0, -1):
+        name = '.'.join(parts[:size])
+        if name in scope:
+            value = scope[name]
+            break
+    else:
+        raise LookupError(path)
+    for part in parts[size:]:
+        if isinstance(value, Mapping):
+            value = value[part]
+        elif isinstance(value, (list, tuple)) and part.isdigit():
+            value = value[int(part)]
+        else:
+            try:
+                value = getattr(value, part)
+            except AttributeError:
+                raise LookupError(path) from None
+    return value
+
+
+def resolve_collection(expression: str, ctx: Mapping[str, Any]) -> Iterable[Any]:
+    """Coleção de um FOR EACH: saída de um passo (ctx['results']) ou valor do ctx"""
+    path = _REFERENCE_PREFIX_PATTERN.sub('', expression.strip(), count=1)
+    for scope in (ctx.get('results', {}), ctx):
+        try:
+            collection = resolve_path(path, scope)
+            break
+        except (LookupError, TypeError):
+            continue
+    else:
+        raise LoopError(f"Coleção {expression} não encontrada nas saídas dos passos nem no ctx")
+    if isinstance(collection, (str, bytes, Mapping)) or not isinstance(collection, Iterable):
+        raise LoopError(f"{expression} não é uma coleção ({type(collection).__name__})")
+    return collection
+
+
+def bind(value: Any, variables: Mapping[str, Any]) -> Any:
+    """Substitui em value as strings sem aspas que referenciam uma variável do laço"""
+    if isinstance(value, dict):
+        return {key: bind(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [bind(item, variables) for item in value]
+    if isinstance(value, QuotedString):
+        return value
+    if isinstance(value, str) and _PATH_PATTERN.fullmatch(value) and value.split('.', 1)[0] in variables:
+        try:
+            return resolve_path(value, variables)
+        except (LookupError, TypeError):
+            return value
+    return value
+
+
+def batches(collection: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Lotes de até size itens, consumindo a coleção sob demanda"""
+    iterator = iter(collection)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,301 @@
+"""
+Nós da AST do LMTagScript
+
+Classes compactas com __slots__ (sem __dict__ por instância) para as
+construções parseadas. Em serviços que mantêm milhares de workflows
+parseados em memória, o custo de um dict por nó domina; estes nós ocupam uma
+fração disso.
+
+Com parse_ast(conteudo, spans=True) cada nó recebe também `span`, o trecho
+do código-fonte que ocupa, e os textos e blocos {...} copiados do fonte ficam
+como trechos lidos sob demanda (ver spans.py); to_dict() devolve os valores
+comuns e acrescenta o span.
+
+O formato JSON de parse_tagscript é produzido sob demanda: to_dict() em cada
+nó, to_plain() no resultado inteiro, ou iter_json()/dump_json() para
+serializar direto da AST sem montar os dicts de todos os nós de uma vez.
+Parâmetros, payloads e condições continuam como dados Python nativos.
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+from spans import Span, SpanLines, materialize
+
+# Chave do alvo no dict de cada tipo de referência @
+_REFERENCE_TARGET_KEYS = {
+    'tool': 'tool',
+    'file': 'path',
+    'project': 'project',
+    'database': 'database',
+    'unknown': 'content',
+}
+
+
+class Node:
+    """Base dos nós: igualdade e repr a partir dos slots
+
+    span (só no modo spans=True do parser) fica fora da igualdade e do repr.
+    """
+
+    __slots__ = ('span',)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Um campo por slot, com o '_' final removido (else_ -> else), mais o span
+
+        Trechos do fonte são materializados e nós filhos convertidos. As
+        subclasses sobrescrevem quando o formato JSON difere (nomes de chave,
+        campos opcionais) ou para evitar o laço genérico.
+        """
+        data = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            data[name.rstrip('_')] = _plain(value) if isinstance(value, (Node, list)) else materialize(value)
+        return self._with_span(data)
+
+    def _with_span(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        span = getattr(self, 'span', None)
+        if span is not None:
+            data['span'] = span.to_dict()
+        return data
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: Any) -> bool:
+        return type(self) is type(other) and self._values() == other._values()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class StatementRef(Node):
+    """Statement filho de um bloco: posição na lista do resultado (kind) onde ele está
+
+    kind é a chave da lista ('llm_references', 'if_blocks', 'task', ...) e
+    index a posição nela; os statements continuam nas listas do resultado e
+    os blocos só apontam para eles.
+    """
+
+    __slots__ = ('kind', 'index', 'line_number')
+
+    def __init__(self, kind: str, index: int, line_number: int):
+        self.kind = kind
+        self.index = index
+        self.line_number = line_number
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'kind': self.kind, 'index': self.index, 'line_number': self.line_number}
+
+
+class IfBlock(Node):
+    """IF condição THEN ... [ELSE ...] END
+
+    then/else trazem as linhas de texto livre de cada ramo; body/else_body,
+    os statements de cada ramo (StatementRef).
+    """
+
+    __slots__ = ('condition', 'then', 'else_', 'line_number', 'body', 'else_body')
+
+    def __init__(self, condition: Dict[str, Any], line_number: int, then: str = '', else_: str = '',
+                 body: Optional[List[StatementRef]] = None, else_body: Optional[List[StatementRef]] = None):
+        self.condition = condition
+        self.then = then
+        self.else_ = else_
+        self.line_number = line_number
+        self.body = body if body is not None else []
+        self.else_body = else_body if else_body is not None else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._with_span({'condition': self.condition, 'then': materialize(self.then),
+                                'else': materialize(self.else_), 'line_number': self.line_number,
+                                'body': _plain(self.body), 'else_body': _plain(self.else_body)})
+
+
+class LLMReference(Node):
+    """Referência @tool/@file/@project/@db, com parâmetros {...} opcionais"""
+
+    __slots__ = ('type', 'target', 'parameters', 'line_number')
+
+    def __init__(self, type: str, target: str, parameters: Optional[Any] = None,
+                 line_number: Optional[int] = None):
+        self.type = type
+        self.target = target
+        # None quando a referência não tem bloco {...}
+        self.parameters = parameters
+        # None na referência embutida em CALL API @... (a linha é a da chamada)
+        self.line_number = line_number
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'type': self.type, _REFERENCE_TARGET_KEYS[self.type]: self.target}
+        if self.parameters is not None:
+            data['parameters'] = materialize(self.parameters)
+        if self.line_number is not None:
+            data['line_number'] = self.line_number
+        return self._with_span(data)
+
+
+class ApiCall(Node):
+    """CALL API servico.endpoint WITH payload (ou CALL API @referência WITH payload)"""
+
+    __slots__ = ('service', 'endpoint', 'payload', 'reference', 'line_number')
+
+    def __init__(self, service: Optional[str], endpoint: Optional[str], payload: Any,
+                 reference: Optional[LLMReference] = None, line_number: Optional[int] = None):
+        self.service = service
+        self.endpoint = endpoint
+        self.payload = payload
+        self.reference = reference
+        self.line_number = line_number
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.reference is not None:
+            return self._with_span({'type': 'llm_api', 'reference': self.reference.to_dict(),
+                                    'payload': materialize(self.payload), 'line_number': self.line_number})
+        return self._with_span({'service': self.service, 'endpoint': self.endpoint,
+                                'payload': materialize(self.payload), 'line_number': self.line_number})
+
+
+class FunctionDef(Node):
+    """DEFINE FUNCTION com TASK/ACTION/GOAL do corpo"""
+
+    __slots__ = ('name', 'task', 'action', 'goal', 'line_number')
+
+    def __init__(self, name: str, line_number: int, task: str = '', action: str = '', goal: str = ''):
+        self.name = name
+        self.task = task
+        self.action = action
+        self.goal = goal
+        self.line_number = line_number
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._with_span({'name': self.name, 'task': materialize(self.task),
+                                'action': materialize(self.action), 'goal': materialize(self.goal),
+                                'line_number': self.line_number})
+
+
+class ClassDef(Node):
+    """CLASS com as propriedades 'nome: tipo' do corpo"""
+
+    __slots__ = ('name', 'properties', 'methods', 'line_number')
+
+    def __init__(self, name: str, line_number: int, properties: Optional[Dict[str, str]] = None,
+                 methods: Optional[List[Any]] = None):
+        self.name = name
+        self.properties = properties if properties is not None else {}
+        self.methods = methods if methods is not None else []
+        self.line_number = line_number
+
+    def to_dict(self) -> Dict[str, Any]:
+        properties = {key: materialize(value) for key, value in self.properties.items()}
+        return self._with_span({'name': self.name, 'properties': properties, 'methods': self.methods,
+                                'line_number': self.line_number})
+
+
+class Call(Node):
+    """CALL funcao(argumentos)"""
+
+    __slots__ = ('function', 'arguments', 'line_number')
+
+    def __init__(self, function: str, arguments: str, line_number: int):
+        self.function = function
+        self.arguments = arguments
+        self.line_number = line_number
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._with_span({'function': self.function, 'arguments': materialize(self.arguments),
+                                'line_number': self.line_number})
+
+
+class ForLoop(Node):
+    """FOR EACH variavel IN colecao [DO] ... END: o corpo são as linhas entre as duas
+    (end_line None se não houver END) e body, os statements delas"""
+
+    __slots__ = ('variable', 'collection', 'line_number', 'end_line', 'body')
+
+    def __init__(self, variable: str, collection: str, line_number: Optional[int] = None,
+                 end_line: Optional[int] = None, body: Optional[List[StatementRef]] = None):
+        self.variable = variable
+        self.collection = collection
+        self.line_number = line_number
+        self.end_line = end_line
+        self.body = body if body is not None else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._with_span({'variable': self.variable, 'collection': self.collection,
+                                'line_number': self.line_number, 'end_line': self.end_line,
+                                'body': _plain(self.body)})
+
+
+class ErrorHandler(Node):
+    """ON ERROR ... END: intervalo de linhas do tratador (end_line None se não houver END)
+    e body, os statements dele"""
+
+    __slots__ = ('line_number', 'end_line', 'body')
+
+    def __init__(self, line_number: int, end_line: Optional[int] = None,
+                 body: Optional[List[StatementRef]] = None):
+        self.line_number = line_number
+        self.end_line = end_line
+        self.body = body if body is not None else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._with_span({'line_number': self.line_number, 'end_line': self.end_line,
+                                'body': _plain(self.body)})
+
+
+class Connection(Node):
+    """CONNECT TO tipo AS nome { propriedade: valor, ... }
+
+    Valores ENV("VAR") ficam como {'env': 'VAR'} e só são resolvidos na
+    execução (ver connections.py).
+    """
+
+    __slots__ = ('type', 'name', 'config', 'line_number')
+
+    def __init__(self, type: str, name: str, config: Dict[str, Any], line_number: int):
+        self.type = type
+        self.name = name
+        self.config = config
+        self.line_number = line_number
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._with_span({'type': self.type, 'name': self.name, 'config': self.config,
+                                'line_number': self.line_number})
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Node):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [item.to_dict() if isinstance(item, Node) else materialize(item) for item in value]
+    return value
+
+
+def to_plain(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte um resultado com nós no formato de parse_tagscript"""
+    return {key: _plain(value) for key, value in result.items()}
+
+
+def json_default(value: Any) -> Any:
+    """default= para json.dump/json.dumps que aceita nós da AST"""
+    if isinstance(value, Node):
+        return value.to_dict()
+    if isinstance(value, (Span, SpanLines)):
+        return value.materialize()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def iter_json(result: Dict[str, Any], **options) -> Iterator[str]:
+    """Serializa um resultado com nós em pedaços, convertendo um nó por vez"""
+    options.setdefault('ensure_ascii', False)
+    return json.JSONEncoder(default=json_default, **options).iterencode(result)
+
+
+def dump_json(result: Dict[str, Any], out: TextIO, **options) -> None:
+    """Escreve o JSON de um resultado com nós em out, sem montar o dict completo"""
+    for chunk in iter_json(result, **options):
+        out.write(chunk)
@@ -0,0 +1,283 @@
+"""
+Análise estática de dependências e plano de execução paralela
+
+O parser emite listas planas (calls, api_calls, llm_references, if_blocks,
+for_loops). Este módulo infere as dependências de dados entre os statements e
+monta um DAG com estágios em ordem topológica: os statements de um mesmo
+estágio não dependem uns dos outros e podem rodar em paralelo.
+
+Cada statement produz um nome e usa outros:
+  - @tool:x / @db:x / @project:x / @file:x produz x (e @file:var.campo usa var)
+  - CALL API servico.endpoint produz servico.endpoint
+  - CALL funcao(args) produz funcao e usa os identificadores dos argumentos
+  - FOR EACH var IN colecao produz var e usa colecao
+  - IF usa os identificadores da condição
+  - parâmetros e payloads usam os valores sem aspas que parecem
+    identificadores e as referências ${nome} dentro de qualquer texto; um
+    literal entre aspas ("read", "csv") não é um uso
+
+Um uso de a.b.c casa com o statement anterior mais recente que produziu
+a.b.c, a.b ou a. Valores que não casam com nada produzido antes (literais,
+variáveis de contexto) não geram dependência.
+
+Os statements dentro de ON ERROR formam um plano à parte (error_stages):
+só rodam depois de uma falha, quando o plano normal já foi interrompido.
+"""
+
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from nodes import to_plain
+from values import QuotedString
+
+# Identificadores (com acesso a campos) em argumentos e condições; o prefixo
+# @tipo: de uma referência é descartado
+_IDENTIFIER_PATTERN = re.compile(r'(?:@\w+:)?([A-Za-z_][\w.]*)')
+_QUOTED_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+# Referência explícita dentro de um texto: "Olá ${lead.nome}"
+_INTERPOLATION_PATTERN = re.compile(r'\$\{\s*(?:@\w+:)?([A-Za-z_][\w.]*)\s*\}')
+_KEYWORDS = frozenset(('true', 'false', 'null', 'none', 'AND', 'OR', 'NOT', 'IN', 'CONTAINS', 'IS', 'NULL'))
+
+_BLOCK_KEYS = ('if_blocks', 'for_loops', 'error_handlers')
+
+_TARGET_KEYS = {'tool': 'tool', 'file': 'path', 'project': 'project', 'database': 'database'}
+
+
+class PlanNode:
+    """Statement do plano com o que produz, o que usa e de quem depende"""
+
+    __slots__ = ('id', 'kind', 'line_number', 'source', 'produces', 'uses', 'depends_on', 'on_error')
+
+    def __init__(self, id: str, kind: str, line_number: int, source: Tuple[str, int],
+                 produces: Optional[str], uses: List[str], on_error: bool = False):
+        self.id = id
+        self.kind = kind
+        self.line_number = line_number
+        # (chave no resultado do parser, índice na lista)
+        self.source = source
+        self.produces = produces
+        self.uses = uses
+        self.depends_on = []
+        self.on_error = on_error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'kind': self.kind, 'line_number': self.line_number,
+                'produces': self.produces, 'uses': self.uses, 'depends_on': self.depends_on,
+                'on_error': self.on_error}
+
+    def __repr__(self) -> str:
+        return f"PlanNode({self.id!r}, depende de {self.depends_on})"
+
+
+class ExecutionPlan:
+    """DAG de statements com estágios, caminho crítico e largura máxima"""
+
+    def __init__(self, nodes: List[PlanNode]):
+        self.nodes = {node.id: node for node in nodes}
+        self.stages = _stages([node for node in nodes if not node.on_error])
+        self.error_stages = _stages([node for node in nodes if node.on_error])
+        self.critical_path = self._critical_path()
+
+    @property
+    def critical_path_length(self) -> int:
+        """Número de statements no caminho crítico (= número de estágios)"""
+        return len(self.stages)
+
+    @property
+    def max_width(self) -> int:
+        """Maior número de statements independentes em um mesmo estágio"""
+        return max((len(stage) for stage in self.stages), default=0)
+
+    @property
+    def edges(self) -> int:
+        return sum(len(node.depends_on) for node in self.nodes.values())
+
+    def _critical_path(self) -> List[str]:
+        """Uma cadeia de dependências que atravessa todos os estágios"""
+        if not self.stages:
+            return []
+        level = {node_id: index for index, stage in enumerate(self.stages) for node_id in stage}
+        path = [self.stages[-1][0]]
+        while level[path[-1]]:
+            node = self.nodes[path[-1]]
+            # O predecessor no estágio imediatamente anterior sempre existe
+            path.append(next(dependency for dependency in node.depends_on
+                             if level.get(dependency) == level[path[-1]] - 1))
+        return path[::-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'nodes': [node.to_dict() for node in self.nodes.values()],
+            'stages': self.stages,
+            'error_stages': self.error_stages,
+            'critical_path': self.critical_path,
+            'critical_path_length': self.critical_path_length,
+            'max_width': self.max_width,
+            'edges': self.edges,
+        }
+
+
+def _stages(nodes: List[PlanNode]) -> List[List[str]]:
+    """Estágios por nível (maior caminho até o nó), ignorando dependências de fora do grupo"""
+    level = {}
+    stages = []
+    # Os nós estão em ordem de linha e só dependem de linhas anteriores
+    for node in nodes:
+        depth = 1 + max((level[dependency] for dependency in node.depends_on if dependency in level),
+                        default=-1)
+        level[node.id] = depth
+        if depth == len(stages):
+            stages.append([])
+        stages[depth].append(node.id)
+    return stages
+
+
+def names_in(text: str) -> List[str]:
+    """Identificadores usados em um argumento ou condição, sem literais e palavras-chave"""
+    names = []
+    for name in _IDENTIFIER_PATTERN.findall(_QUOTED_PATTERN.sub(' ', text)):
+        name = name.rstrip('.')
+        if name and name not in _KEYWORDS and name not in names:
+            names.append(name)
+    return names
+
+
+def _names_in_value(value: Any, names: List[str]) -> None:
+    """Nomes usados por parâmetros/payload: textos sem aspas com a forma de um identificador e ${...}
+
+    Um resultado que passou por JSON (cache) não distingue mais os textos
+    entre aspas (QuotedString); eles voltam a contar, o que só acrescenta
+    dependências.
+    """
+    if isinstance(value, dict):
+        for item in value.values():
+            _names_in_value(item, names)
+    elif isinstance(value, list):
+        for item in value:
+            _names_in_value(item, names)
+    elif isinstance(value, str):
+        if '${' in value:
+            for name in _INTERPOLATION_PATTERN.findall(value):
+                name = name.rstrip('.')
+                if name not in names:
+                    names.append(name)
+            return
+        if isinstance(value, QuotedString):
+            return
+        match = _IDENTIFIER_PATTERN.fullmatch(value.strip())
+        if match and match.group(1) not in _KEYWORDS and match.group(1) not in names:
+            names.append(match.group(1))
+
+
+def _condition_names(condition: Any, names: List[str]) -> None:
+    if isinstance(condition, dict):
+        for key, value in condition.items():
+            if key in ('type', 'operator'):
+                continue
+            _condition_names(value, names)
+    elif isinstance(condition, list):
+        for item in condition:
+            _condition_names(item, names)
+    elif isinstance(condition, str):
+        for name in names_in(condition):
+            if name not in names:
+                names.append(name)
+
+
+def _statements(result: Dict[str, Any]) -> Iterator[Tuple[str, str, int, Tuple[str, int], Optional[str], List[str]]]:
+    """(id, tipo, linha, origem, nome produzido, nomes usados) de cada statement"""
+    for index, reference in enumerate(result.get('llm_references', [])):
+        kind = reference['type']
+        if kind not in _TARGET_KEYS:
+            continue
+        target = reference[_TARGET_KEYS[kind]]
+        uses = []
+        if kind == 'file':
+            # Caminho dinâmico (@file:arquivo.path) usa a variável que o fornece
+            _names_in_value(target, uses)
+        _names_in_value(reference.get('parameters'), uses)
+        line = reference.get('line_number')
+        yield f"{kind}:{target}@{line}", kind, line, ('llm_references', index), target, uses
+
+    for index, api_call in enumerate(result.get('api_calls', [])):
+        uses = []
+        _names_in_value(api_call['payload'], uses)
+        reference = api_call.get('reference')
+        if reference is not None:
+            kind = reference['type']
+            target = reference.get(_TARGET_KEYS.get(kind, 'content'))
+        else:
+            kind, target = 'api', f"{api_call['service']}.{api_call['endpoint']}"
+        line = api_call.get('line_number')
+        yield f"{kind}:{target}@{line}", kind, line, ('api_calls', index), target, uses
+
+    for index, call in enumerate(result.get('calls', [])):
+        line = call['line_number']
+        yield (f"call:{call['function']}@{line}", 'call', line, ('calls', index), call['function'],
+               names_in(call['arguments']))
+
+    for index, if_block in enumerate(result.get('if_blocks', [])):
+        uses = []
+        _condition_names(if_block['condition'], uses)
+        line = if_block['line_number']
+        yield f"if@{line}", 'if', line, ('if_blocks', index), None, uses
+
+    for index, for_loop in enumerate(result.get('for_loops', [])):
+        line = for_loop['line_number']
+        yield (f"for:{for_loop['variable']}@{line}", 'for', line, ('for_loops', index), for_loop['variable'],
+               names_in(for_loop['collection']))
+
+
+def _producer(name: str, produced: Dict[str, str]) -> Optional[str]:
+    """Statement mais recente que produziu name ou um prefixo dele (a.b.c, a.b, a)"""
+    while True:
+        if name in produced:
+            return produced[name]
+        if '.' not in name:
+            return None
+        name = name.rsplit('.', 1)[0]
+
+
+def block_parents(result: Dict[str, Any]) -> Dict[Tuple[str, int], Tuple[str, int]]:
+    """Bloco (IF, FOR EACH ou ON ERROR) que contém diretamente cada statement.
+
+    Chaves e valores são origens (lista do resultado, índice), lidas dos
+    body/else_body dos blocos.
+    """
+    parents = {}
+    for key in _BLOCK_KEYS:
+        for index, block in enumerate(result.get(key, [])):
+            for ref in block.get('body', []) + block.get('else_body', []):
+                parents[(ref['kind'], ref['index'])] = (key, index)
+    return parents
+
+
+def enclosing_block(source: Tuple[str, int], parents: Dict[Tuple[str, int], Tuple[str, int]],
+                    kind: str) -> Optional[Tuple[str, int]]:
+    """Bloco do tipo kind ('for_loops', 'error_handlers', ...) mais interno que contém source"""
+    source = parents.get(source)
+    while source is not None and source[0] != kind:
+        source = parents.get(source)
+    return source
+
+
+def plan_workflow(result: Dict[str, Any]) -> ExecutionPlan:
+    """Monta o plano de execução de um resultado de parse_tagscript ou parse_ast"""
+    result = to_plain(result)
+    parents = block_parents(result)
+
+    nodes = []
+    for node_id, kind, line, source, produces, uses in _statements(result):
+        on_error = enclosing_block(source, parents, 'error_handlers') is not None
+        nodes.append(PlanNode(node_id, kind, line or 0, source, produces, uses, on_error))
+    nodes.sort(key=lambda node: node.line_number)
+
+    produced = {}
+    for node in nodes:
+        for name in node.uses:
+            producer = _producer(name, produced)
+            if producer is not None and producer not in node.depends_on:
+                node.depends_on.append(producer)
+        if node.produces:
+            produced[node.produces] = node.id
+    return ExecutionPlan(nodes)
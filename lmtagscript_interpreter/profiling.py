@@ -0,0 +1,156 @@
+"""
+Profiling embutido do parser LMTagScript
+
+Um ParserProfile anexado a um TagScriptParser registra, para cada handler da
+tabela de despacho e para os helpers mais caros (_parse_multiline_json,
+_parse_condition, ...), o número de chamadas, o tempo acumulado e os bytes
+de código-fonte consumidos, além dos statements mais lentos com seus números
+de linha.
+
+A instrumentação é instalada por instância, apenas quando um profile é
+passado ao parser: sem profile não há nenhum wrapper e o custo é zero.
+"""
+
+import heapq
+import time
+from itertools import count
+from typing import Any, Callable, Dict, List, Sequence
+
+# Helpers instrumentados e como medir os bytes consumidos em cada chamada
+_HELPER_SIZES: Dict[str, Callable[[tuple, Any], int]] = {
+    '_parse_multiline_json': lambda args, result: _lines_bytes(args[0], args[1], result[1]),
+    '_parse_reference_target': lambda args, result: _lines_bytes(args[1], args[2], result[2]),
+    '_parse_condition': lambda args, result: len(args[0]),
+    '_parse_llm_reference': lambda args, result: len(args[0]),
+}
+
+
+def _lines_bytes(lines: Sequence[str], start: int, consumed: int) -> int:
+    """Tamanho das linhas consumidas, incluindo as quebras de linha"""
+    return sum(len(line) + 1 for line in lines[start:start + consumed])
+
+
+class HandlerStats:
+    """Contadores de um handler: chamadas, tempo acumulado e bytes consumidos"""
+
+    __slots__ = ('calls', 'seconds', 'bytes', 'active')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        # Chamadas em andamento: em recursões só a externa soma tempo
+        self.active = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'calls': self.calls, 'seconds': self.seconds, 'bytes': self.bytes}
+
+
+class ParserProfile:
+    """Estatísticas de profiling coletadas por um ou mais parsers"""
+
+    def __init__(self, slowest: int = 10):
+        self.handlers: Dict[str, HandlerStats] = {}
+        self.max_slowest = slowest
+        self._slowest = []
+        self._sequence = count()
+
+    def attach(self, parser) -> None:
+        """Instrumenta os handlers e helpers de um parser"""
+        for token_type, handler in list(parser._handlers.items()):
+            parser._handlers[token_type] = self._wrap_handler(handler)
+        for name, size in _HELPER_SIZES.items():
+            setattr(parser, name, self._wrap_helper(getattr(parser, name), size))
+
+    @property
+    def slowest(self) -> List[Dict[str, Any]]:
+        """Statements mais lentos, do mais lento para o mais rápido"""
+        return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+
+    def _stats(self, name: str) -> HandlerStats:
+        stats = self.handlers.get(name)
+        if stats is None:
+            stats = self.handlers[name] = HandlerStats()
+        return stats
+
+    def _wrap_handler(self, handler: Callable) -> Callable:
+        stats = self._stats(handler.__name__)
+
+        def profiled(token, lines, line_index):
+            # Um handler que falha conta como uma linha (recuperação de erros)
+            consumed = 1
+            started = time.perf_counter()
+            try:
+                consumed = handler(token, lines, line_index)
+                return consumed
+            finally:
+                elapsed = time.perf_counter() - started
+                stats.calls += 1
+                stats.seconds += elapsed
+                stats.bytes += _lines_bytes(lines, line_index, consumed)
+                self._record_statement(elapsed, token, consumed)
+
+        return profiled
+
+    def _wrap_helper(self, helper: Callable, size: Callable[[tuple, Any], int]) -> Callable:
+        stats = self._stats(helper.__name__)
+
+        def profiled(*args, **kwargs):
+            stats.calls += 1
+            stats.active += 1
+            started = time.perf_counter()
+            try:
+                result = helper(*args, **kwargs)
+            finally:
+                stats.active -= 1
+                if not stats.active:
+                    stats.seconds += time.perf_counter() - started
+            stats.bytes += size(args, result)
+            return result
+
+        return profiled
+
+    def _record_statement(self, elapsed: float, token, consumed: int) -> None:
+        entry = {
+            'line': token.line,
+            'end_line': token.line + consumed - 1,
+            'kind': token.type,
+            'seconds': elapsed,
+            'text': token.text[:80],
+        }
+        item = (elapsed, next(self._sequence), entry)
+        if len(self._slowest) < self.max_slowest:
+            heapq.heappush(self._slowest, item)
+        elif elapsed > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Relatório em formato serializável (usado por --profile json)"""
+        return {
+            'handlers': {name: stats.to_dict() for name, stats in self._by_time()},
+            'slowest': self.slowest,
+        }
+
+    def format_table(self) -> str:
+        """Relatório em tabela (usado por --profile)"""
+        rows = [
+            f"{'handler':<34} {'chamadas':>9} {'total ms':>10} {'µs/chamada':>11} {'bytes':>10}",
+            '-' * 78,
+        ]
+        for name, stats in self._by_time():
+            per_call = stats.seconds * 1e6 / stats.calls
+            rows.append(f"{name:<34} {stats.calls:>9} {stats.seconds * 1000:>10.2f} "
+                        f"{per_call:>11.2f} {stats.bytes:>10}")
+        if self._slowest:
+            rows.append('')
+            rows.append('Statements mais lentos:')
+            for entry in self.slowest:
+                lines = (f"{entry['line']}" if entry['end_line'] == entry['line']
+                         else f"{entry['line']}-{entry['end_line']}")
+                rows.append(f"  linha {lines:<11} {entry['kind']:<16} {entry['seconds'] * 1000:>8.3f} ms  "
+                            f"{entry['text']}")
+        return '\n'.join(rows)
+
+    def _by_time(self):
+        called = [(name, stats) for name, stats in self.handlers.items() if stats.calls]
+        return sorted(called, key=lambda item: -item[1].seconds)
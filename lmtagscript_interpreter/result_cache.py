@@ -0,0 +1,180 @@
+"""
+Cache de resultados de passos executados (@tool, @db, CALL API, ...)
+
+Uma mesma referência, como `@tool:google_drive { action: "list_files" }`,
+costuma aparecer várias vezes em um workflow e se repetir entre execuções.
+Com um ResultCache, as chamadas idênticas a ferramentas marcadas como
+cacheáveis são executadas uma vez e reaproveitadas:
+
+  - chave: SHA-256 da forma canônica de (tipo, alvo, parâmetros), com as
+    chaves dos objetos ordenadas
+  - opt-in por tipo ou por alvo, cada um com seu TTL (cacheable())
+  - LRU com número máximo de entradas; entradas vencidas são descartadas
+  - single-flight: chamadas idênticas simultâneas esperam a primeira em vez
+    de repetir a execução; cancelar uma delas só cancela a execução
+    compartilhada quando não resta ninguém esperando
+  - métricas: acertos, faltas, chamadas agrupadas, descartes e taxa de acerto
+
+Falhas não são guardadas. Escritas (params com operation insert/update,
+como em @db) nunca passam pelo cache nem são agrupadas: duas escritas
+idênticas gravam duas vezes. Saídas de uso único (iteradores, ou objetos com
+cacheable = False, como o RowStream de um SELECT) são compartilhadas entre
+chamadas simultâneas, mas não são guardadas. As saídas em cache são
+compartilhadas (não são copiadas): os handlers não devem alterar a saída
+recebida de outro passo.
+
+Uso com o runtime:
+    results = ResultCache(max_entries=4096)
+    results.cacheable('tool', 'google_drive', ttl=300)
+    results.cacheable('project', ttl=60)
+    run_workflow(result, registry, cache=results)
+
+Outros executores usam call(step, compute) diretamente, onde step tem kind,
+target e params e compute() devolve um awaitable com a saída.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from database import WRITE_OPERATIONS
+
+
+def result_key(kind: str, target: str, params: Any) -> str:
+    """Chave canônica de uma chamada: SHA-256 de tipo, alvo e parâmetros"""
+    canonical = json.dumps([kind, target, params], sort_keys=True, separators=(',', ':'),
+                           ensure_ascii=False, default=repr)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class _Flight:
+    """Execução compartilhada em andamento e quantos passos a esperam"""
+
+    __slots__ = ('future', 'waiters')
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+class ResultCache:
+    """Cache LRU com TTL e single-flight para saídas de passos"""
+
+    def __init__(self, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        # chave -> (saída, instante de expiração ou None)
+        self._entries = OrderedDict()
+        self._inflight = {}
+        # (tipo, alvo ou None) -> TTL em segundos (None: sem expiração)
+        self._policies = {}
+
+    def cacheable(self, kind: str, target: Optional[str] = None, ttl: Optional[float] = 60.0) -> None:
+        """Marca um tipo de passo (ou só um alvo dele) como cacheável, com TTL"""
+        self._policies[(kind, target)] = ttl
+
+    def policy(self, kind: str, target: str) -> Tuple[bool, Optional[float]]:
+        """(cacheável, TTL) de um passo: o alvo exato vale mais que o tipo"""
+        for candidate in ((kind, target), (kind, None)):
+            if candidate in self._policies:
+                return True, self._policies[candidate]
+        return False, None
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(encontrado, saída) de uma chave, descartando a entrada se venceu"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        output, expires = entry
+        if expires is not None and self.clock() >= expires:
+            del self._entries[key]
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, output
+
+    def put(self, key: str, output: Any, ttl: Optional[float] = None) -> None:
+        expires = None if ttl is None else self.clock() + ttl
+        self._entries[key] = (output, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def call(self, step: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Saída do passo: do cache, de uma execução idêntica em andamento ou de compute()"""
+        enabled, ttl = self.policy(step.kind, step.target)
+        if not enabled or _is_write(step.params):
+            return await compute()
+
+        key = result_key(step.kind, step.target, step.params)
+        found, output = self.get(key)
+        if found:
+            self.hits += 1
+            return output
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            flight = _Flight(asyncio.ensure_future(compute()))
+            self._inflight[key] = flight
+            # Registrado antes de qualquer espera: a saída entra no cache antes
+            # de os passos retomarem, mesmo que quem iniciou tenha sido cancelado
+            flight.future.add_done_callback(lambda future: self._land(key, flight, ttl))
+
+        flight.waiters += 1
+        try:
+            # shield: cancelar quem espera não cancela a execução compartilhada...
+            return await asyncio.shield(flight.future)
+        finally:
+            flight.waiters -= 1
+            # ...a menos que ninguém mais a espere
+            if not flight.waiters and not flight.future.done():
+                flight.future.cancel()
+
+    def _land(self, key: str, flight: _Flight, ttl: Optional[float]) -> None:
+        """Fim de uma execução compartilhada: guarda a saída se ela terminou bem"""
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        future = flight.future
+        if not future.cancelled() and future.exception() is None and _storable(future.result()):
+            self.put(key, future.result(), ttl)
+
+    def clear(self) -> None:
+        """Descarta todas as entradas (as métricas são mantidas)"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fração das chamadas cacheáveis atendidas sem nova execução"""
+        served = self.hits + self.coalesced
+        total = served + self.misses
+        return served / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'coalesced': self.coalesced, 'evictions': self.evictions,
+                'expirations': self.expirations, 'hit_rate': round(self.hit_rate, 4)}
+
+
+def _is_write(params: Any) -> bool:
+    """Passo que altera dados: repetir a chamada não é o mesmo que reaproveitar a saída"""
+    return isinstance(params, dict) and str(params.get('operation', '')).lower() in WRITE_OPERATIONS
+
+
+def _storable(output: Any) -> bool:
+    """Saída que pode ser entregue de novo: não é um iterador nem se declara de uso único"""
+    return not isinstance(output, Iterator) and getattr(output, 'cacheable', True)
@@ -0,0 +1,654 @@
+"""
+Runtime assíncrono do LMTagScript
+
+Executa o resultado de TagScriptParser (parse_tagscript ou parse_ast): cada
+referência @tool/@file/@project/@db e cada CALL API vira um passo, despachado
+para um handler assíncrono registrado em um HandlerRegistry. Os passos
+independentes rodam concorrentemente, limitados por um semáforo global
+(concurrency).
+
+Passos que usam o nome produzido por outro (ver planner.py) esperam o término
+dele; a saída fica em ctx['results'][nome].
+
+ON ERROR: os passos dentro dos blocos ON ERROR ... END não rodam na execução
+normal. Quando um passo falha, os passos ainda pendentes são cancelados e os
+passos de todos os blocos ON ERROR são executados, com a falha disponível em
+ctx['error']. Sem ON ERROR, a falha é levantada como WorkflowError.
+
+IF/ELSE: um passo dentro de um IF só roda se o seu ramo for o escolhido; o
+outro ramo fica como 'skipped'. A condição (if_blocks[].condition) é
+compilada no primeiro uso (conditions.compile_condition) e avaliada quando o
+passo fica pronto, sobre as saídas em ctx['results'] e o ctx; uma condição
+inválida falha só os passos do IF, e o ON ERROR é executado. No corpo de um FOR
+EACH, as condições que dependem só do item e de fora do laço são avaliadas
+para o lote inteiro de uma vez (Condition.evaluate_many).
+
+Handlers recebem (step, ctx) e devolvem a saída do passo. Funções async
+(também dentro de functools.partial ou como __call__ de um objeto) rodam no
+loop; as demais são tratadas como síncronas e rodam no executor padrão, sem
+bloqueá-lo. Se um handler síncrono devolver um awaitable (um lambda que
+chama uma função async, por exemplo), ele é aguardado no loop.
+
+FOR EACH: os passos dentro do corpo do laço (até o END) não rodam sozinhos; o
+laço vira um passo que resolve a coleção (ver loops.py) e executa o corpo uma
+vez por item, com a variável do laço em ctx['results'][variavel] e os
+parâmetros que a referenciam já substituídos. Os itens são processados em
+lotes (batch_size), no máximo loop_workers ao mesmo tempo, e cada ItemResult
+é entregue a on_item assim que termina. Os limites de LOOPGUARD valem durante
+a execução. Um item com falha não interrompe o laço; ao fim, o passo do laço
+falha (LoopError) se algum item falhou.
+
+Com um ResultCache (result_cache.py), chamadas idênticas a passos marcados
+como cacheáveis são executadas uma vez e reaproveitadas, inclusive entre
+execuções que compartilham o mesmo cache.
+
+FakeRegistry registra handlers em memória que gravam as chamadas, para testar
+workflows sem rede.
+
+Uso:
+    registry = HandlerRegistry()
+
+    @registry.handler('tool', 'busca')
+    async def busca(step, ctx):
+        return await cliente.buscar(**step.params)
+
+    result = run_workflow(parse_tagscript(source), registry, concurrency=8)
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from collections import ChainMap
+from functools import partial
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from conditions import Condition, ConditionError, compile_condition
+from loops import ItemResult, LoopError, LoopGuard, batches, bind, resolve_collection
+from nodes import to_plain
+from planner import block_parents, enclosing_block, plan_workflow
+from result_cache import result_key
+
+if TYPE_CHECKING:
+    from result_cache import ResultCache
+
+
+logger = logging.getLogger(__name__)
+
+# Tipos de referência @ executáveis (referências 'unknown' são ignoradas)
+REFERENCE_KINDS = ('tool', 'file', 'project', 'database')
+EXECUTABLE_KINDS = REFERENCE_KINDS + ('api',)
+# Passo de um FOR EACH, executado pelo próprio runtime
+LOOP_KIND = 'for'
+
+
+class WorkflowError(RuntimeError):
+    """Falha de um passo sem ON ERROR que a trate, ou falha dentro do ON ERROR"""
+
+    def __init__(self, failure: 'StepResult', result: 'RunResult'):
+        self.failure = failure
+        self.result = result
+        step = failure.step
+        super().__init__(f"Linha {step.line_number}: {step.key} falhou: {failure.error!r}")
+
+
+class Branch:
+    """Ramo de um IF que contém um passo: o passo só roda se a condição valer taken"""
+
+    __slots__ = ('index', 'tree', 'taken', 'batched', '_condition')
+
+    def __init__(self, index: int, tree: Any, taken: bool):
+        # Índice do bloco em if_blocks e a condição dele, como o parser a deixou
+        self.index = index
+        self.tree = tree
+        # True no corpo do IF, False no ELSE
+        self.taken = taken
+        # No corpo de um FOR EACH: a condição não usa passos do corpo e é avaliada por lote
+        self.batched = False
+        self._condition = None
+
+    @property
+    def condition(self) -> Condition:
+        """Condição compilada no primeiro uso; levanta ConditionError se for inválida"""
+        if self._condition is None:
+            self._condition = compile_condition(self.tree)
+        return self._condition
+
+    def __repr__(self) -> str:
+        return f"Branch(if {self.index}, {'then' if self.taken else 'else'})"
+
+
+class Step:
+    """Passo executável: uma referência @, um CALL API ou um FOR EACH.
+
+    Em um FOR EACH, target é a variável do laço, params a expressão da
+    coleção e body os passos do corpo. branches são os ramos de IF que
+    contêm o passo (do mais interno para o mais externo, até o laço).
+    """
+
+    __slots__ = ('kind', 'target', 'params', 'line_number', 'node', 'id', 'depends_on', 'body', 'branches')
+
+    def __init__(self, kind: str, target: str, params: Any, line_number: Optional[int],
+                 node: Dict[str, Any], id: Optional[str] = None, depends_on: Optional[List[str]] = None,
+                 body: Optional[List['Step']] = None, branches: Tuple[Branch, ...] = ()):
+        self.kind = kind
+        self.target = target
+        self.params = params
+        self.line_number = line_number
+        self.node = node
+        # Identificação no plano (planner.py) e passos que precisam terminar antes
+        self.id = id
+        self.depends_on = depends_on or []
+        self.body = body
+        self.branches = branches
+
+    @property
+    def key(self) -> str:
+        """Identificação do passo: tipo:alvo (ex.: tool:busca, api:crm.criar)"""
+        return f"{self.kind}:{self.target}"
+
+    def __repr__(self) -> str:
+        return f"Step({self.key!r}, linha {self.line_number})"
+
+
+class StepResult:
+    """Saída ou erro de um passo; status é 'ok', 'failed', 'cancelled' ou 'skipped' (ramo de IF não escolhido)"""
+
+    __slots__ = ('step', 'status', 'output', 'error', 'seconds')
+
+    def __init__(self, step: Step, status: str, output: Any = None,
+                 error: Optional[BaseException] = None, seconds: float = 0.0):
+        self.step = step
+        self.status = status
+        self.output = output
+        self.error = error
+        self.seconds = seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'step': self.step.key, 'line_number': self.step.line_number, 'status': self.status,
+                'seconds': round(self.seconds, 6)}
+        if self.status == 'ok':
+            data['output'] = self.output
+        elif self.error is not None:
+            data['error'] = f"{type(self.error).__name__}: {self.error}"
+        return data
+
+    def __repr__(self) -> str:
+        return f"StepResult({self.step.key!r}, {self.status})"
+
+
+class RunResult:
+    """Resultado de uma execução: passos normais, falha (se houve) e passos do ON ERROR"""
+
+    __slots__ = ('steps', 'failure', 'error_steps', 'seconds')
+
+    def __init__(self):
+        self.steps = []
+        self.failure = None
+        self.error_steps = []
+        self.seconds = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """True se nenhum passo falhou (um erro tratado pelo ON ERROR conta como falha)"""
+        return self.failure is None
+
+    @property
+    def outputs(self) -> Dict[int, Any]:
+        """Saída dos passos concluídos, por linha"""
+        return {result.step.line_number: result.output
+                for result in self.steps + self.error_steps if result.status == 'ok'}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'ok': self.ok,
+            'seconds': round(self.seconds, 6),
+            'steps': [result.to_dict() for result in self.steps],
+            'failure': self.failure.to_dict() if self.failure else None,
+            'error_steps': [result.to_dict() for result in self.error_steps],
+        }
+
+
+class _StepFailed(Exception):
+    """Interrompe asyncio.wait(FIRST_EXCEPTION) levando o StepResult da falha"""
+
+    def __init__(self, result: StepResult):
+        super().__init__(result.step.key)
+        self.result = result
+
+
+class HandlerRegistry:
+    """Handlers por tipo de passo, opcionalmente específicos de um alvo.
+
+    Tipos: 'tool', 'file', 'project', 'database' (referências @) e 'api'
+    (CALL API servico.endpoint, com alvo 'servico.endpoint'). A busca tenta o
+    alvo exato, depois (para 'api') só o serviço e por fim o handler do tipo.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+
+    def register(self, kind: str, handler: Callable, target: Optional[str] = None) -> None:
+        self._handlers[(kind, target)] = handler
+
+    def handler(self, kind: str, target: Optional[str] = None) -> Callable[[Callable], Callable]:
+        """Decorator equivalente a register(kind, funcao, target)"""
+        def decorator(function: Callable) -> Callable:
+            self.register(kind, function, target)
+            return function
+        return decorator
+
+    def resolve(self, step: Step) -> Callable:
+        candidates = [step.target]
+        if step.kind == 'api':
+            candidates.append(step.target.split('.', 1)[0])
+        candidates.append(None)
+        for target in candidates:
+            handler = self._handlers.get((step.kind, target))
+            if handler is not None:
+                return handler
+        raise LookupError(f"Nenhum handler registrado para {step.key}")
+
+
+class FakeRegistry(HandlerRegistry):
+    """Handlers em memória para todos os tipos, para testes offline.
+
+    Cada chamada é gravada em calls como (step.key, step.params). responses
+    fixa a saída por chave (o padrão é {'ok': True, 'step': chave}); as chaves
+    em failures levantam RuntimeError; delay simula a latência (segundos).
+    max_active guarda o maior número de chamadas simultâneas observado.
+    """
+
+    def __init__(self, responses: Optional[Dict[str, Any]] = None, failures: Tuple[str, ...] = (),
+                 delay: float = 0.0):
+        super().__init__()
+        self.responses = dict(responses or {})
+        self.failures = set(failures)
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        for kind in EXECUTABLE_KINDS:
+            self.register(kind, self._fake)
+
+    async def _fake(self, step: Step, ctx: Dict[str, Any]) -> Any:
+        self.calls.append((step.key, step.params))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if step.key in self.failures:
+                raise RuntimeError(f"Falha simulada em {step.key}")
+            return self.responses.get(step.key, {'ok': True, 'step': step.key})
+        finally:
+            self.active -= 1
+
+
+def collect_steps(result: Dict[str, Any]) -> Tuple[List[Step], List[Step]]:
+    """Passos do resultado em ordem de linha: (normais, dentro de ON ERROR).
+
+    As dependências vêm do plano estático (planner.py); um passo que depende
+    de um CALL ou IF herda as dependências executáveis deles, e um passo
+    dentro de um IF também as do IF, cuja condição decide se ele roda. Os
+    passos do corpo de um FOR EACH ficam em body do passo do laço, que herda
+    as dependências deles de fora do corpo.
+    """
+    result = to_plain(result)
+    plan = plan_workflow(result)
+    executable = {}
+    for node in plan.nodes.values():
+        key, index = node.source
+        data = result[key][index]
+        if node.kind in EXECUTABLE_KINDS:
+            params = data.get('parameters') if key == 'llm_references' else data['payload']
+            executable[node.id] = Step(node.kind, node.produces, params, node.line_number, data, node.id)
+        elif node.kind == LOOP_KIND:
+            executable[node.id] = Step(LOOP_KIND, node.produces, data['collection'], node.line_number,
+                                       data, node.id, body=[])
+
+    ancestors = {}
+
+    def executable_ancestors(node_id: str) -> List[str]:
+        if node_id not in ancestors:
+            found = []
+            for dependency in plan.nodes[node_id].depends_on:
+                for step_id in ([dependency] if dependency in executable else executable_ancestors(dependency)):
+                    if step_id not in found:
+                        found.append(step_id)
+            ancestors[node_id] = found
+        return ancestors[node_id]
+
+    parents = block_parents(result)
+    if_nodes = {node.source[1]: node.id for node in plan.nodes.values() if node.kind == 'if'}
+    else_bodies = [{(ref['kind'], ref['index']) for ref in block.get('else_body', [])}
+                   for block in result.get('if_blocks', [])]
+
+    def branches_of(source: Tuple[str, int]) -> Tuple[Branch, ...]:
+        branches = []
+        child, parent = source, parents.get(source)
+        # Os IFs acima do laço mais interno decidem se o próprio laço roda
+        while parent is not None and parent[0] != 'for_loops':
+            if parent[0] == 'if_blocks':
+                index = parent[1]
+                branches.append(Branch(index, result['if_blocks'][index]['condition'],
+                                       child not in else_bodies[index]))
+            child, parent = parent, parents.get(parent)
+        return tuple(branches)
+
+    loops = [step for step in executable.values() if step.kind == LOOP_KIND]
+    loop_sources = {plan.nodes[step.id].source: step for step in loops}
+    normal, on_error = [], []
+    for step_id, step in executable.items():
+        step.depends_on = list(executable_ancestors(step_id))
+        step.branches = branches_of(plan.nodes[step_id].source)
+        for branch in step.branches:
+            # A condição só pode ser avaliada depois dos passos que ela usa
+            for dependency in executable_ancestors(if_nodes[branch.index]):
+                if dependency not in step.depends_on:
+                    step.depends_on.append(dependency)
+        loop = loop_sources.get(enclosing_block(plan.nodes[step_id].source, parents, 'for_loops'))
+        if loop is not None:
+            loop.body.append(step)
+        else:
+            (on_error if plan.nodes[step_id].on_error else normal).append(step)
+
+    # Do laço mais interno para o mais externo: o laço espera o que o corpo usa de fora
+    for loop in reversed(loops):
+        inside = {step.id for step in loop.body}
+        for step in loop.body:
+            outside = [step_id for step_id in step.depends_on if step_id not in inside]
+            step.depends_on = [step_id for step_id in step.depends_on if step_id in inside]
+            for step_id in outside:
+                if step_id != loop.id and step_id not in loop.depends_on:
+                    loop.depends_on.append(step_id)
+
+        # Passos do corpo em qualquer nível, inclusive de laços aninhados
+        descendants, pending = set(), list(loop.body)
+        while pending:
+            body_step = pending.pop()
+            descendants.add(body_step.id)
+            pending.extend(body_step.body or ())
+        for step in loop.body:
+            for branch in step.branches:
+                branch.batched = not any(step_id in descendants
+                                         for step_id in executable_ancestors(if_nodes[branch.index]))
+    return normal, on_error
+
+
+class WorkflowRuntime:
+    """Executa workflows parseados com concorrência limitada e ON ERROR"""
+
+    def __init__(self, registry: HandlerRegistry, concurrency: int = 16,
+                 timeout: Optional[float] = None, cache: Optional['ResultCache'] = None,
+                 batch_size: int = 100, loop_workers: int = 16,
+                 on_item: Optional[Callable[[Step, ItemResult], None]] = None):
+        if concurrency < 1:
+            raise ValueError("concurrency deve ser pelo menos 1")
+        if batch_size < 1 or loop_workers < 1:
+            raise ValueError("batch_size e loop_workers devem ser pelo menos 1")
+        self.registry = registry
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.cache = cache
+        self.batch_size = batch_size
+        self.loop_workers = loop_workers
+        self.on_item = on_item
+
+    async def run(self, result: Dict[str, Any], ctx: Optional[Dict[str, Any]] = None) -> RunResult:
+        """Executa o workflow; levanta WorkflowError se uma falha não for tratada"""
+        started = time.perf_counter()
+        normal, on_error = collect_steps(result)
+        ctx = dict(ctx or {})
+        # Saídas dos passos concluídos, pelo nome que produzem (ex.: ctx['results']['vendas'])
+        ctx['results'] = {}
+        ctx['loop_guard'] = LoopGuard.from_params(to_plain(result).get('loop_guards', []))
+        run = RunResult()
+        # Um único limite para a execução inteira, inclusive o ON ERROR
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        run.steps, run.failure = await self._run_steps(normal, ctx, semaphore)
+        if run.failure is not None:
+            if not on_error:
+                run.seconds = time.perf_counter() - started
+                raise WorkflowError(run.failure, run)
+            logger.info("Passo %s falhou; executando ON ERROR (%d passos)",
+                        run.failure.step.key, len(on_error))
+            ctx['error'] = run.failure.to_dict()
+            run.error_steps, handler_failure = await self._run_steps(on_error, ctx, semaphore)
+            if handler_failure is not None:
+                run.seconds = time.perf_counter() - started
+                raise WorkflowError(handler_failure, run)
+        run.seconds = time.perf_counter() - started
+        return run
+
+    async def _run_steps(self, steps: List[Step], ctx: Dict[str, Any],
+                         semaphore: asyncio.Semaphore) -> Tuple[List[StepResult], Optional[StepResult]]:
+        """Roda os passos concorrentemente; a primeira falha cancela os pendentes"""
+        if not steps:
+            return [], None
+        tasks = {}
+        for step in steps:
+            # Dependências de outro grupo (passos normais vistos do ON ERROR) já terminaram
+            dependencies = [tasks[step_id] for step_id in step.depends_on if step_id in tasks]
+            tasks[step.id] = asyncio.ensure_future(self._execute(step, ctx, semaphore, dependencies))
+        tasks = list(tasks.values())
+        try:
+            _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        except asyncio.CancelledError:
+            # Cancelamento de fora (ex.: o laço que roda este corpo): leva junto os passos
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+        results = []
+        failures = []
+        for step, task in zip(steps, tasks):
+            if task.cancelled():
+                results.append(StepResult(step, 'cancelled'))
+            elif isinstance(task.exception(), _StepFailed):
+                results.append(task.exception().result)
+                failures.append(task.exception().result)
+            elif task.exception() is not None:
+                raise task.exception()
+            else:
+                results.append(task.result())
+        # Falhas simultâneas: vale a de menor linha
+        return results, (failures[0] if failures else None)
+
+    async def _execute(self, step: Step, ctx: Dict[str, Any], semaphore: asyncio.Semaphore,
+                       dependencies: List['asyncio.Future']) -> StepResult:
+        if dependencies:
+            # Espera fora do semáforo, sem ocupar uma vaga de concorrência
+            await asyncio.wait(dependencies)
+            if any(task.cancelled() or task.exception() for task in dependencies):
+                raise asyncio.CancelledError()
+        if step.branches:
+            try:
+                taken = self._branches_taken(step, ctx)
+            except Exception as e:
+                raise _StepFailed(StepResult(step, 'failed', error=e)) from e
+            if not taken:
+                return StepResult(step, 'skipped')
+        if step.kind == LOOP_KIND:
+            # O laço não ocupa vaga no semáforo; os passos do corpo ocupam
+            return await self._outcome(step, self._run_loop(step, ctx, semaphore))
+        async with semaphore:
+            result = await self._outcome(step, self._invoke(step, ctx))
+            ctx['results'][step.target] = result.output
+            return result
+
+    @staticmethod
+    def _branches_taken(step: Step, ctx: Dict[str, Any]) -> bool:
+        """Se todos os IFs que contêm o passo escolheram o ramo dele"""
+        # Condições já avaliadas para o lote do laço (ver _batch_branches)
+        decided = ctx.get('branches', {})
+        scope = ChainMap(ctx['results'], ctx)
+        for branch in step.branches:
+            value = decided.get(branch.index)
+            if value is None:
+                value = branch.condition(scope)
+            if value != branch.taken:
+                return False
+        return True
+
+    async def _outcome(self, step: Step, call: Any) -> StepResult:
+        """StepResult da execução, ou _StepFailed com o erro"""
+        started = time.perf_counter()
+        try:
+            output = await call
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug("Passo %s (linha %s) falhou: %r", step.key, step.line_number, e)
+            raise _StepFailed(StepResult(step, 'failed', error=e,
+                                         seconds=time.perf_counter() - started)) from e
+        return StepResult(step, 'ok', output, seconds=time.perf_counter() - started)
+
+    async def _invoke(self, step: Step, ctx: Dict[str, Any]) -> Any:
+        handler = self.registry.resolve(step)
+        if self.cache is not None:
+            call = self.cache.call(step, partial(self._call, handler, step, ctx))
+        else:
+            call = self._call(handler, step, ctx)
+        return await (asyncio.wait_for(call, self.timeout) if self.timeout else call)
+
+    async def _run_loop(self, step: Step, ctx: Dict[str, Any], semaphore: asyncio.Semaphore) -> Dict[str, int]:
+        """Executa o laço inteiro; retorna a contagem de itens por status"""
+        summary = {'items': 0, 'ok': 0, 'failed': 0, 'skipped': 0}
+        first_failure = None
+        async for item_result in self.iter_loop(step, ctx, semaphore):
+            summary['items'] += 1
+            summary[item_result.status] += 1
+            if item_result.failure is not None and (first_failure is None
+                                                    or item_result.index < first_failure.index):
+                first_failure = item_result
+            if self.on_item is not None:
+                self.on_item(step, item_result)
+        if first_failure is not None:
+            failure = first_failure.failure
+            raise LoopError(f"{summary['failed']} de {summary['items']} itens falharam; item "
+                            f"{first_failure.index}: {failure.step.key} falhou: {failure.error!r}") from failure.error
+        return summary
+
+    async def iter_loop(self, step: Step, ctx: Dict[str, Any],
+                        semaphore: Optional[asyncio.Semaphore] = None) -> AsyncIterator[ItemResult]:
+        """Executa o corpo de um FOR EACH por item, gerando cada ItemResult ao terminar.
+
+        A coleção é consumida em lotes de batch_size; dentro de um lote, os
+        resultados saem na ordem em que os itens terminam (ver ItemResult.index).
+        """
+        guard = ctx.get('loop_guard') or LoopGuard()
+        enclosing = ctx.get('loops', ())
+        guard.check_depth(len(enclosing) + 1)
+        collection = resolve_collection(step.params, ctx)
+        semaphore = semaphore or asyncio.Semaphore(self.concurrency)
+        workers = asyncio.Semaphore(self.loop_workers)
+        seen = None if guard.allow_repeat else set()
+        index = executed = 0
+
+        for batch in batches(collection, self.batch_size):
+            scheduled = []
+            for item in batch:
+                if seen is not None:
+                    key = result_key(LOOP_KIND, step.target, item)
+                    if key in seen:
+                        yield ItemResult(index, item, 'skipped')
+                        index += 1
+                        continue
+                    seen.add(key)
+                scheduled.append((index, item))
+                index += 1
+            executed += len(scheduled)
+            guard.check_iterations(executed)
+
+            decided = self._batch_branches(step, [item for _, item in scheduled], ctx)
+            tasks = [asyncio.ensure_future(self._run_item(step, item_index, item, ctx, semaphore, workers,
+                                                          branches))
+                     for (item_index, item), branches in zip(scheduled, decided)]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    @staticmethod
+    def _batch_branches(step: Step, items: List[Any], ctx: Dict[str, Any]) -> List[Dict[int, bool]]:
+        """Condições dos IFs do corpo que não usam passos do corpo, avaliadas para o lote inteiro"""
+        decided = [{} for _ in items]
+        conditions = {}
+        for body_step in step.body:
+            for branch in body_step.branches:
+                if branch.batched and branch.index not in conditions:
+                    try:
+                        conditions[branch.index] = branch.condition
+                    except ConditionError:
+                        # Fica para cada passo avaliar: o erro falha o passo, não o laço inteiro
+                        continue
+        if conditions and items:
+            scope = ChainMap(ctx['results'], ctx)
+            for index, condition in conditions.items():
+                for branches, value in zip(decided, condition.evaluate_many(items, step.target, scope)):
+                    branches[index] = value
+        return decided
+
+    async def _run_item(self, step: Step, index: int, item: Any, ctx: Dict[str, Any],
+                        semaphore: asyncio.Semaphore, workers: asyncio.Semaphore,
+                        branches: Optional[Dict[int, bool]] = None) -> ItemResult:
+        async with workers:
+            loops = ctx.get('loops', ()) + ({'variable': step.target, 'index': index, 'item': item},)
+            variables = {entry['variable']: entry['item'] for entry in loops}
+            item_ctx = dict(ctx)
+            item_ctx['loops'] = loops
+            if branches:
+                item_ctx['branches'] = {**ctx.get('branches', {}), **branches}
+            item_ctx['results'] = dict(ctx['results'])
+            item_ctx['results'][step.target] = item
+
+            body = []
+            for body_step in step.body:
+                target = bind(body_step.target, variables)
+                body.append(Step(body_step.kind, target if isinstance(target, str) else body_step.target,
+                                 bind(body_step.params, variables), body_step.line_number, body_step.node,
+                                 body_step.id, body_step.depends_on, body_step.body, body_step.branches))
+            results, failure = await self._run_steps(body, item_ctx, semaphore)
+            outputs = {result.step.line_number: result.output for result in results if result.status == 'ok'}
+            return ItemResult(index, item, 'failed' if failure else 'ok', outputs, failure)
+
+    @staticmethod
+    async def _call(handler: Callable, step: Step, ctx: Dict[str, Any]) -> Any:
+        if _is_async(handler):
+            return await handler(step, ctx)
+        # Handlers síncronos (E/S bloqueante) rodam fora do loop
+        loop = asyncio.get_running_loop()
+        output = await loop.run_in_executor(None, partial(handler, step, ctx))
+        if inspect.isawaitable(output):
+            # Embrulho síncrono de uma função async: a corrotina roda no loop
+            output = await output
+        return output
+
+
+def _is_async(handler: Callable) -> bool:
+    """Se o handler é uma função async, inclusive dentro de partial ou como __call__"""
+    while isinstance(handler, partial):
+        handler = handler.func
+    if inspect.iscoroutinefunction(handler):
+        return True
+    return inspect.iscoroutinefunction(getattr(type(handler), '__call__', None))
+
+
+def run_workflow(result: Dict[str, Any], registry: HandlerRegistry, ctx: Optional[Dict[str, Any]] = None,
+                 concurrency: int = 16, timeout: Optional[float] = None,
+                 cache: Optional['ResultCache'] = None, **loop_options) -> RunResult:
+    """Atalho síncrono: executa o workflow em um event loop novo.
+
+    loop_options (batch_size, loop_workers, on_item) vão para WorkflowRuntime.
+    """
+    runtime = WorkflowRuntime(registry, concurrency, timeout, cache, **loop_options)
+    return asyncio.run(runtime.run(result, ctx))
@@ -0,0 +1,213 @@
+"""
+Servidor de parsing persistente do LMTagScript (JSON-RPC delimitado por linha)
+
+Fala o mesmo protocolo de packages/mcp/src/server.ts: cada linha é uma
+mensagem {"id", "method", "params": {"source"}} e cada resposta é uma linha
+{"id", "result"} ou {"id", "error": {"message"}}. Métodos:
+  - lmtagscript/validate -> {ok, diagnostics: [{message, line, col, code, severity}]}
+  - lmtagscript/compile  -> {ast, json, warnings}
+
+O processo (e seus workers) permanece vivo entre requisições, então regexes
+compilados e o cache de parsing continuam quentes. As requisições são
+atendidas em paralelo por um pool de workers; as respostas saem na ordem em
+que terminam, identificadas pelo id. Quando há max_pending requisições em
+andamento a leitura da entrada pausa (backpressure). Se um worker morre, as
+requisições afetadas recebem uma resposta de erro e o pool é recriado.
+"""
+
+import io
+import json
+import logging
+import os
+import socketserver
+import threading
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+
+from cache import ParseCache
+from tagscript_parser import TagScriptParser, validate_tagscript
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = '0.1'
+
+# Cache do processo worker (em memória), criado no primeiro compile
+_worker_cache = None
+
+
+def _parse(source: str) -> Tuple[Dict[str, Any], List[Tuple[int, int, str]]]:
+    """Parse completo que mantém as linhas ignoradas pela recuperação de erros"""
+    parser = TagScriptParser()
+    result = parser.parse(source)
+    return result, parser.errors
+
+
+def validate_source(source: str) -> Dict[str, Any]:
+    """lmtagscript/validate: erros de sintaxe e TAGs obrigatórias ausentes (sem montar o resultado)"""
+    diagnostics = []
+    for diagnostic in validate_tagscript(source, require_tags=True):
+        item = {'message': diagnostic.message}
+        if diagnostic.line is not None:
+            item['line'], item['col'] = diagnostic.line, diagnostic.column
+        item['code'], item['severity'] = diagnostic.code, 'error'
+        diagnostics.append(item)
+    return {'ok': not diagnostics, 'diagnostics': diagnostics}
+
+
+def compile_source(source: str) -> Dict[str, Any]:
+    """lmtagscript/compile: resultado do parser como AST e como JSON versionado"""
+    global _worker_cache
+    if _worker_cache is None:
+        _worker_cache = ParseCache()
+    compiled = _worker_cache.get(source)
+    if compiled is None:
+        result, errors = _parse(source)
+        document = {'type': 'LMTagScript', 'version': PROTOCOL_VERSION}
+        document.update(result)
+        compiled = {
+            'ast': result,
+            'json': document,
+            'warnings': [f"linha {line}: {message}" for line, _, message in errors],
+        }
+        _worker_cache.put(source, compiled)
+    return compiled
+
+
+METHODS: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    'lmtagscript/validate': validate_source,
+    'lmtagscript/compile': compile_source,
+}
+
+
+def handle_message(message: Any) -> Dict[str, Any]:
+    """Atende uma mensagem JSON-RPC já decodificada e monta a resposta"""
+    request_id = message.get('id') if isinstance(message, dict) else None
+    try:
+        if not isinstance(message, dict):
+            raise ValueError("Invalid request")
+        method = METHODS.get(message.get('method'))
+        if method is None:
+            raise ValueError("Method not found")
+        params = message.get('params') or {}
+        source = params.get('source') if isinstance(params, dict) else None
+        if not isinstance(source, str):
+            raise ValueError("params.source must be a string")
+        return {'id': request_id, 'result': method(source)}
+    except Exception as e:
+        return {'id': request_id, 'error': {'message': str(e)}}
+
+
+class ParseServer:
+    """Servidor JSON-RPC sobre streams de texto (stdio) ou socket Unix"""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: int = 64):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        # Serializa a troca de um pool quebrado entre as conexões do socket
+        self._executor_lock = threading.Lock()
+
+    def _create_executor(self) -> Executor:
+        # Um único worker roda em thread: sem custo de processos extras
+        if self.workers == 1:
+            return ThreadPoolExecutor(max_workers=1)
+        return ProcessPoolExecutor(max_workers=self.workers)
+
+    def _submit(self, message: Any) -> Future:
+        """Envia a mensagem ao pool; um pool quebrado é trocado por um novo e o erro propagado"""
+        executor = self._executor
+        try:
+            return executor.submit(handle_message, message)
+        except BrokenExecutor:
+            with self._executor_lock:
+                if self._executor is executor:
+                    logger.warning("Pool de workers quebrado; recriando")
+                    executor.shutdown(wait=False)
+                    self._executor = self._create_executor()
+            raise
+
+    def _shutdown(self) -> None:
+        # O pool pode ter sido trocado durante o atendimento: encerra o atual
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def serve(self, reader: TextIO, writer: TextIO) -> None:
+        """Atende requisições de reader até EOF e encerra o pool"""
+        self._executor = self._create_executor()
+        try:
+            self.serve_stream(reader, writer)
+        finally:
+            self._shutdown()
+
+    def serve_unix(self, path: str) -> None:
+        """Atende conexões em um socket Unix, compartilhando o pool de workers"""
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                reader = io.TextIOWrapper(self.rfile, encoding='utf-8')
+                writer = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+                server.serve_stream(reader, writer)
+
+        if os.path.exists(path):
+            os.remove(path)
+        self._executor = self._create_executor()
+        try:
+            with socketserver.ThreadingUnixStreamServer(path, Handler) as unix_server:
+                logger.info(f"Servidor escutando em {path}")
+                try:
+                    unix_server.serve_forever()
+                finally:
+                    os.remove(path)
+        finally:
+            self._shutdown()
+
+    def serve_stream(self, reader, writer) -> None:
+        """Lê mensagens linha a linha e responde à medida que os workers terminam"""
+        lock = threading.Lock()
+        pending = []
+
+        def respond(response: Dict[str, Any]) -> None:
+            data = json.dumps(response, ensure_ascii=False) + '\n'
+            with lock:
+                writer.write(data)
+                writer.flush()
+
+        def finished(request_id: Any, future) -> None:
+            self._slots.release()
+            try:
+                respond(future.result())
+            except Exception as e:
+                # Worker perdido (ex.: processo morto)
+                respond({'id': request_id, 'error': {'message': f"Internal error: {e}"}})
+
+        for line in reader:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except ValueError as e:
+                respond({'id': None, 'error': {'message': f"Parse error: {e}"}})
+                continue
+
+            # Backpressure: bloqueia a leitura enquanto o pool está cheio
+            self._slots.acquire()
+            request_id = message.get('id') if isinstance(message, dict) else None
+            try:
+                future = self._submit(message)
+            except BrokenExecutor as e:
+                # Worker morto antes do envio: a vaga volta e a leitura continua com o pool novo
+                self._slots.release()
+                respond({'id': request_id, 'error': {'message': f"Internal error: {e}"}})
+                continue
+            future.add_done_callback(partial(finished, request_id))
+            pending.append(future)
+            if len(pending) > self.max_pending:
+                pending = [f for f in pending if not f.done()]
+
+        wait(pending)
+
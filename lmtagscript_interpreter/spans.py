@@ -0,0 +1,229 @@
+"""
+Trechos do código-fonte sem cópia (modo spans=True do parser)
+
+Com `parse_ast(conteudo, spans=True)` o parser mantém o conteúdo em um único
+SourceBuffer e:
+  - cada statement (nó da AST) recebe `span` (LineSpan): o trecho exato que
+    ocupa, incluindo blocos {...} multilinha e, em IF/FOR EACH/ON ERROR, até
+    o END
+  - textos copiados do fonte (valores de TAG, argumentos de CALL, TASK/
+    ACTION/GOAL de funções, propriedades de classes, then/else de IF) com
+    MIN_SPAN_LENGTH caracteres ou mais ficam como Span/SpanLines e só viram
+    str quando lidos; os mais curtos custam menos como str
+  - parâmetros de @referências e payloads de CALL API ficam como ValueSpan:
+    o bloco {...} é validado no parse e reparseado a cada leitura
+
+materialize() devolve o valor comum (str, dict, ...) de um trecho; to_dict(),
+to_plain() e dump_json() já o aplicam, então o JSON é o mesmo de parse(),
+mais o `span` de cada nó.
+
+Posições: start/end são offsets de caractere no conteúdo e byte_start/
+byte_end, no conteúdo em UTF-8; line/column apontam o primeiro caractere e
+end_line/end_column a posição logo após o último (linhas e colunas 1-based,
+como no lexer).
+"""
+
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Any, Dict, List, Tuple
+
+from values import parse_value
+
+# Textos mais curtos que isto ficam como str: um Span (objeto + dois offsets)
+# ocupa ~120 bytes, o mesmo que uma str ASCII de ~64 caracteres
+MIN_SPAN_LENGTH = 64
+
+
+class SourceBuffer:
+    """Conteúdo retido uma única vez, com as tabelas de linha e de bytes calculadas sob demanda"""
+
+    __slots__ = ('text', '_line_starts', '_encoded', '_byte_starts', '_ascii')
+
+    def __init__(self, text: str):
+        self.text = text
+        self._line_starts = None
+        self._encoded = None
+        self._byte_starts = None
+        self._ascii = None
+
+    def line_column(self, offset: int) -> Tuple[int, int]:
+        """(linha, coluna) 1-based de um offset de caractere"""
+        if self._line_starts is None:
+            self._line_starts = list(accumulate((len(line) + 1 for line in self.text.split('\n')), initial=0))
+        index = bisect_right(self._line_starts, offset) - 1
+        return index + 1, offset - self._line_starts[index] + 1
+
+    def line_start(self, line: int) -> int:
+        """Offset do primeiro caractere da linha (1-based)"""
+        if self._line_starts is None:
+            self.line_column(0)
+        return self._line_starts[line - 1]
+
+    def line_end(self, line: int) -> int:
+        """Offset logo após o último caractere não branco da linha (1-based)"""
+        start = self.line_start(line)
+        return start + len(self.text[start:self._line_starts[line] - 1].rstrip())
+
+    def byte_offset(self, offset: int) -> int:
+        """Offset em bytes (UTF-8) de um offset de caractere"""
+        if self._ascii is None:
+            self._ascii = self.text.isascii()
+        if self._ascii:
+            return offset
+        if self._byte_starts is None:
+            lines = self.text.split('\n')
+            self._byte_starts = list(accumulate((len(line.encode('utf-8')) + 1 for line in lines), initial=0))
+        line, column = self.line_column(offset)
+        line_start = offset - column + 1
+        return self._byte_starts[line - 1] + len(self.text[line_start:offset].encode('utf-8'))
+
+    @property
+    def encoded(self) -> bytes:
+        """Conteúdo em UTF-8, codificado na primeira leitura de bytes"""
+        if self._encoded is None:
+            self._encoded = self.text.encode('utf-8')
+        return self._encoded
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+
+class _Region:
+    """Operações comuns aos trechos contíguos, a partir de buffer, start e end"""
+
+    __slots__ = ()
+
+    @property
+    def text(self) -> str:
+        return self.buffer.text[self.start:self.end]
+
+    @property
+    def bytes(self) -> memoryview:
+        """Bytes UTF-8 do trecho, como memoryview sobre o buffer codificado (sem cópia)"""
+        return memoryview(self.buffer.encoded)[self.byte_start:self.byte_end]
+
+    @property
+    def byte_start(self) -> int:
+        return self.buffer.byte_offset(self.start)
+
+    @property
+    def byte_end(self) -> int:
+        return self.buffer.byte_offset(self.end)
+
+    def materialize(self) -> Any:
+        return self.text
+
+    def to_dict(self) -> Dict[str, int]:
+        line, column = self.buffer.line_column(self.start)
+        end_line, end_column = self.buffer.line_column(self.end)
+        return {'start': self.start, 'end': self.end, 'byte_start': self.byte_start, 'byte_end': self.byte_end,
+                'line': line, 'column': column, 'end_line': end_line, 'end_column': end_column}
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (_Region, SpanLines)):
+            other = other.materialize()
+        return self.materialize() == other
+
+    def __hash__(self) -> int:
+        return hash(self.text)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.start}, {self.end}, {self.text[:40]!r})"
+
+
+class Span(_Region):
+    """Trecho [start, end) de um SourceBuffer; o texto só é copiado quando lido"""
+
+    __slots__ = ('buffer', 'start', 'end')
+
+    def __init__(self, buffer: SourceBuffer, start: int, end: int):
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+
+    @property
+    def line(self) -> int:
+        return self.buffer.line_column(self.start)[0]
+
+    @property
+    def column(self) -> int:
+        return self.buffer.line_column(self.start)[1]
+
+
+class LineSpan(_Region):
+    """Trecho de um statement: da coluna `column` da linha `line` ao fim (sem brancos) da linha `end_line`
+
+    Guarda os números de linha do próprio nó em vez de offsets, então não
+    aloca inteiros novos; start e end são calculados pela tabela de linhas.
+    """
+
+    __slots__ = ('buffer', 'line', 'column', 'end_line')
+
+    def __init__(self, buffer: SourceBuffer, line: int, column: int, end_line: int):
+        self.buffer = buffer
+        self.line = line
+        self.column = column
+        self.end_line = end_line
+
+    @property
+    def start(self) -> int:
+        return self.buffer.line_start(self.line) + self.column - 1
+
+    @property
+    def end(self) -> int:
+        return self.buffer.line_end(self.end_line)
+
+
+class ValueSpan(Span):
+    """Trecho com um valor {...}/[...]: parseado direto do buffer a cada leitura"""
+
+    __slots__ = ()
+
+    def materialize(self) -> Any:
+        return parse_value(self.buffer.text, self.start)[0]
+
+    def __hash__(self) -> int:
+        return hash(self.text)
+
+
+class SpanLines:
+    """Linhas de texto não contíguas (then/else de um IF), juntadas só quando lidas"""
+
+    __slots__ = ('spans',)
+
+    def __init__(self, spans: List[Span]):
+        self.spans = spans
+
+    @property
+    def text(self) -> str:
+        return '\n'.join(span.text for span in self.spans) + '\n'
+
+    def materialize(self) -> str:
+        return self.text
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (_Region, SpanLines)):
+            other = other.materialize()
+        return self.text == other
+
+    def __hash__(self) -> int:
+        return hash(self.text)
+
+    def __repr__(self) -> str:
+        return f"SpanLines({len(self.spans)} linhas)"
+
+
+def materialize(value: Any) -> Any:
+    """Valor comum de um Span/ValueSpan/SpanLines; outros valores passam inalterados"""
+    if isinstance(value, (Span, SpanLines)):
+        return value.materialize()
+    return value
@@ -0,0 +1,291 @@
+"""
+Formato binário pré-compilado (.tagc)
+
+Um .tagc guarda o resultado do parsing de um script para ser carregado sem
+re-parsear o .tag nem decodificar o JSON inteiro. O arquivo é mapeado em
+memória (mmap) e cada item de cada seção é decodificado só quando acessado:
+abrir um workflow de 200k statements e consultar uma função lê apenas o
+cabeçalho, o diretório de seções e os bytes daquela função.
+
+Layout (little-endian):
+
+  cabeçalho (64 bytes)
+    magic 'TAGC' | versão do formato u16 | flags u16 | seções u32
+    SHA-256 do fonte (32 bytes) | versão do parser (16 bytes ASCII) | 4 bytes livres
+  diretório, uma entrada por seção, na ordem das chaves do resultado
+    tamanho do nome u16 | nome UTF-8 | tipo u8 | itens u32
+    offset da tabela de itens u64 | offset do índice de nomes u64 (0 se não houver)
+  dados
+    seção lista: tabela com itens+1 offsets u64; o item i é o JSON compacto
+                 entre os offsets i e i+1
+    (os JSON usam cache.encode_result: textos entre aspas ficam marcados)
+    seção valor: tabela com 2 offsets u64 delimitando um único JSON
+    índice de nomes (functions, classes): array JSON com o nome de cada item
+
+O hash do fonte e a versão do parser permitem detectar um .tagc desatualizado
+(is_stale) e recompilá-lo (load_or_compile).
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
+
+from cache import decode_result, encode_result, parser_version
+from nodes import Node
+
+MAGIC = b'TAGC'
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct('<4sHHI32s16s4x')
+_SECTION = struct.Struct('<BIQQ')
+_NAME_LENGTH = struct.Struct('<H')
+_OFFSET = struct.Struct('<Q')
+_SPAN = struct.Struct('<QQ')
+
+_KIND_VALUE = 0
+_KIND_LIST = 1
+
+# Seções cujos itens podem ser buscados pelo nome sem decodificar os demais
+_NAMED_SECTIONS = ('functions', 'classes')
+
+
+class CompiledFormatError(ValueError):
+    """Arquivo .tagc inválido, truncado ou de versão de formato não suportada"""
+
+
+def source_hash(content: str) -> bytes:
+    """SHA-256 do texto do script (o mesmo usado na verificação de staleness)"""
+    return hashlib.sha256(content.encode('utf-8')).digest()
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, Node):
+        value = value.to_dict()
+    return encode_result(value, separators=(',', ':')).encode('utf-8')
+
+
+def write_compiled(result: Dict[str, Any], content: str, out: BinaryIO) -> None:
+    """Escreve o resultado (dicts ou nós da AST) do parsing de content em formato .tagc"""
+    sections = list(result.items())
+    directory_size = sum(_NAME_LENGTH.size + len(key.encode('utf-8')) + _SECTION.size
+                         for key, _ in sections)
+    position = _HEADER.size + directory_size
+
+    entries = []
+    blobs = []
+    for key, value in sections:
+        if isinstance(value, list):
+            kind, items = _KIND_LIST, [_encode(item) for item in value]
+        else:
+            kind, items = _KIND_VALUE, [_encode(value)]
+
+        table_offset = position
+        position += _OFFSET.size * (len(items) + 1)
+        offsets = []
+        for item in items:
+            offsets.append(position)
+            position += len(item)
+        offsets.append(position)
+        blobs.append(b''.join(_OFFSET.pack(offset) for offset in offsets))
+        blobs.extend(items)
+
+        names_offset = 0
+        if kind == _KIND_LIST and key in _NAMED_SECTIONS:
+            names = _encode([item.name if isinstance(item, Node) else item.get('name')
+                             for item in value])
+            names_offset = position
+            blobs.append(_SPAN.pack(position + _SPAN.size, position + _SPAN.size + len(names)))
+            blobs.append(names)
+            position += _SPAN.size + len(names)
+
+        entries.append((key, kind, len(items) if kind == _KIND_LIST else 1, table_offset, names_offset))
+
+    out.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(sections), source_hash(content),
+                           parser_version().encode('ascii')))
+    for key, kind, count, table_offset, names_offset in entries:
+        name = key.encode('utf-8')
+        out.write(_NAME_LENGTH.pack(len(name)))
+        out.write(name)
+        out.write(_SECTION.pack(kind, count, table_offset, names_offset))
+    for blob in blobs:
+        out.write(blob)
+
+
+def compile_file(input_path: str, output_path: Optional[str] = None, encoding: str = 'utf-8') -> str:
+    """Parseia um .tag e grava o .tagc (padrão: mesmo nome com extensão .tagc)"""
+    from tagscript_parser import parse_ast
+
+    if output_path is None:
+        output_path = os.path.splitext(input_path)[0] + '.tagc'
+    with open(input_path, 'r', encoding=encoding) as f:
+        content = f.read()
+    result = parse_ast(content)
+
+    # Escrita atômica: um worker nunca mapeia um .tagc pela metade
+    temporary = f"{output_path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as out:
+        write_compiled(result, content, out)
+    os.replace(temporary, output_path)
+    return output_path
+
+
+class CompiledSection(Sequence):
+    """Itens de uma seção lista, decodificados um a um sob demanda"""
+
+    def __init__(self, script: 'CompiledScript', name: str, count: int, table_offset: int,
+                 names_offset: int):
+        self._script = script
+        self.name = name
+        self._count = count
+        self._table_offset = table_offset
+        self._names_offset = names_offset
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"{self.name}: índice {index} fora do intervalo")
+        return self._script._decode_span(self._table_offset + _OFFSET.size * index)
+
+    def names(self) -> List[str]:
+        """Nomes dos itens (só em functions e classes), sem decodificar os itens"""
+        if not self._names_offset:
+            raise KeyError(f"A seção '{self.name}' não tem índice de nomes")
+        return self._script._decode_span(self._names_offset)
+
+    def find(self, name: str) -> Optional[Dict[str, Any]]:
+        """Primeiro item com o nome dado, ou None"""
+        try:
+            return self[self.names().index(name)]
+        except ValueError:
+            return None
+
+    def __repr__(self) -> str:
+        return f"CompiledSection({self.name!r}, {self._count} itens)"
+
+
+class CompiledScript:
+    """Script .tagc mapeado em memória; as seções são decodificadas sob demanda"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                # Arquivo vazio não pode ser mapeado
+                raise CompiledFormatError(f"{path}: arquivo .tagc vazio") from e
+        try:
+            self._read_directory()
+        except (CompiledFormatError, struct.error, UnicodeDecodeError) as e:
+            self.close()
+            if isinstance(e, CompiledFormatError):
+                raise
+            raise CompiledFormatError(f"{path}: diretório de seções corrompido ({e})") from e
+
+    def _read_directory(self) -> None:
+        if len(self._map) < _HEADER.size:
+            raise CompiledFormatError(f"{self.path}: arquivo truncado")
+        magic, version, _, count, digest, stamp = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise CompiledFormatError(f"{self.path}: não é um arquivo .tagc")
+        if version != FORMAT_VERSION:
+            raise CompiledFormatError(
+                f"{self.path}: versão de formato {version} não suportada (esperada {FORMAT_VERSION})")
+        self.format_version = version
+        self.source_hash = digest
+        self.parser_version = stamp.decode('ascii')
+
+        self._sections = {}
+        position = _HEADER.size
+        for _ in range(count):
+            (length,) = _NAME_LENGTH.unpack_from(self._map, position)
+            position += _NAME_LENGTH.size
+            name = bytes(self._map[position:position + length]).decode('utf-8')
+            position += length
+            self._sections[name] = _SECTION.unpack_from(self._map, position)
+            position += _SECTION.size
+
+    def _decode_span(self, table_position: int) -> Any:
+        start, end = _SPAN.unpack_from(self._map, table_position)
+        if not start <= end <= len(self._map):
+            raise CompiledFormatError(f"{self.path}: offset fora do arquivo")
+        return decode_result(self._map[start:end])
+
+    def is_stale(self, content: str) -> bool:
+        """True se o .tagc não corresponde a content ou à versão atual do parser"""
+        return self.source_hash != source_hash(content) or self.parser_version != parser_version()
+
+    def keys(self) -> List[str]:
+        return list(self._sections)
+
+    def sizes(self) -> Dict[str, int]:
+        """Número de itens de cada seção, lido do diretório"""
+        return {key: entry[1] for key, entry in self._sections.items()}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sections
+
+    def __getitem__(self, key: str) -> Union[CompiledSection, Any]:
+        kind, count, table_offset, names_offset = self._sections[key]
+        if kind == _KIND_LIST:
+            return CompiledSection(self, key, count, table_offset, names_offset)
+        return self._decode_span(table_offset)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self._sections else default
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sections)
+
+    def function(self, name: str) -> Optional[Dict[str, Any]]:
+        """Definição de uma função pelo nome, decodificando só ela"""
+        return self['functions'].find(name) if 'functions' in self else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Decodifica tudo: o mesmo dict que parse_tagscript devolveria"""
+        return {key: list(value) if isinstance(value, CompiledSection) else value
+                for key, value in ((key, self[key]) for key in self._sections)}
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> 'CompiledScript':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"CompiledScript({self.path!r}, seções={self.keys()})"
+
+
+def load_compiled(path: str) -> CompiledScript:
+    """Abre um .tagc com mmap; levanta CompiledFormatError se o arquivo for inválido"""
+    return CompiledScript(path)
+
+
+def load_or_compile(input_path: str, compiled_path: Optional[str] = None,
+                    encoding: str = 'utf-8') -> CompiledScript:
+    """Abre o .tagc de um .tag, recompilando-o se estiver ausente, inválido ou desatualizado"""
+    if compiled_path is None:
+        compiled_path = os.path.splitext(input_path)[0] + '.tagc'
+    with open(input_path, 'r', encoding=encoding) as f:
+        content = f.read()
+    try:
+        script = CompiledScript(compiled_path)
+        if not script.is_stale(content):
+            return script
+        script.close()
+    except (OSError, CompiledFormatError):
+        pass
+    compile_file(input_path, compiled_path, encoding)
+    return CompiledScript(compiled_path)
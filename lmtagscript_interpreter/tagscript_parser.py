@@ -0,0 +1,1035 @@
+"""
+Parser do LMTagScript (biblioteca)
+
+Módulo importável sem efeitos colaterais: não configura o logging do
+processo nem importa dependências da CLI (argparse, cache em disco,
+profiling, batch, servidor). A CLI fica em main.py, que reexporta estes
+nomes para manter compatibilidade com `from main import parse_tagscript`.
+
+Uso:
+    from tagscript_parser import parse_tagscript, validate_tagscript
+    result = parse_tagscript(open('workflow.tag').read())
+    diagnostics = validate_tagscript(open('workflow.tag').read())
+"""
+
+import re
+import logging
+from itertools import accumulate
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Any, Tuple, Optional
+
+import lexer
+from conditions import parse_condition
+from lexer import Token, classify_line
+from nodes import (ApiCall, Call, ClassDef, Connection, ErrorHandler, ForLoop, FunctionDef, IfBlock,
+                   LLMReference, Node, StatementRef, to_plain)
+from spans import MIN_SPAN_LENGTH, LineSpan, SourceBuffer, Span, SpanLines, ValueSpan
+from values import ValueParseError, bracket_depth, check_literal, check_value, parse_literal, parse_value
+
+if TYPE_CHECKING:
+    from cache import ParseCache
+    from interning import InternTable
+    from profiling import ParserProfile
+
+logger = logging.getLogger(__name__)
+
+# Padrões pré-compilados aplicados ao conteúdo após a palavra-chave (token.value)
+_IDENTIFIER_PATTERN = re.compile(r'\w+')
+_CALL_ARGUMENTS_PATTERN = re.compile(r'\((.*?)\)')
+_IF_PATTERN = re.compile(r'(.+?)\s+THEN')
+_API_CALL_PATTERN = re.compile(r'(.+?)\s+WITH\s+(.+)')
+_FOR_EACH_PATTERN = re.compile(r'(.+?)\s+IN\s+(.+?)(?:\s+DO)?\s*$')
+_CONNECT_PATTERN = re.compile(r'TO\s+(\w+)\s+AS\s+(\w+)\s*(\{)?')
+_API_TARGET_MESSAGE = "alvo de CALL API deve ser serviço.endpoint ou uma referência @: {!r}"
+# ENV("VAR") em uma propriedade de CONNECT (o parser de valores o mantém como texto)
+_ENV_CALL_PATTERN = re.compile(r'ENV\(\s*"([^"]+)"\s*\)')
+
+_TAG_KEYS = {lexer.TASK: 'task', lexer.ACTION: 'action', lexer.GOAL: 'goal'}
+_CLASS_BODY_TERMINATORS = ('TASK:', 'ACTION:', 'GOAL:', 'IF', 'ELSE', 'END')
+_BRACKET_CHARS_PATTERN = re.compile(r'[{}\[\]]')
+
+# Nome do statement de nível superior para cada tipo de token que o inicia
+_STATEMENT_KINDS = {
+    lexer.TASK: 'tag',
+    lexer.ACTION: 'tag',
+    lexer.GOAL: 'tag',
+    lexer.CLASS: 'class',
+    lexer.DEFINE_FUNCTION: 'function',
+    lexer.CALL_API: 'api_call',
+    lexer.CALL: 'call',
+    lexer.IF: 'if_block',
+    lexer.ELSE: 'else',
+    lexer.END: 'end',
+    lexer.REFERENCE: 'reference',
+    lexer.FOR_EACH: 'for_loop',
+    lexer.LOOPGUARD: 'loopguard',
+    lexer.ON_ERROR: 'error_handler',
+    lexer.CONNECT: 'connection',
+    lexer.TEXT: 'text',
+}
+# Prefixos das referências @ com parâmetros {...}, e o tamanho de cada um
+_REFERENCE_PREFIXES = (('tool:', 5), ('file:', 5), ('project:', 8), ('db:', 3))
+# Estruturas que o TypeScript (core/validate.ts) exige em todo script: tipo do token, TAG, código
+_REQUIRED_TAGS = ((lexer.TASK, 'TASK', 'E_TASK'), (lexer.ACTION, 'ACTION', 'E_ACTION'),
+                  (lexer.GOAL, 'GOAL', 'E_GOAL'))
+# Statements cujo corpo vai até a próxima linha em branco ou comentário
+_BODY_STATEMENTS = (lexer.CLASS, lexer.DEFINE_FUNCTION)
+# Listas do resultado cujos itens têm body/else_body (StatementRef)
+_BLOCK_KEYS = ('if_blocks', 'for_loops', 'error_handlers')
+
+class _OpenBlock:
+    """Bloco IF/FOR EACH/ON ERROR aberto no block_stack, esperando o END"""
+
+    __slots__ = ('kind', 'node', 'body', 'text')
+
+    def __init__(self, kind: str, node: Any):
+        self.kind = kind
+        self.node = node
+        # Lista que recebe os statements do ramo corrente (body, ou else_body após ELSE)
+        self.body = node.body
+        # Linhas de texto livre do ramo corrente de um IF, juntadas uma única vez
+        self.text = []
+
+    def flush_text(self) -> None:
+        """Grava o texto acumulado no then/else do IF"""
+        if self.kind != 'if':
+            return
+        if not self.text:
+            text = ''
+        elif isinstance(self.text[0], Span) and sum(map(len, self.text)) >= MIN_SPAN_LENGTH:
+            text = SpanLines(self.text)
+        else:
+            text = '\n'.join(map(str, self.text)) + '\n'
+        if self.body is self.node.else_body:
+            self.node.else_ = text
+        else:
+            self.node.then = text
+
+
+class TagScriptParser:
+    """Parser principal para TagScript com suporte a estruturas complexas"""
+    
+    def __init__(self, profile: Optional['ParserProfile'] = None, spans: bool = False,
+                 interning: Optional['InternTable'] = None):
+        # Com spans=True, parse_ast() registra o trecho de cada nó e mantém os
+        # textos copiados do fonte como trechos lidos sob demanda (ver spans.py)
+        self.spans = spans
+        # Tabela que devolve uma instância única por identificador/chave (ver interning.py)
+        self.interning = interning
+        self._reset()
+        self._handlers = {
+            lexer.TASK: self._parse_tag,
+            lexer.ACTION: self._parse_tag,
+            lexer.GOAL: self._parse_tag,
+            lexer.CLASS: self._parse_class_definition,
+            lexer.DEFINE_FUNCTION: self._parse_function_definition,
+            lexer.CALL_API: self._parse_api_call,
+            lexer.CALL: self._parse_call_statement,
+            lexer.IF: self._parse_if_statement,
+            lexer.ELSE: self._parse_else_statement,
+            lexer.END: self._parse_end_statement,
+            lexer.REFERENCE: self._parse_llm_reference_multiline,
+            lexer.FOR_EACH: self._parse_for_loop,
+            lexer.LOOPGUARD: self._parse_loopguard,
+            lexer.ON_ERROR: self._parse_error_handler,
+            lexer.CONNECT: self._parse_connection,
+            lexer.TEXT: self._parse_block_content,
+        }
+        # Instrumentação opcional: sem profile os handlers não são envolvidos
+        if profile is not None:
+            profile.attach(self)
+    
+    def _reset(self) -> None:
+        """Inicializa o estado de parsing"""
+        self.result = {}
+        # _OpenBlock de cada IF/FOR EACH/ON ERROR aberto, do mais externo ao mais interno
+        self.block_stack = []
+        self.if_blocks = []
+        self.api_calls = []
+        self.llm_references = []
+        self.loop_guards = []
+        self.error_handlers = []
+        self.for_loops = []
+        self.connections = []
+        self.variables = {}
+        self.functions = []
+        self.classes = []
+        self.calls = []
+        # Linhas ignoradas pela recuperação de erros: (linha, coluna, mensagem)
+        self.errors = []
+        self._source = ''
+        self._lines = []
+        self._line_starts = None
+        self._line_base = 0
+        # SourceBuffer do conteúdo no modo spans (None no parse por statement)
+        self._buffer = None
+        # Nós registrados pelo handler em execução, à espera do seu span
+        self._pending_spans = []
+    
+    def parse(self, content: str) -> Dict[str, Any]:
+        """Parse TagScript content and return structured JSON"""
+        return to_plain(self.parse_ast(content))
+    
+    def parse_ast(self, content: str) -> Dict[str, Any]:
+        """Parse que mantém os nós da AST (ver nodes.py) em vez de dicts
+        
+        As TAGs continuam como listas de strings; IFs, chamadas, referências,
+        funções e classes são nós com __slots__. to_plain() converte para o
+        formato de parse().
+        """
+        try:
+            lines = content.split('\n')
+            if self.spans:
+                self._buffer = SourceBuffer(content)
+            self._parse_lines(lines, content)
+            self._finalize_result()
+            return self.result
+        except Exception as e:
+            logger.error("Erro durante o parsing: %s", e)
+            raise
+    
+    def parse_statement(self, lines: List[str], line_base: int = 0, resume: bool = False) -> Dict[str, Any]:
+        """Parse de um statement de nível superior isolado (ver iter_parse).
+
+        line_base é o índice da primeira linha no documento, para que os
+        números de linha do resultado parcial sejam absolutos. Com resume=True
+        as linhas continuam o statement anterior, cujo bloco IF ainda está
+        aberto (ver in_block), em vez de começar um resultado novo.
+        """
+        if not resume:
+            self._reset()
+        self._parse_lines(lines, line_base=line_base)
+        self._finalize_result()
+        return to_plain(self.result)
+    
+    @property
+    def in_block(self) -> bool:
+        """Indica se há um bloco IF, FOR EACH ou ON ERROR aberto esperando o END"""
+        return bool(self.block_stack)
+    
+    def _parse_lines(self, lines: List[str], source: Optional[str] = None, line_base: int = 0) -> None:
+        """Parse todas as linhas do TagScript"""
+        # Buffer único sobre o qual os blocos {...} são escaneados por offset
+        self._source = source if source is not None else '\n'.join(lines)
+        self._line_starts = None
+        self._lines = lines
+        self._line_base = line_base
+        i = 0
+        while i < len(lines):
+            token = classify_line(lines[i], line_base + i + 1)
+            
+            if token is None:
+                i += 1
+                continue
+            
+            try:
+                consumed_lines = self._parse_line(token, lines, i)
+                if self._pending_spans:
+                    self._close_spans(token, i, consumed_lines)
+                i += consumed_lines
+            except Exception as e:
+                self._pending_spans.clear()
+                line, column, message = line_base + i + 1, token.column, str(e)
+                if isinstance(e, ValueParseError):
+                    if line_base:
+                        e.shift_lines(line_base)
+                    line, column, message = e.line, e.column, e.message
+                self.errors.append((line, column, message))
+                # Argumentos %: a mensagem só é formatada se o nível WARNING estiver ativo
+                logger.warning("Erro ao processar linha %d: %s", line_base + i + 1, e)
+                i += 1
+    
+    def _parse_line(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Despacha um token para o seu handler e retorna o número de linhas consumidas"""
+        return self._handlers[token.type](token, lines, line_index)
+    
+    def _record(self, kind: str, items: List[Any], node: Any, line: int) -> None:
+        """Adiciona um statement à sua lista e, dentro de um bloco, ao corpo do bloco"""
+        if self.block_stack:
+            self.block_stack[-1].body.append(StatementRef(kind, len(items), line))
+        items.append(node)
+        if self._buffer is not None and isinstance(node, Node):
+            self._pending_spans.append(node)
+    
+    def _name(self, text: str) -> str:
+        """Identificador, alvo de referência ou chave, internado quando há tabela"""
+        return text if self.interning is None else self.interning(text)
+    
+    def _close_spans(self, token: Token, line_index: int, consumed_lines: int) -> None:
+        """Span dos nós registrados por um handler: da palavra-chave ao fim da última linha consumida"""
+        end_line = token.line if consumed_lines == 1 else token.line + consumed_lines - 1
+        for node in self._pending_spans:
+            node.span = LineSpan(self._buffer, token.line, token.column, end_line)
+        self._pending_spans.clear()
+    
+    def _line_end(self, line_index: int) -> int:
+        """Offset logo após o último caractere não branco de uma linha"""
+        return self._line_offset(line_index) + len(self._lines[line_index].rstrip())
+    
+    def _text(self, start: int, end: int) -> Any:
+        """Trecho do fonte entre start e end sem os brancos das pontas (Span no modo spans)"""
+        source = self._source
+        while start < end and source[start].isspace():
+            start += 1
+        while end > start and source[end - 1].isspace():
+            end -= 1
+        if self._buffer is None or end - start < MIN_SPAN_LENGTH:
+            return source[start:end]
+        return Span(self._buffer, start, end)
+    
+    def _token_text(self, token: Token, line_index: int, start: int = 0, end: Optional[int] = None) -> Any:
+        """token.text[start:end] sem os brancos das pontas, como Span no modo spans"""
+        if self._buffer is None:
+            return token.text[start:end].strip()
+        offset = self._line_offset(line_index) + token.column - 1
+        return self._text(offset + start, offset + (len(token.text) if end is None else end))
+    
+    def _line_text(self, line_index: int, prefix_length: int) -> Any:
+        """Linha sem os brancos das pontas e sem os prefix_length primeiros caracteres (TASK: ...)"""
+        if self._buffer is None:
+            return self._lines[line_index].strip()[prefix_length:].strip()
+        line = self._lines[line_index]
+        start = self._line_offset(line_index) + len(line) - len(line.lstrip()) + prefix_length
+        return self._text(start, self._line_end(line_index))
+    
+    def _parse_tag(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse TAG statements (TASK, ACTION, GOAL), suportando múltiplas"""
+        value = token.value
+        if self._buffer is not None and value:
+            value = self._token_text(token, line_index, len(token.text) - len(value))
+        self._add_tag(_TAG_KEYS[token.type], value, token.line)
+        return 1
+    
+    def _parse_else_statement(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse ELSE: as próximas linhas pertencem ao ramo else do IF atual"""
+        # ELSE fora de um IF aberto não reabre um bloco já encerrado
+        if self.block_stack and self.block_stack[-1].kind == 'if':
+            block = self.block_stack[-1]
+            if block.body is not block.node.else_body:
+                block.flush_text()
+                block.body = block.node.else_body
+                block.text = []
+        return 1
+    
+    def _parse_error_handler(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse ON ERROR: o tratador vai até o END correspondente (ou o fim do script)"""
+        self.result['error_handling'] = True
+        handler = ErrorHandler(token.line)
+        self._record('error_handlers', self.error_handlers, handler, token.line)
+        self.block_stack.append(_OpenBlock('on_error', handler))
+        return 1
+    
+    def _parse_block_content(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Acumula linhas sem palavra-chave no ramo corrente do IF aberto mais interno"""
+        for block in reversed(self.block_stack):
+            if block.kind == 'if':
+                if self._buffer is None:
+                    block.text.append(token.text)
+                else:
+                    start = self._line_offset(line_index) + token.column - 1
+                    block.text.append(Span(self._buffer, start, start + len(token.text)))
+                break
+        return 1
+    
+    def _add_tag(self, tag_type: str, value: str, line: int) -> None:
+        """Adiciona uma TAG ao resultado, suportando múltiplas"""
+        if tag_type not in self.result:
+            self.result[tag_type] = []
+        self._record(tag_type, self.result[tag_type], value, line)
+    
+    def _parse_class_definition(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse CLASS definition"""
+        class_match = _IDENTIFIER_PATTERN.match(token.value)
+        if class_match:
+            class_name = self._name(class_match.group(0))
+            class_def = ClassDef(class_name, token.line)
+            
+            # Parse propriedades da classe (linhas seguintes)
+            consumed_lines = 1
+            i = line_index + 1
+            while i < len(lines) and lines[i].strip() and not lines[i].strip().startswith('#'):
+                prop_line = lines[i].strip()
+                if ':' in prop_line and not prop_line.startswith(_CLASS_BODY_TERMINATORS):
+                    key, value = prop_line.split(':', 1)
+                    value = value.strip()
+                    if self._buffer is not None and value:
+                        value = self._line_text(i, len(key) + 1)
+                    if isinstance(value, str):
+                        # Tipos das propriedades (string, int, ...) se repetem como os nomes
+                        value = self._name(value)
+                    class_def.properties[self._name(key.strip())] = value
+                    consumed_lines += 1
+                    i += 1
+                else:
+                    break
+            
+            self._record('classes', self.classes, class_def, token.line)
+            return consumed_lines
+        return 1
+    
+    def _parse_function_definition(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse DEFINE FUNCTION"""
+        func_match = _IDENTIFIER_PATTERN.match(token.value)
+        if func_match:
+            func_name = self._name(func_match.group(0))
+            func_def = FunctionDef(func_name, token.line)
+            
+            # Parse conteúdo da função (TASK, ACTION, GOAL)
+            consumed_lines = 1
+            i = line_index + 1
+            while i < len(lines) and lines[i].strip() and not lines[i].strip().startswith('#'):
+                func_line = lines[i].strip()
+                if func_line.startswith('TASK:'):
+                    func_def.task = self._line_text(i, 5)
+                elif func_line.startswith('ACTION:'):
+                    func_def.action = self._line_text(i, 7)
+                elif func_line.startswith('GOAL:'):
+                    func_def.goal = self._line_text(i, 5)
+                elif func_line.startswith('END') or func_line.startswith('DEFINE FUNCTION'):
+                    break
+                consumed_lines += 1
+                i += 1
+            
+            self._record('functions', self.functions, func_def, token.line)
+            return consumed_lines
+        return 1
+    
+    def _parse_call_statement(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse CALL statements (chamadas de função)"""
+        call_match = _IDENTIFIER_PATTERN.match(token.value)
+        if call_match:
+            func_name = self._name(call_match.group(0))
+            call_def = Call(func_name, '', token.line)
+            
+            # Parse argumentos se houver
+            if '(' in token.value and ')' in token.value:
+                args_match = _CALL_ARGUMENTS_PATTERN.search(token.value)
+                if args_match:
+                    value_start = len(token.text) - len(token.value)
+                    call_def.arguments = self._token_text(token, line_index, value_start + args_match.start(1),
+                                                          value_start + args_match.end(1))
+            
+            self._record('calls', self.calls, call_def, token.line)
+        return 1
+    
+    def _parse_if_statement(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse IF statement com suporte a condições complexas"""
+        if_match = _IF_PATTERN.match(token.value)
+        if if_match:
+            condition = if_match.group(1)
+            if_block = IfBlock(self._parse_condition(condition), token.line)
+            self._record('if_blocks', self.if_blocks, if_block, token.line)
+            self.block_stack.append(_OpenBlock('if', if_block))
+        return 1
+    
+    def _parse_end_statement(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse END statement e gerencia o stack de blocos"""
+        if self.block_stack:
+            block = self.block_stack.pop()
+            if block.kind == 'if':
+                block.flush_text()
+            else:
+                block.node.end_line = token.line
+            span = getattr(block.node, 'span', None)
+            if span is not None:
+                # O trecho de um bloco vai até o seu END
+                block.node.span = LineSpan(span.buffer, span.line, span.column, token.line)
+        return 1
+    
+    def _parse_api_call(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse CALL API com suporte a payloads complexos"""
+        consumed_lines = 1
+        api_match = _API_CALL_PATTERN.match(token.value)
+        if api_match:
+            service_endpoint = api_match.group(1)
+            payload_str = api_match.group(2)
+            
+            # Payloads entre chaves podem abranger múltiplas linhas; a busca
+            # pelo '{' começa no payload, após os parâmetros de uma referência @ inline
+            value_offset = token.column - 1 + len(token.text) - len(token.value)
+            payload_start = value_offset + api_match.start(2)
+            if payload_str.startswith('{'):
+                payload, consumed_lines = self._parse_multiline_json(lines, line_index, payload_start, lazy=True)
+            else:
+                payload = self._parse_inline(payload_str, line_index, payload_start)
+            
+            # Check if it's an LLM reference
+            if '@' in service_endpoint:
+                llm_ref = self._parse_llm_reference(service_endpoint, line_index, value_offset)
+                llm_ref.target = self._name(llm_ref.target)
+                api_call = ApiCall(None, None, payload, llm_ref, token.line)
+            else:
+                if '.' not in service_endpoint:
+                    raise ValueError(_API_TARGET_MESSAGE.format(service_endpoint))
+                service, endpoint = service_endpoint.split('.', 1)
+                api_call = ApiCall(self._name(service), self._name(endpoint), payload, line_number=token.line)
+            
+            self._record('api_calls', self.api_calls, api_call, token.line)
+        return consumed_lines
+    
+    def _parse_connection(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse CONNECT TO tipo AS nome { ... } com propriedades multilinha"""
+        connect_match = _CONNECT_PATTERN.match(token.value)
+        if not connect_match:
+            return 1
+        kind, name = self._name(connect_match.group(1)), self._name(connect_match.group(2))
+        config, consumed_lines = {}, 1
+        if connect_match.group(3):
+            config, consumed_lines = self._parse_multiline_json(lines, line_index, token.column)
+            for key, value in config.items():
+                env_match = _ENV_CALL_PATTERN.fullmatch(value) if isinstance(value, str) else None
+                if env_match:
+                    config[key] = {'env': env_match.group(1)}
+        self._record('connections', self.connections, Connection(kind, name, config, token.line), token.line)
+        return consumed_lines
+    
+    def _parse_llm_reference_multiline(self, token: Token, lines: List[str], start_index: int) -> int:
+        """Parse LLM reference que pode abranger múltiplas linhas"""
+        content = token.value  # Conteúdo após o @
+        
+        # Parse different types of LLM references
+        if content.startswith('tool:'):
+            llm_ref, consumed_lines = self._parse_tool_reference_multiline(token, lines, start_index)
+        elif content.startswith('file:'):
+            llm_ref, consumed_lines = self._parse_file_reference_multiline(token, lines, start_index)
+        elif content.startswith('project:'):
+            llm_ref, consumed_lines = self._parse_project_reference_multiline(token, lines, start_index)
+        elif content.startswith('db:'):
+            llm_ref, consumed_lines = self._parse_database_reference_multiline(token, lines, start_index)
+        else:
+            llm_ref = LLMReference('unknown', content)
+            consumed_lines = 1
+        
+        llm_ref.target = self._name(llm_ref.target)
+        llm_ref.line_number = token.line
+        self._record('llm_references', self.llm_references, llm_ref, token.line)
+        return consumed_lines
+    
+    def _parse_reference_target(self, token: Token, lines: List[str], start_index: int,
+                                prefix_length: int) -> Tuple[str, Optional[Dict], int]:
+        """Separa o alvo de uma referência @ dos seus parâmetros {...} (opcionais)"""
+        content = token.value
+        brace_pos = content.find('{', prefix_length)
+        if brace_pos == -1:
+            return content[prefix_length:].strip(), None, 1
+        
+        # O primeiro '{' após o @ na linha original é o mesmo encontrado em content
+        params, consumed_lines = self._parse_multiline_json(lines, start_index, token.column, lazy=True)
+        return content[prefix_length:brace_pos].strip(), params, consumed_lines
+    
+    def _parse_tool_reference_multiline(self, token: Token, lines: List[str], start_index: int) -> Tuple[LLMReference, int]:
+        """Parse tool reference (@tool:...) com parâmetros multilinha"""
+        tool_name, params, consumed_lines = self._parse_reference_target(token, lines, start_index, 5)
+        return LLMReference('tool', tool_name, params), consumed_lines
+    
+    def _parse_file_reference_multiline(self, token: Token, lines: List[str], start_index: int) -> Tuple[LLMReference, int]:
+        """Parse file reference (@file:...) com parâmetros multilinha"""
+        file_path, params, consumed_lines = self._parse_reference_target(token, lines, start_index, 5)
+        return LLMReference('file', file_path.strip('"'), params), consumed_lines
+    
+    def _parse_project_reference_multiline(self, token: Token, lines: List[str], start_index: int) -> Tuple[LLMReference, int]:
+        """Parse project reference (@project:...) com parâmetros multilinha"""
+        project_name, params, consumed_lines = self._parse_reference_target(token, lines, start_index, 8)
+        return LLMReference('project', project_name, params), consumed_lines
+    
+    def _parse_database_reference_multiline(self, token: Token, lines: List[str], start_index: int) -> Tuple[LLMReference, int]:
+        """Parse database reference (@db:...) com parâmetros multilinha"""
+        db_name, params, consumed_lines = self._parse_reference_target(token, lines, start_index, 3)
+        return LLMReference('database', db_name, params), consumed_lines
+    
+    def _parse_for_loop(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse FOR EACH: o corpo vai até o END correspondente (ou o fim do script)"""
+        for_match = _FOR_EACH_PATTERN.match(token.value)
+        if for_match:
+            variable = self._name(for_match.group(1))
+            collection = self._name(for_match.group(2))
+            loop = ForLoop(variable, collection, token.line)
+            self._record('for_loops', self.for_loops, loop, token.line)
+            self.block_stack.append(_OpenBlock('for', loop))
+        return 1
+    
+    def _parse_loopguard(self, token: Token, lines: List[str], line_index: int) -> int:
+        """Parse LOOPGUARD statement com melhor detecção"""
+        params_str = token.value
+        if params_str.startswith('{'):
+            # Se tem chaves, usa parsing multilinha
+            params, consumed_lines = self._parse_multiline_json(lines, line_index, 0)
+            if params:
+                self._record('loop_guards', self.loop_guards, params, token.line)
+            return consumed_lines
+        elif params_str:  # Se não tem chaves, parseia como parâmetros simples
+            # Formato: max_depth: 3, allow_repeat: false (o '{' acrescentado fica antes do conteúdo)
+            value_offset = token.column - 1 + len(token.text) - len(params_str)
+            params = self._parse_inline('{' + params_str + '}', line_index, value_offset - 1)
+            if params:
+                self._record('loop_guards', self.loop_guards, params, token.line)
+        return 1
+    
+    def _parse_multiline_json(self, lines: List[str], start_index: int, brace_start: int,
+                              lazy: bool = False) -> Tuple[Dict, int]:
+        """Parse JSON-like parameters que podem abranger múltiplas linhas com suporte a arrays
+
+        Com lazy=True no modo spans o bloco é validado, mas devolvido como
+        ValueSpan e parseado de novo só quando lido.
+        """
+        # Find the starting brace in the current line
+        brace_pos = lines[start_index].find('{', brace_start)
+        if brace_pos == -1:
+            return {}, 1
+        
+        # Parse direto no buffer, em uma única passada
+        start = self._line_offset(start_index) + brace_pos
+        params, end = parse_value(self._source, start, self.interning)
+        if lazy and self._buffer is not None:
+            params = ValueSpan(self._buffer, start, end)
+        
+
+        return params, self._source.count('\n', start, end) + 1
+    
+    def _line_offset(self, line_index: int) -> int:
+        """Offset do início de uma linha no buffer de código-fonte"""
+        if self._line_starts is None:
+            # Soma acumulada dos comprimentos (+1 do '\n'), calculada só quando há blocos {...}
+            self._line_starts = list(accumulate((len(line) + 1 for line in self._lines), initial=0))
+        return self._line_starts[line_index]
+    
+    def _parse_inline(self, text: str, line_index: int, offset: int) -> Any:
+        """parse_literal de um trecho da linha que começa na coluna offset (base 0)
+
+        Os erros apontam a posição no documento, e não no trecho isolado.
+        """
+        try:
+            return parse_literal(text, self.interning)
+        except ValueParseError as e:
+            position = self._line_offset(line_index) + offset + e.position
+            raise ValueParseError(e.message, position, self._source) from None
+    
+    def _parse_condition(self, condition_str: str) -> Dict[str, Any]:
+        """Parse condition string em formato estruturado (ver conditions.parse_condition)"""
+        return parse_condition(condition_str)
+    
+    def _parse_llm_reference(self, line: str, line_index: int = 0, offset: int = 0) -> LLMReference:
+        """Parse LLM reference (@) em formato estruturado
+        
+        offset é a coluna (base 0) do '@' na linha line_index, para a posição dos erros.
+        """
+        # Remove @ from beginning
+        content = line[1:]
+        offset += 1
+        
+        # Parse different types of LLM references
+        if content.startswith('tool:'):
+            return self._parse_tool_reference(content, line_index, offset)
+        elif content.startswith('file:'):
+            return self._parse_file_reference(content, line_index, offset)
+        elif content.startswith('project:'):
+            return self._parse_project_reference(content, line_index, offset)
+        elif content.startswith('db:'):
+            return self._parse_database_reference(content, line_index, offset)
+        else:
+            return LLMReference('unknown', content)
+    
+    def _parse_tool_reference(self, content: str, line_index: int = 0, offset: int = 0) -> LLMReference:
+        """Parse tool reference (@tool:...)"""
+        tool_part = content[5:]  # Remove 'tool:'
+        
+        if '{' in tool_part and '}' in tool_part:
+            tool_name = tool_part.split('{')[0].strip()
+            params_start = tool_part.find('{')
+            params_str = tool_part[params_start:tool_part.rfind('}')+1]
+            params = self._parse_inline(params_str, line_index, offset + 5 + params_start)
+            return LLMReference('tool', tool_name, params)
+        else:
+            return LLMReference('tool', tool_part.strip())
+    
+    def _parse_file_reference(self, content: str, line_index: int = 0, offset: int = 0) -> LLMReference:
+        """Parse file reference (@file:...)"""
+        file_part = content[5:]  # Remove 'file:'
+        
+        if '{' in file_part and '}' in file_part:
+            file_path = file_part.split('{')[0].strip().strip('"')
+            params_start = file_part.find('{')
+            params_str = file_part[params_start:file_part.rfind('}')+1]
+            params = self._parse_inline(params_str, line_index, offset + 5 + params_start)
+            return LLMReference('file', file_path, params)
+        else:
+            return LLMReference('file', file_part.strip().strip('"'))
+    
+    def _parse_project_reference(self, content: str, line_index: int = 0, offset: int = 0) -> LLMReference:
+        """Parse project reference (@project:...)"""
+        project_part = content[8:]  # Remove 'project:'
+        
+        if '{' in project_part and '}' in project_part:
+            project_name = project_part.split('{')[0].strip()
+            params_start = project_part.find('{')
+            params_str = project_part[params_start:project_part.rfind('}')+1]
+            params = self._parse_inline(params_str, line_index, offset + 8 + params_start)
+            return LLMReference('project', project_name, params)
+        else:
+            return LLMReference('project', project_part.strip())
+    
+    def _parse_database_reference(self, content: str, line_index: int = 0, offset: int = 0) -> LLMReference:
+        """Parse database reference (@db:...)"""
+        db_part = content[3:]  # Remove 'db:'
+        
+        if '{' in db_part and '}' in db_part:
+            db_name = db_part.split('{')[0].strip()
+            params_start = db_part.find('{')
+            params_str = db_part[params_start:db_part.rfind('}')+1]
+            params = self._parse_inline(params_str, line_index, offset + 3 + params_start)
+            return LLMReference('database', db_name, params)
+        else:
+            return LLMReference('database', db_part.strip())
+    
+    def _finalize_result(self) -> None:
+        """Finaliza o resultado adicionando todas as estruturas parseadas"""
+        # IFs sem END (ou ainda abertos no streaming) ficam com o texto lido até aqui
+        for block in self.block_stack:
+            block.flush_text()
+        if self.if_blocks:
+            self.result['if_blocks'] = self.if_blocks
+        if self.api_calls:
+            self.result['api_calls'] = self.api_calls
+        if self.llm_references:
+            self.result['llm_references'] = self.llm_references
+        if self.loop_guards:
+            self.result['loop_guards'] = self.loop_guards
+        if self.variables:
+            self.result['variables'] = self.variables
+        if self.functions:
+            self.result['functions'] = self.functions
+        if self.classes:
+            self.result['classes'] = self.classes
+        if self.calls:
+            self.result['calls'] = self.calls
+        if self.error_handlers:
+            self.result['error_handlers'] = self.error_handlers
+        if self.for_loops:
+            self.result['for_loops'] = self.for_loops
+        if self.connections:
+            self.result['connections'] = self.connections
+
+def parse_tagscript(content: str, cache: Optional['ParseCache'] = None,
+                    profile: Optional['ParserProfile'] = None,
+                    interning: Optional['InternTable'] = None) -> Dict[str, Any]:
+    """Função de conveniência para manter compatibilidade com código existente
+    
+    Com um ParseCache, conteúdos já parseados pela mesma versão do parser são
+    devolvidos do cache sem parsing. Com um ParserProfile o parsing é sempre
+    executado e instrumentado. Com um InternTable os identificadores e chaves
+    são internados (ver interning.py).
+    """
+    if cache is not None and profile is None:
+        result = cache.get(content)
+        if result is not None:
+            return result
+    parser = TagScriptParser(profile, interning=interning)
+    result = parser.parse(content)
+    if cache is not None:
+        cache.put(content, result)
+    return result
+
+def parse_ast(content: str, spans: bool = False, interning: Optional['InternTable'] = None) -> Dict[str, Any]:
+    """Como parse_tagscript, mas com nós compactos da AST (ver nodes.py)
+
+    Com spans=True cada nó traz o seu trecho do código-fonte e os textos
+    copiados do fonte são lidos sob demanda (ver spans.py).
+    """
+    return TagScriptParser(spans=spans, interning=interning).parse_ast(content)
+
+class Diagnostic:
+    """Problema encontrado por validate_tagscript, com linha e coluna (base 1)"""
+
+    __slots__ = ('code', 'message', 'line', 'column')
+
+    def __init__(self, code: str, message: str, line: Optional[int] = None, column: Optional[int] = None):
+        # E_SYNTAX (valor {...} inválido), E_API_TARGET, E_TASK/E_ACTION/E_GOAL (TAG ausente)
+        self.code = code
+        self.message = message
+        # None nos diagnósticos do script inteiro (TAG obrigatória ausente)
+        self.line = line
+        self.column = column
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'code': self.code, 'message': self.message, 'line': self.line, 'column': self.column}
+
+    def __repr__(self) -> str:
+        return f"Diagnostic({self.code}, linha {self.line}, coluna {self.column}: {self.message})"
+
+def validate_tagscript(content: str, fail_fast: bool = False, require_tags: bool = False) -> List[Diagnostic]:
+    """Verifica a gramática do script sem montar o resultado
+
+    Faz as mesmas verificações de parse_tagscript, com a mesma recuperação de
+    erros (a linha do erro é ignorada e o parsing segue na próxima), mas os
+    valores {...} são só validados (values.check_value) e nenhum nó, dict ou
+    lista do resultado é criado. Os diagnósticos coincidem com
+    TagScriptParser.errors. Com fail_fast=True para no primeiro diagnóstico;
+    com require_tags=True acrescenta as TAGs TASK/ACTION/GOAL ausentes.
+    """
+    lines = content.split('\n')
+    diagnostics = []
+    seen = set()
+    # Offset do início da linha i em content
+    offset = 0
+    i = 0
+    while i < len(lines):
+        token = classify_line(lines[i], i + 1)
+        consumed_lines = 1
+        if token is not None:
+            seen.add(token.type)
+            check = _STATEMENT_CHECKS.get(token.type)
+            if check is not None:
+                try:
+                    consumed_lines = check(token, content, lines, i, offset)
+                except ValueParseError as e:
+                    diagnostics.append(Diagnostic('E_SYNTAX', e.message, e.line, e.column))
+                    consumed_lines = 1
+                except ValueError as e:
+                    diagnostics.append(Diagnostic('E_API_TARGET', str(e), i + 1, token.column))
+                    consumed_lines = 1
+                if fail_fast and diagnostics:
+                    return diagnostics
+        end = i + consumed_lines
+        while i < end:
+            offset += len(lines[i]) + 1
+            i += 1
+
+    if require_tags:
+        for token_type, tag, code in _REQUIRED_TAGS:
+            if token_type not in seen:
+                diagnostics.append(Diagnostic(code, f"Missing {tag}"))
+                if fail_fast:
+                    break
+    return diagnostics
+
+def _check_block(content: str, lines: List[str], line_index: int, offset: int, brace_start: int) -> int:
+    """Valida o bloco {...} da linha (como _parse_multiline_json) e retorna as linhas consumidas"""
+    brace_pos = lines[line_index].find('{', brace_start)
+    if brace_pos == -1:
+        return 1
+    start = offset + brace_pos
+    end = check_value(content, start)
+    return content.count('\n', start, end) + 1
+
+def _check_inline(text: str, content: str, start: int) -> None:
+    """Valida um trecho que começa em content[start] (como TagScriptParser._parse_inline)"""
+    try:
+        check_literal(text)
+    except ValueParseError as e:
+        raise ValueParseError(e.message, start + e.position, content) from None
+
+def _check_class(token: Token, content: str, lines: List[str], line_index: int, offset: int) -> int:
+    if not _IDENTIFIER_PATTERN.match(token.value):
+        return 1
+    i = line_index + 1
+    while i < len(lines):
+        prop_line = lines[i].strip()
+        if not prop_line or prop_line.startswith('#') or ':' not in prop_line \
+                or prop_line.startswith(_CLASS_BODY_TERMINATORS):
+            break
+        i += 1
+    return i - line_index
+
+def _check_function(token: Token, content: str, lines: List[str], line_index: int, offset: int) -> int:
+    if not _IDENTIFIER_PATTERN.match(token.value):
+        return 1
+    i = line_index + 1
+    while i < len(lines):
+        func_line = lines[i].strip()
+        if not func_line or func_line.startswith(('#', 'END', 'DEFINE FUNCTION')):
+            break
+        i += 1
+    return i - line_index
+
+def _check_api_call(token: Token, content: str, lines: List[str], line_index: int, offset: int) -> int:
+    api_match = _API_CALL_PATTERN.match(token.value)
+    if not api_match:
+        return 1
+    consumed_lines = 1
+    value_offset = token.column - 1 + len(token.text) - len(token.value)
+    payload_start = value_offset + api_match.start(2)
+    if token.value.startswith('{', api_match.start(2)):
+        consumed_lines = _check_block(content, lines, line_index, offset, payload_start)
+    else:
+        _check_inline(api_match.group(2), content, offset + payload_start)
+
+    service_endpoint = api_match.group(1)
+    if '@' in service_endpoint:
+        # Referência inline: parâmetros entre o primeiro '{' e o último '}'
+        reference = service_endpoint[1:]
+        for prefix, length in _REFERENCE_PREFIXES:
+            if reference.startswith(prefix):
+                part = reference[length:]
+                if '{' in part and '}' in part:
+                    params_start = part.find('{')
+                    _check_inline(part[params_start:part.rfind('}') + 1], content,
+                                  offset + value_offset + 1 + length + params_start)
+                break
+    elif '.' not in service_endpoint:
+        raise ValueError(_API_TARGET_MESSAGE.format(service_endpoint))
+    return consumed_lines
+
+def _check_reference(token: Token, content: str, lines: List[str], line_index: int, offset: int) -> int:
+    for prefix, length in _REFERENCE_PREFIXES:
+        if token.value.startswith(prefix):
+            if token.value.find('{', length) == -1:
+                return 1
+            return _check_block(content, lines, line_index, offset, token.column)
+    return 1
+
+def _check_loopguard(token: Token, content: str, lines: List[str], line_index: int, offset: int) -> int:
+    params_str = token.value
+    if params_str.startswith('{'):
+        return _check_block(content, lines, line_index, offset, 0)
+    if params_str:
+        value_offset = offset + token.column - 1 + len(token.text) - len(params_str)
+        _check_inline('{' + params_str + '}', content, value_offset - 1)
+    return 1
+
+def _check_connection(token: Token, content: str, lines: List[str], line_index: int, offset: int) -> int:
+    connect_match = _CONNECT_PATTERN.match(token.value)
+    if connect_match and connect_match.group(3):
+        return _check_block(content, lines, line_index, offset, token.column)
+    return 1
+
+# Verificação de cada statement que pode falhar ou consumir mais de uma linha;
+# os demais (TAGs, IF, ELSE, END, CALL, FOR EACH, ON ERROR, texto) ocupam uma linha e não falham
+_STATEMENT_CHECKS = {
+    lexer.CLASS: _check_class,
+    lexer.DEFINE_FUNCTION: _check_function,
+    lexer.CALL_API: _check_api_call,
+    lexer.REFERENCE: _check_reference,
+    lexer.LOOPGUARD: _check_loopguard,
+    lexer.CONNECT: _check_connection,
+}
+
+def iter_statement_chunks(lines: Iterable[str], first_index: int = 0) -> Iterator[Tuple[int, str, List[str]]]:
+    """Agrupa linhas em statements de nível superior completos.
+    
+    Cada grupo (índice da primeira linha, tipo do token inicial, linhas) traz
+    tudo o que o parser pode consumir junto com a instrução inicial: o bloco
+    {...} até o fechamento, as linhas seguintes de CLASS/DEFINE FUNCTION até
+    uma linha em branco e, para IF, tudo até o END correspondente. Linhas em
+    branco e comentários entre statements são descartados.
+    
+    Os limites nunca cortam algo que o parser consumiria de uma vez; quando a
+    recuperação de erros deixa um IF aberto no fim do grupo, o statement
+    continua no grupo seguinte (ver iter_parsed_statements).
+    """
+    chunk = []
+    start = 0
+    kind = None
+    brace_depth = 0
+    block_depth = 0
+    in_body = False
+    
+    for index, raw_line in enumerate(lines, first_index):
+        token = classify_line(raw_line, index + 1)
+        
+        if chunk:
+            if token is None and not brace_depth and not block_depth:
+                # Linha em branco ou comentário encerra o corpo de CLASS/FUNCTION
+                yield start, kind, chunk
+                chunk = []
+                continue
+            chunk.append(raw_line)
+        elif token is None:
+            continue
+        else:
+            start = index
+            kind = token.type
+            chunk = [raw_line]
+            brace_depth = block_depth = 0
+            in_body = kind in _BODY_STATEMENTS
+        
+        if token is not None:
+            if brace_depth:
+                pass
+            elif token.type == lexer.IF and _IF_PATTERN.match(token.value):
+                block_depth += 1
+            elif token.type == lexer.END and block_depth:
+                block_depth -= 1
+            if token.type in _BODY_STATEMENTS:
+                # Também vale para corpos expostos pela recuperação de erros
+                in_body = True
+            if _BRACKET_CHARS_PATTERN.search(raw_line):
+                brace_depth = bracket_depth(raw_line, brace_depth)
+        
+        if not in_body and not brace_depth and not block_depth:
+            yield start, kind, chunk
+            chunk = []
+    
+    if chunk:
+        yield start, kind, chunk
+
+def iter_parse(fileobj: Iterable[str], profile: Optional['ParserProfile'] = None,
+               interning: Optional['InternTable'] = None) -> Iterator[Dict[str, Any]]:
+    """Parse em streaming: gera cada statement de nível superior assim que fecha.
+    
+    As linhas são lidas sob demanda de fileobj (um arquivo aberto em modo
+    texto ou qualquer iterável de linhas), então a memória usada é
+    proporcional ao maior statement e não ao arquivo. Cada evento traz o tipo
+    do statement, suas linhas (1-based) e um resultado parcial no mesmo
+    formato de parse_tagscript; merge_results() reconstrói o resultado
+    completo a partir dos eventos.
+    """
+    lines = (line[:-1] if line.endswith('\n') else line for line in fileobj)
+    for start, end, kind, result in iter_parsed_statements(lines, profile=profile, interning=interning):
+        if result:
+            yield {
+                'kind': _STATEMENT_KINDS[kind],
+                'line_number': start + 1,
+                'end_line': end + 1,
+                'result': result
+            }
+
+def iter_parsed_statements(lines: Iterable[str], first_index: int = 0,
+                           profile: Optional['ParserProfile'] = None,
+                           interning: Optional['InternTable'] = None) -> Iterator[Tuple[int, int, str, Dict[str, Any]]]:
+    """Parseia os statements de iter_statement_chunks um a um.
+    
+    Gera (primeira linha, última linha, tipo do token inicial, resultado
+    parcial), com índices de linha 0-based. Um statement só termina quando o
+    parser não tem bloco IF aberto, então o resultado combinado é sempre igual
+    ao do parse completo, inclusive em scripts malformados.
+    """
+    parser = TagScriptParser(profile, interning=interning)
+    pending = None
+    for start, kind, chunk in iter_statement_chunks(lines, first_index):
+        end = start + len(chunk) - 1
+        if pending is None:
+            pending = start, kind
+            result = parser.parse_statement(chunk, start)
+        else:
+            result = parser.parse_statement(chunk, start, resume=True)
+        if not parser.in_block:
+            yield pending[0], end, pending[1], result
+            pending = None
+    
+    if pending is not None:
+        yield pending[0], end, pending[1], result
+
+def merge_results(results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combina resultados parciais (em ordem) no formato de parse_tagscript
+    
+    Os índices dos corpos dos blocos (body/else_body) são deslocados para as
+    posições das listas combinadas; os resultados parciais não são alterados.
+    """
+    merged = {}
+    for partial in results:
+        offsets = {key: len(value) for key, value in merged.items() if isinstance(value, list)}
+        for key, value in partial.items():
+            if isinstance(value, list):
+                if key in _BLOCK_KEYS and offsets:
+                    value = [_shift_body(block, offsets) for block in value]
+                merged.setdefault(key, []).extend(value)
+            else:
+                merged[key] = value
+    return merged
+
+def _shift_body(block: Dict[str, Any], offsets: Dict[str, int]) -> Dict[str, Any]:
+    """Cópia de um bloco com os StatementRef do corpo apontando para as listas combinadas"""
+    block = dict(block)
+    for key in ('body', 'else_body'):
+        if key in block:
+            block[key] = [dict(ref, index=ref['index'] + offsets.get(ref['kind'], 0)) for ref in block[key]]
+    return block
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Testes do modo batch (vários arquivos em um processo pool)
+"""
+
+import io
+import json
+import os
+import sys
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from batch import collect_inputs, run_batch
+from main import parse_tagscript
+
+SCRIPTS = {
+    'a.tag': 'TASK: Primeiro\nCALL passo()',
+    os.path.join('sub', 'b.tag'): '@db:vendas { limit: 5 }',
+    os.path.join('sub', 'c.tag'): 'GOAL: Terceiro',
+}
+
+
+def write_scripts(directory):
+    for name, content in SCRIPTS.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+
+
+def test_collect_inputs_expands_directories_and_globs(tmp_path):
+    """Diretórios são percorridos recursivamente e globs expandidos, sem repetições"""
+    write_scripts(tmp_path)
+    (tmp_path / 'notas.txt').write_text('não é tag', encoding='utf-8')
+
+    from_dir = collect_inputs([str(tmp_path)])
+    from_glob = collect_inputs([str(tmp_path / '**' / '*.tag'), str(tmp_path / 'a.tag')])
+
+    expected = sorted(str(tmp_path / name) for name in SCRIPTS)
+    assert from_dir == expected
+    assert from_glob == expected
+
+
+def test_batch_ndjson_matches_single_file_parse(tmp_path):
+    """Cada linha do NDJSON combinado traz o mesmo resultado de parse_tagscript"""
+    write_scripts(tmp_path)
+    paths = collect_inputs([str(tmp_path)])
+    out = io.StringIO()
+
+    summary = run_batch(paths, out, workers=2)
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [record['file'] for record in records] == paths
+    for record in records:
+        with open(record['file'], encoding='utf-8') as f:
+            assert record['result'] == parse_tagscript(f.read())
+    assert (summary['ok'], summary['failed']) == (3, 0)
+
+
+def test_failures_are_reported_per_file(tmp_path):
+    """Um arquivo ilegível não interrompe o batch"""
+    write_scripts(tmp_path)
+    (tmp_path / 'quebrado.tag').write_bytes(b'TASK: \xff\xfe')
+    paths = collect_inputs([str(tmp_path)]) + [str(tmp_path / 'ausente.tag')]
+
+    summary = run_batch(paths, output_dir=str(tmp_path / 'saida'), workers=2)
+
+    assert (summary['ok'], summary['failed']) == (3, 2)
+    assert sorted(os.path.basename(path) for path, _ in summary['failures']) == ['ausente.tag', 'quebrado.tag']
+    assert json.loads((tmp_path / 'saida' / 'sub' / 'b.json').read_text(encoding='utf-8')) == \
+        parse_tagscript(SCRIPTS[os.path.join('sub', 'b.tag')])
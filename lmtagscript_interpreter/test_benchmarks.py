@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Testes do gerador de workloads e do gate de regressão dos benchmarks
+"""
+
+import sys
+import os
+
+# Adicionar o diretório atual e o dos benchmarks ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from bench_parser import compare
+from generator import generate_script
+from main import TagScriptParser
+
+
+def test_generated_script_is_valid_and_follows_the_mix():
+    """O script sintético parseia sem erros e tem os statements pedidos"""
+    script = generate_script(60, mix={'ref': 1, 'api': 1, 'call': 1}, params=6, depth=3, seed=7)
+    parser = TagScriptParser()
+    result = parser.parse(script)
+
+    assert parser.errors == []
+    assert len(result['llm_references']) + len(result['api_calls']) + len(result['calls']) == 60
+    assert generate_script(60, seed=7) == generate_script(60, seed=7)
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    """Queda de vazão ou aumento de memória acima do limite viram regressões"""
+    baseline = {'cases': {'misto': {'lines_per_sec': 1000.0, 'peak_kib': 100.0}}}
+    within = {'cases': {'misto': {'lines_per_sec': 950.0, 'peak_kib': 105.0}}}
+    slower = {'cases': {'misto': {'lines_per_sec': 800.0, 'peak_kib': 130.0}}}
+
+    assert compare(baseline, within, 0.10) == []
+    assert len(compare(baseline, slower, 0.10)) == 2
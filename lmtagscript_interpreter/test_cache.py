@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Testes do cache de parsing endereçado por conteúdo
+"""
+
+import os
+import subprocess
+import sys
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cache
+from cache import ParseCache
+from main import parse_tagscript
+from planner import plan_workflow
+from tagc import compile_file, load_compiled
+from values import QuotedString
+
+SCRIPT = 'TASK: Analisar\n@db:vendas { limit: 10 }\nCALL processar()'
+
+
+def test_memory_hit_returns_independent_copy():
+    """O segundo parse vem do cache e alterar o resultado não afeta o cache"""
+    parse_cache = ParseCache()
+    first = parse_tagscript(SCRIPT, cache=parse_cache)
+    first['task'].append('alterado')
+    second = parse_tagscript(SCRIPT, cache=parse_cache)
+
+    assert second == parse_tagscript(SCRIPT)
+    assert (parse_cache.hits, parse_cache.misses) == (1, 1)
+
+
+def test_disk_cache_survives_new_instance(tmp_path):
+    """Uma nova instância sobre o mesmo diretório acerta sem re-parsear"""
+    parse_tagscript(SCRIPT, cache=ParseCache(str(tmp_path)))
+    warm = ParseCache(str(tmp_path))
+    assert warm.get(SCRIPT) == parse_tagscript(SCRIPT)
+    assert warm.hits == 1
+
+
+def test_parser_version_is_part_of_the_key(tmp_path, monkeypatch):
+    """Mudar a versão do parser invalida as entradas antigas"""
+    parse_cache = ParseCache(str(tmp_path))
+    parse_tagscript(SCRIPT, cache=parse_cache)
+    monkeypatch.setattr(cache, '_parser_version', 'outra-versao')
+    assert parse_cache.get(SCRIPT) is None
+
+
+def test_eviction_respects_limits(tmp_path):
+    """LRU em memória e limite de bytes em disco descartam as entradas antigas"""
+    parse_cache = ParseCache(str(tmp_path), max_entries=2, max_bytes=400)
+    scripts = [f'TASK: tarefa {n}\nGOAL: {"x" * 100}' for n in range(5)]
+    for script in scripts:
+        parse_tagscript(script, cache=parse_cache)
+
+    assert parse_cache.stats()['memory_entries'] == 2
+    assert parse_cache.evictions > 0
+    on_disk = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert on_disk <= 400
+    assert parse_cache.get(scripts[-1]) is not None
+
+
+def test_invalidate_removes_everything(tmp_path):
+    """invalidate() esvazia memória e disco"""
+    parse_cache = ParseCache(str(tmp_path))
+    parse_tagscript(SCRIPT, cache=parse_cache)
+    assert parse_cache.invalidate() == 1
+    assert ParseCache(str(tmp_path)).get(SCRIPT) is None
+    assert parse_cache.get(SCRIPT) is None
+
+
+def test_cli_disk_cache_is_opt_in(tmp_path):
+    """Uma execução comum da CLI não grava cache; --cache-dir ativa o cache em disco"""
+    script = tmp_path / 'script.tag'
+    script.write_text(SCRIPT, encoding='utf-8')
+    env = {key: value for key, value in os.environ.items() if key != 'LMTAGSCRIPT_CACHE_DIR'}
+    env.update(HOME=str(tmp_path / 'home'), XDG_CACHE_HOME=str(tmp_path / 'xdg'))
+    main = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+    def run(*extra):
+        command = [sys.executable, main, '-i', str(script), '-o', str(tmp_path / 'out.json'), *extra]
+        subprocess.run(command, check=True, capture_output=True, env=env, cwd=str(tmp_path))
+
+    run()
+    assert sorted(os.listdir(tmp_path)) == ['out.json', 'script.tag']
+    run('--cache-dir', str(tmp_path / 'cache'))
+    assert ParseCache(str(tmp_path / 'cache')).get(SCRIPT) == parse_tagscript(SCRIPT)
+
+
+def test_quoted_strings_survive_cache_and_tagc(tmp_path):
+    """Cache em disco e .tagc devolvem os textos entre aspas marcados: o plano é o mesmo"""
+    source = '@db:read { limit: 1 }\n@tool:acesso { permission: "read", outros: [["read"], "\\u0000x"] }'
+    cold = plan_workflow(parse_tagscript(source, cache=ParseCache(str(tmp_path / 'cache'))))
+    warm_result = parse_tagscript(source, cache=ParseCache(str(tmp_path / 'cache')))
+    path = tmp_path / 'acesso.tag'
+    path.write_text(source, encoding='utf-8')
+    with load_compiled(compile_file(str(path))) as compiled:
+        compiled_result = compiled.to_dict()
+
+    for result in (warm_result, compiled_result):
+        parameters = result['llm_references'][1]['parameters']
+        assert type(parameters['permission']) is QuotedString
+        assert [type(value) for value in (parameters['outros'][0][0], parameters['outros'][1])] == \
+            [QuotedString, QuotedString] and parameters['outros'][1] == '\x00x'
+        assert plan_workflow(result).to_dict() == cold.to_dict()
+    assert cold.nodes['tool:acesso@2'].depends_on == []
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Testes das condições de IF: parse, compilação e avaliação em lote
+"""
+
+import sys
+import os
+import random
+
+import pytest
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import conditions
+from main import parse_tagscript
+from conditions import ConditionError, compile_condition, parse_condition
+
+
+def test_conditions_are_parsed_with_precedence():
+    """<= não é quebrado em <, AND liga mais forte que OR e cada operador aceita vários operandos"""
+    assert parse_condition('data_quality_score >= 0.8') == \
+        {'type': 'comparison', 'left': 'data_quality_score', 'operator': '>=', 'right': '0.8'}
+    assert parse_condition('a = 1 OR b <= 2 AND NOT c') == {
+        'type': 'logical', 'operator': 'OR',
+        'left': {'type': 'comparison', 'left': 'a', 'operator': '=', 'right': '1'},
+        'right': {'type': 'logical', 'operator': 'AND',
+                  'left': {'type': 'comparison', 'left': 'b', 'operator': '<=', 'right': '2'},
+                  'right': {'type': 'logical', 'operator': 'NOT', 'operand': {'type': 'raw', 'value': 'c'}}},
+    }
+    tree = parse_condition('(a OR b) AND c AND len(itens) > 2')
+    assert tree['left']['left']['operator'] == 'OR' and tree['right']['left'] == 'len(itens)'
+    assert parse_condition('lead.email IS NOT NULL')['operator'] == 'IS NOT'
+    assert parse_condition('x NOT IN ["a", "b"]')['right'] == '["a", "b"]'
+    assert parse_condition('a = = 1') == {'type': 'raw', 'value': 'a = = 1'}
+
+    result = parse_tagscript('IF status = "active" AND priority >= 5 THEN\n  @tool:x\nEND')
+    assert result['if_blocks'][0]['condition']['right']['operator'] == '>='
+
+
+def test_compiled_conditions_evaluate_scopes():
+    """A condição é compilada uma vez e avaliada por escopo"""
+    condition = compile_condition('lead.score >= minimo AND (lead.tags CONTAINS "vip" OR lead.pais IN ["BR", "PT"])')
+    assert compile_condition('lead.score >= minimo AND (lead.tags CONTAINS "vip" OR lead.pais IN ["BR", "PT"])') \
+        is condition
+    assert condition({'lead': {'score': 90, 'tags': ['vip']}, 'minimo': 50})
+    assert not condition({'lead': {'score': 90, 'tags': [], 'pais': 'US'}, 'minimo': 50})
+    # Nome ausente vale None; comparação entre tipos incompatíveis é falsa
+    assert not condition({'lead': {'score': 90, 'tags': ['vip']}})
+    assert compile_condition('lead.email IS NULL')({'lead': {}})
+    assert compile_condition(parse_condition('@db:crm.total > 3'))({'crm.total': 4})
+
+    assert compile_condition('dobro(x) = 4', functions={'dobro': lambda x: 2 * x})({'x': 2})
+    with pytest.raises(ConditionError):
+        compile_condition('desconhecida(x)')
+    with pytest.raises(ConditionError):
+        compile_condition('a = = 1')
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_batch_evaluation_matches_per_record(monkeypatch, use_numpy):
+    """evaluate_many dá o mesmo resultado que avaliar registro a registro, com ou sem NumPy"""
+    if use_numpy:
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(conditions, '_numpy_checked', False)
+    else:
+        monkeypatch.setattr(conditions, 'numpy', None)
+        monkeypatch.setattr(conditions, '_numpy_checked', True)
+
+    rng = random.Random(7)
+    leads = [{'score': rng.randint(0, 100), 'valor': rng.random() * 1000, 'nome': rng.choice(['ana', 'bia']),
+              'tags': ['vip'] if i % 3 == 0 else []} for i in range(2000)]
+    leads[5] = {'score': None, 'nome': 'ana'}
+    condition = compile_condition('lead.score >= 50 AND lead.valor < limite OR lead.nome = "ana" '
+                                  'AND NOT lead.tags CONTAINS "vip"')
+    expected = [condition({'lead': lead, 'limite': 500}) for lead in leads]
+    assert condition.evaluate_many(leads, variable='lead', scope={'limite': 500}) == expected
+    assert condition.select(leads, variable='lead', scope={'limite': 500}) == \
+        [lead for lead, keep in zip(leads, expected) if keep]
+
+    # Sem variable, cada registro é o escopo dos nomes
+    rows = [{'a': i, 'b': i % 2} for i in range(100)]
+    assert compile_condition('a > 90 OR b = 1 AND limite').evaluate_many(rows, scope={'limite': False}) == \
+        [row['a'] > 90 for row in rows]
+    assert compile_condition('limite').evaluate_many(rows, scope={'limite': True}) == [True] * 100
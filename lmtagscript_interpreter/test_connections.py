@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Testes do CONNECT e do pool de conexões, contra um servidor HTTP local
+"""
+
+import json
+import threading
+import time
+import sys
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import parse_tagscript
+from connections import ConnectionManager, ServiceCallError, ServiceConfigError
+from runtime import HandlerRegistry, run_workflow
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Ecoa caminho, payload e Authorization; cada conexão TCP tem uma porta de cliente própria"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'] or 0)) or 'null')
+        self.server.requests.append((self.client_address[1], self.path))
+        status = 500 if self.path.endswith('/falha') else 200
+        body = json.dumps({'path': self.path, 'payload': payload,
+                           'auth': self.headers.get('Authorization')}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _script(port: int, calls: int, extra: str = '') -> str:
+    lines = ['CONNECT TO api AS estoque {',
+             f'  url: "http://127.0.0.1:{port}/v1",',
+             f'  token: ENV("ESTOQUE_TOKEN"){extra}',
+             '}']
+    lines += [f'CALL API estoque.itens.consultar WITH {{ sku: "A-{i}" }}' for i in range(calls)]
+    return '\n'.join(lines)
+
+
+def test_connect_is_parsed_with_env_markers():
+    """CONNECT vira um nó em connections, com ENV(...) sem resolver"""
+    result = parse_tagscript(_script(8080, 1, ',\n  "pool_size": "2"'))
+    assert result['connections'] == [{
+        'type': 'api', 'name': 'estoque', 'line_number': 1,
+        'config': {'url': 'http://127.0.0.1:8080/v1', 'token': {'env': 'ESTOQUE_TOKEN'},
+                   'pool_size': '2'},
+    }]
+    assert result['api_calls'][0]['line_number'] == 6
+
+
+def test_calls_reuse_pooled_connections(stub_server):
+    """Todas as chamadas ao serviço reaproveitam o pool; o ENV é lido uma vez"""
+    reads = []
+
+    class Environ(dict):
+        def __getitem__(self, key):
+            reads.append(key)
+            return super().__getitem__(key)
+
+    port = stub_server.server_address[1]
+    result = parse_tagscript(_script(port, 6, ',\n  pool_size: "2"'))
+    registry = HandlerRegistry()
+    with ConnectionManager(environ=Environ(ESTOQUE_TOKEN='segredo')) as connections:
+        assert connections.configure(result) == ['estoque']
+        connections.register(registry)
+        run = run_workflow(result, registry, concurrency=6)
+        stats = connections.stats()['estoque']
+
+    assert run.ok
+    assert run.outputs[6] == {'path': '/v1/itens/consultar', 'payload': {'sku': 'A-0'},
+                              'auth': 'Bearer segredo'}
+    assert reads == ['ESTOQUE_TOKEN']
+    # No máximo pool_size conexões TCP para 6 chamadas
+    assert stats['created'] <= 2 and stats['created'] + stats['reused'] == 6
+    assert len({client_port for client_port, _ in stub_server.requests}) == stats['created']
+
+
+def test_idle_connections_are_evicted(stub_server):
+    """Conexões ociosas além de idle_timeout são fechadas e substituídas"""
+    port = stub_server.server_address[1]
+    with ConnectionManager(idle_timeout=0.05) as connections:
+        connections.declare('estoque', {'url': f'http://127.0.0.1:{port}'})
+        connections.call('estoque', 'ping')
+        connections.call('estoque', 'ping')
+        time.sleep(0.1)
+        connections.call('estoque', 'ping')
+        assert connections.stats()['estoque'] == {'created': 2, 'reused': 1, 'evicted': 1, 'idle': 1}
+
+        with pytest.raises(ServiceCallError) as error:
+            connections.call('estoque', 'falha', {'x': 1})
+        assert error.value.status == 500 and error.value.body['payload'] == {'x': 1}
+
+
+def test_invalid_connections_fail_on_first_use():
+    """ENV(...) ausente ou url inválida levantam ServiceConfigError"""
+    connections = ConnectionManager(environ={})
+    connections.configure(parse_tagscript(_script(8080, 0)))
+    with pytest.raises(ServiceConfigError, match='ESTOQUE_TOKEN'):
+        connections.pool('estoque')
+    connections.declare('ftp', {'url': 'ftp://exemplo'})
+    with pytest.raises(ServiceConfigError):
+        connections.pool('ftp')
+    with pytest.raises(LookupError):
+        connections.pool('ausente')
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Testes da execução de referências @db
+"""
+
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import parse_tagscript
+from database import DatabaseExecutor, DatabaseReferenceError, RowStream, SQLiteAdapter
+from runtime import HandlerRegistry, run_workflow
+
+SCRIPT = '\n'.join([
+    'FOR EACH lead IN leads DO',
+    '  @db:crm { operation: "insert", table: "leads", values: { id: lead.id, nome: lead.nome } }',
+    'END',
+])
+
+
+@pytest.fixture
+def databases(tmp_path):
+    executor = DatabaseExecutor({'crm': SQLiteAdapter(str(tmp_path / 'crm.db'))}, arraysize=10)
+    executor.execute('crm', {'query': 'CREATE TABLE leads (id INTEGER PRIMARY KEY, nome TEXT, score INTEGER)'})
+    with executor:
+        yield executor
+
+
+def test_statements_are_cached_and_queries_stream(databases):
+    """O SQL de cada forma de operação é montado uma vez; o SELECT é lido em blocos"""
+    for i in range(50):
+        databases.execute('crm', {'operation': 'insert', 'table': 'leads', 'values': {'id': i, 'nome': f'l{i}'}})
+    assert databases.statements.misses == 1 and databases.statements.hits == 49
+
+    rows = databases.execute('crm', {'query': 'SELECT id, nome FROM leads', 'order_by': 'id DESC', 'limit': 25})
+    assert isinstance(rows, RowStream) and rows.columns == ['id', 'nome']
+    rows = list(rows)
+    assert len(rows) == 25 and rows[0] == {'id': 49, 'nome': 'l49'}
+
+    update = databases.execute('crm', {'operation': 'update', 'table': 'leads', 'values': {'score': 10},
+                                       'where': 'id < ?', 'where_params': [5]})
+    assert update['rowcount'] == 5
+    with pytest.raises(DatabaseReferenceError):
+        databases.execute('crm', {'operation': 'insert', 'table': 'leads; DROP', 'values': {'id': 1}})
+    with pytest.raises(DatabaseReferenceError):
+        databases.execute('vendas', {'query': 'SELECT 1'})
+
+
+def test_consecutive_writes_are_batched_in_order(databases):
+    """Escritas concorrentes viram um executemany; uma escrita diferente fecha o lote"""
+    async def scenario():
+        inserts = [databases.submit('crm', {'operation': 'insert', 'table': 'leads',
+                                            'values': {'id': i, 'nome': 'x'}}) for i in range(20)]
+        update = databases.submit('crm', {'operation': 'update', 'table': 'leads', 'values': {'score': 1},
+                                          'where': 'id >= 10'})
+        query = databases.submit('crm', {'query': 'SELECT SUM(score) AS total FROM leads'})
+        return await asyncio.gather(*inserts, update, query)
+
+    *inserts, update, query = asyncio.run(scenario())
+    assert inserts[0] == {'operation': 'insert', 'table': 'leads', 'rows': 1, 'batch': 20, 'rowcount': 20}
+    assert update['rowcount'] == 10
+    assert list(query) == [{'total': 10}]
+    assert databases.stats()['batches'] == 2
+
+    # Uma falha no lote chega só à operação que falhou; as demais são gravadas
+    async def duplicate():
+        return await asyncio.gather(*[databases.submit('crm', {'operation': 'insert', 'table': 'leads',
+                                                               'values': {'id': i}}) for i in (100, 101, 101, 102)],
+                                    return_exceptions=True)
+    outcomes = asyncio.run(duplicate())
+    assert [type(outcome).__name__ for outcome in outcomes] == ['dict', 'dict', 'IntegrityError', 'dict']
+    assert outcomes[0] == {'operation': 'insert', 'table': 'leads', 'rows': 1, 'batch': 1, 'rowcount': 1}
+    assert list(databases.execute('crm', {'query': 'SELECT COUNT(*) AS n FROM leads'})) == [{'n': 23}]
+
+
+def test_loop_inserts_run_as_a_single_batch(databases):
+    """Os inserts dos itens de um FOR EACH são agrupados pelo handler do runtime"""
+    registry = HandlerRegistry()
+    databases.register(registry)
+    leads = [{'id': i, 'nome': f'lead {i}'} for i in range(30)]
+    # Cada insert ocupa uma vaga de concurrency até o lote rodar: o lote tem no máximo concurrency operações
+    run = run_workflow(parse_tagscript(SCRIPT), registry, ctx={'leads': leads}, concurrency=30, loop_workers=30)
+
+    assert run.ok and run.outputs[1] == {'items': 30, 'ok': 30, 'failed': 0, 'skipped': 0}
+    assert databases.stats()['batches'] == 1 and databases.stats()['batched_operations'] == 30
+    assert list(databases.execute('crm', {'query': 'SELECT nome FROM leads WHERE id = ?', 'params': [7]})) == \
+        [{'nome': 'lead 7'}]
+
+
+def test_query_result_feeds_two_loops(databases):
+    """Dois FOR EACH sobre o mesmo SELECT: cada iteração refaz a consulta em um cursor próprio"""
+    for i in range(25):
+        databases.execute('crm', {'operation': 'insert', 'table': 'leads', 'values': {'id': i, 'nome': f'l{i}'}})
+    registry = HandlerRegistry()
+    databases.register(registry)
+    seen = []
+
+    async def tool(step, ctx):
+        seen.append((step.target, ctx['results']['r']['id']))
+
+    registry.register('tool', tool)
+    script = '\n'.join([
+        '@db:crm { query: "SELECT id FROM leads" }',
+        'FOR EACH r IN crm DO',
+        '  @tool:a',
+        'END',
+        'FOR EACH r IN crm DO',
+        '  @tool:b',
+        'END',
+    ])
+    run = run_workflow(parse_tagscript(script), registry)
+
+    assert run.ok
+    assert sorted(seen) == [(name, i) for name in 'ab' for i in range(25)]
+    rows = databases.execute('crm', {'query': 'SELECT id FROM leads WHERE id < 2'})
+    assert list(rows) == list(rows) == [{'id': 0}, {'id': 1}]
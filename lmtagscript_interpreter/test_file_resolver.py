@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Testes do resolvedor de referências @file
+"""
+
+import sys
+import os
+
+import pytest
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import parse_tagscript
+from file_resolver import FileReference, FileReferenceError, FileResolver
+from runtime import HandlerRegistry, run_workflow
+
+SCRIPT = '\n'.join([
+    '@file:"/dados/vendas.csv" { permission: "read", format: "csv" }',
+    '@file:"/dados/notas.txt"',
+    '@file:"/saida/resumo.jsonl" { permission: "write", format: "jsonl" }',
+    'FOR EACH arquivo IN lista DO',
+    '  @file:arquivo.path',
+    'END',
+    'CALL API relatorios.gerar WITH { dados: /dados/vendas.csv }',
+])
+
+
+@pytest.fixture
+def data_root(tmp_path):
+    (tmp_path / 'dados').mkdir()
+    with open(tmp_path / 'dados' / 'vendas.csv', 'w', encoding='utf-8', newline='') as f:
+        f.write('regiao,total\n')
+        for i in range(5000):
+            f.write(f'"sul, {i}",{i}\n')
+    (tmp_path / 'dados' / 'notas.txt').write_text('primeira\nsegunda\r\nterceira', encoding='utf-8')
+    return tmp_path
+
+
+def test_references_stream_content_by_format(data_root):
+    """CSV vira registros, texto vira linhas e binário vira fatias do mmap"""
+    with FileResolver(root=str(data_root), chunk_size=4096) as files:
+        rows = iter(files.open('/dados/vendas.csv', {'format': 'csv'}))
+        assert next(rows) == {'regiao': 'sul, 0', 'total': '0'}
+        assert sum(1 for _ in rows) == 4999
+        assert list(files.open('dados/notas.txt')) == ['primeira', 'segunda', 'terceira']
+
+        binary = files.open('/dados/vendas.csv', {'format': 'binary'})
+        chunks = list(binary.chunks())
+        assert len(chunks) > 1 and all(isinstance(chunk, memoryview) for chunk in chunks)
+        assert sum(len(chunk) for chunk in chunks) == binary.size
+        assert chunks[0].obj is binary.mapped()
+        del chunks
+
+        assert files.open('/dados/vendas.csv', {'format': 'csv'}) is files.open('/dados/vendas.csv',
+                                                                              {'format': 'csv'})
+        with pytest.raises(FileReferenceError):
+            files.open('/../fora.txt')
+
+
+def test_permission_and_format_are_honoured(tmp_path):
+    """Sem permissão de escrita não grava; sem permissão de leitura não lê"""
+    path = str(tmp_path / 'saida' / 'resumo.jsonl')
+    writable = FileReference(path, {'permission': 'write', 'format': 'jsonl'})
+    assert writable.write_rows(iter([{'a': 1}, {'a': 2}])) == 2
+    with pytest.raises(PermissionError):
+        list(writable)
+
+    readable = FileReference(path, {'format': 'jsonl'})
+    assert list(readable) == [{'a': 1}, {'a': 2}]
+    with pytest.raises(PermissionError):
+        readable.write_rows([{'a': 3}])
+    with pytest.raises(FileReferenceError):
+        FileReference(path, {'format': 'xlsx'})
+
+
+def test_prefetch_uses_the_plan_and_feeds_the_runtime(data_root):
+    """Só os @file de leitura com caminho fixo são pré-carregados; os passos recebem as referências"""
+    result = parse_tagscript(SCRIPT)
+    with FileResolver(root=str(data_root)) as files:
+        assert [entry['path'] for entry in files.paths(result)] == ['/dados/vendas.csv', '/dados/notas.txt']
+        nested = parse_tagscript('ON ERROR\n  FOR EACH d IN dias DO\n    IF d THEN\n      @file:"/dados/dia.csv"\n'
+                                 '    END\n  END\n  @file:"/dados/erro.txt"\nEND')
+        assert [entry['path'] for entry in files.paths(nested)] == ['/dados/erro.txt']
+        futures = files.prefetch(result)
+        assert len(futures) == 2
+        for future in futures:
+            future.result()
+
+        registry = HandlerRegistry()
+        files.register(registry)
+        registry.register('api', lambda step, ctx: sum(int(row['total'])
+                                                       for row in ctx['results']['/dados/vendas.csv']))
+        # Um caminho no payload não gera dependência no plano: execução em série
+        run = run_workflow(result, registry, ctx={'lista': [{'path': '/dados/notas.txt'}]}, concurrency=1)
+
+    assert run.ok and run.outputs[7] == sum(range(5000))
+    assert isinstance(run.outputs[1], FileReference) and run.outputs[1].format == 'csv'
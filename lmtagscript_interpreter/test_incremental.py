@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Testes do parsing incremental
+"""
+
+import random
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from incremental import IncrementalParser
+from main import parse_tagscript
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', 'lmtagscript_boilerplate', 'examples', 'comprehensive_llm_example.tag')
+
+
+def load_example() -> str:
+    with open(EXAMPLE_PATH, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_initial_result_matches_full_parse():
+    """Sem edições o resultado é igual ao de parse_tagscript"""
+    content = load_example()
+    assert IncrementalParser(content).result == parse_tagscript(content)
+
+
+def test_edit_reparses_only_affected_statement():
+    """Editar um parâmetro de um @db re-parseia apenas aquele statement"""
+    content = load_example()
+    document = IncrementalParser(content)
+    line = content.split('\n').index('  limit: 1000,')
+    total = len(document.statements)
+
+    edit = document.apply_edit(line, 9, line, 13, '50')
+
+    assert [s.kind for s in edit.changed] == ['REFERENCE']
+    assert edit.changed[0].result['llm_references'][0]['parameters']['limit'] == 50
+    assert len(document.statements) == total
+    assert document.result == parse_tagscript(document.text)
+
+
+def test_inserted_lines_shift_line_numbers():
+    """Inserir linhas desloca line_number dos statements seguintes"""
+    document = IncrementalParser('TASK: a\n\nDEFINE FUNCTION f\n  TASK: x\n\nCALL f()')
+    edit = document.apply_edit(0, 7, 0, 7, '\nCLASS Pedido\n  id: int')
+
+    assert edit.line_delta == 2
+    assert document.result['calls'][0]['line_number'] == 8
+    assert document.result['functions'][0]['line_number'] == 5
+    assert document.result == parse_tagscript(document.text)
+
+    # Dados do usuário (config de CONNECT, condição de IF) não são deslocados, mesmo com a chave line_number
+    document = IncrementalParser('TASK: a\nCONNECT TO api AS crm { line_number: 7 }\nIF x THEN\nEND')
+    document.apply_edit(0, 7, 0, 7, '\n\n')
+    assert document.result['connections'][0]['config'] == {'line_number': 7}
+    assert document.result == parse_tagscript(document.text)
+
+
+def test_random_edits_match_full_parse():
+    """Sequências de edições aleatórias produzem o mesmo resultado do parse completo"""
+    rng = random.Random(1234)
+    snippets = ['', '\n', 'IF x = 1 THEN\n', 'END\n', '{', '}', '@tool:t { a: 1 }\n',
+                'CALL f()', 'TASK: nova\n', '"', 'DEFINE FUNCTION g\n', '# comentário\n']
+    document = IncrementalParser(load_example())
+
+    for _ in range(200):
+        lines = document.text.split('\n')
+        start_line = rng.randrange(len(lines))
+        end_line = min(len(lines) - 1, start_line + rng.randrange(3))
+        start_column = rng.randint(0, len(lines[start_line]))
+        end_column = rng.randint(0, len(lines[end_line]))
+        if end_line == start_line and end_column < start_column:
+            start_column, end_column = end_column, start_column
+        document.apply_edit(start_line, start_column, end_line, end_column, rng.choice(snippets))
+        assert document.result == parse_tagscript(document.text)
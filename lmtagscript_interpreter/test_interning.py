@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Testes da internação de identificadores e chaves entre parses
+"""
+
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from incremental import IncrementalParser
+from interning import InternTable, shared_table
+from main import parse_tagscript
+from nodes import to_plain
+from tagscript_parser import parse_ast
+from values import parse_literal
+
+
+def _script(number):
+    return (f'TASK: Relatório {number}\n'
+            f'@tool:google_drive {{ "action": "search", "query": "relatório {number}" }}\n'
+            f'CALL API email_service.send WITH {{ "to": "equipe{number}@empresa.com" }}\n'
+            f'FOR EACH item IN resultados DO\n  CALL processar(item)\nEND\n')
+
+
+def test_parses_share_identifiers_and_keys():
+    """Nomes e chaves de parses diferentes viram a mesma instância; valores não"""
+    table = InternTable()
+    first = parse_ast(_script(1), interning=table)
+    second = parse_ast(_script(2), interning=table)
+    assert to_plain(second) == parse_tagscript(_script(2))
+
+    assert first['llm_references'][0].target is second['llm_references'][0].target
+    first_keys = list(first['llm_references'][0].parameters)
+    second_keys = list(second['llm_references'][0].parameters)
+    assert all(a is b for a, b in zip(first_keys, second_keys))
+    assert first['api_calls'][0].service is second['api_calls'][0].service
+    assert first['for_loops'][0].collection is second['for_loops'][0].collection
+    assert 'relatório 1' not in table
+
+    stats = table.stats()
+    assert stats['unique'] == len(table) < stats['total']
+    assert stats['hits'] > 0 and stats['saved_bytes'] > 0
+
+
+def test_table_is_bounded():
+    """Cheia, a tabela não cresce: textos novos passam sem ser guardados"""
+    table = InternTable(max_size=2)
+    assert parse_literal('{"alfa": 1, "beta": {"gama": 2}}', intern=table) == {'alfa': 1, 'beta': {'gama': 2}}
+    assert len(table) == 2 and table.full and 'gama' not in table
+    key = ''.join(['al', 'fa'])
+    assert table(key) is not key and table(key) == 'alfa'
+    table.clear()
+    assert table.stats()['total'] == 0 and not table.full
+
+
+def test_shared_table_and_incremental_documents():
+    """shared_table() é única no processo e serve a vários documentos abertos"""
+    assert shared_table() is shared_table()
+    table = InternTable()
+    documents = [IncrementalParser(_script(number), interning=table) for number in range(3)]
+    documents[0].apply_edit(0, 0, 0, 0, 'GOAL: Enviar\n')
+    targets = [document.result['llm_references'][0]['tool'] for document in documents]
+    assert all(target is targets[0] for target in targets)
+    assert documents[0].result == parse_tagscript('GOAL: Enviar\n' + _script(0))
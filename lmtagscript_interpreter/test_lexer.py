@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Testes do lexer e do despacho por tokens do parser
+"""
+
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import lexer
+from lexer import classify_line, tokenize
+from main import parse_tagscript
+
+
+def test_classify_keywords():
+    """Cada palavra-chave de início de linha vira um token tipado"""
+    cases = {
+        'TASK: Processar dados': (lexer.TASK, 'Processar dados'),
+        'DEFINE FUNCTION processar(ctx)': (lexer.DEFINE_FUNCTION, 'processar(ctx)'),
+        'CALL API svc.send WITH { a: 1 }': (lexer.CALL_API, 'svc.send WITH { a: 1 }'),
+        'CALL processar(pedido)': (lexer.CALL, 'processar(pedido)'),
+        'IF x = 1 THEN': (lexer.IF, 'x = 1 THEN'),
+        '@tool:google_drive {': (lexer.REFERENCE, 'tool:google_drive {'),
+        'FOR EACH item IN itens DO': (lexer.FOR_EACH, 'item IN itens DO'),
+        'ON ERROR': (lexer.ON_ERROR, ''),
+        'chave: valor': (lexer.TEXT, 'chave: valor'),
+    }
+    for line, (token_type, value) in cases.items():
+        token = classify_line(line, 1)
+        assert token.type == token_type, line
+        assert token.value == value, line
+
+
+def test_keywords_require_word_boundary():
+    """Identificadores que apenas começam com uma palavra-chave são texto"""
+    assert classify_line('CALLBACK: x', 1).type == lexer.TEXT
+    assert classify_line('ENDPOINT: /api', 1).type == lexer.TEXT
+    assert classify_line('IFRAME: sim', 1).type == lexer.TEXT
+
+
+def test_tokenize_line_and_column():
+    """Linhas vazias e comentários são ignorados; linha e coluna são 1-based"""
+    tokens = list(tokenize(['TASK: a', '', '# comentário', '    END']))
+    assert [(t.type, t.line, t.column) for t in tokens] == [
+        (lexer.TASK, 1, 1),
+        (lexer.END, 4, 5),
+    ]
+
+
+def test_call_api_reaches_api_handler():
+    """CALL API não é mais capturado como chamada da função 'API'"""
+    result = parse_tagscript('CALL API welcome_service.send WITH { name: "Alex" }\nCALL processar(pedido)')
+    assert result['api_calls'][0]['service'] == 'welcome_service'
+    assert result['api_calls'][0]['endpoint'] == 'send'
+    assert [call['function'] for call in result['calls']] == ['processar']
+
+
+def test_call_api_payload_after_inline_reference():
+    """O payload é o bloco após WITH, e não os parâmetros da referência @ inline"""
+    result = parse_tagscript('CALL API @tool:openai.chat { model: "x" } WITH {\n  prompt: "y"\n}\nGOAL: fim')
+    api_call = result['api_calls'][0]
+    assert api_call['reference']['parameters'] == {'model': 'x'}
+    assert api_call['payload'] == {'prompt': 'y'}
+    assert result['goal'] == ['fim']
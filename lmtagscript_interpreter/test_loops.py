@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Testes dos laços FOR EACH: corpo, execução em lotes e LOOPGUARD
+"""
+
+import sys
+import os
+
+import pytest
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import parse_tagscript
+from loops import LoopGuard, LoopGuardError, bind, resolve_collection
+from runtime import FakeRegistry, HandlerRegistry, WorkflowError, collect_steps, run_workflow
+
+SCRIPT = '\n'.join([
+    '@db:crm { tabela: "leads" }',
+    'FOR EACH lead IN crm.leads DO',
+    '  TASK: Qualificar lead',
+    '  @tool:lead_scorer { lead_id: lead.id, criterios: ["budget"] }',
+    '  CALL API crm.atualizar WITH { id: lead.id, score: lead_scorer }',
+    'END',
+    '@tool:resumo',
+])
+
+
+def test_loops_are_parsed_with_their_bodies():
+    """Cada FOR EACH vira um nó com o intervalo do corpo; o segundo não sobrescreve o primeiro"""
+    result = parse_tagscript(SCRIPT + '\nFOR EACH item IN itens\n  @tool:x')
+    assert result['for_loops'] == [
+        {'variable': 'lead', 'collection': 'crm.leads', 'line_number': 2, 'end_line': 6,
+         'body': [{'kind': 'task', 'index': 0, 'line_number': 3},
+                  {'kind': 'llm_references', 'index': 1, 'line_number': 4},
+                  {'kind': 'api_calls', 'index': 0, 'line_number': 5}]},
+        {'variable': 'item', 'collection': 'itens', 'line_number': 8, 'end_line': None,
+         'body': [{'kind': 'llm_references', 'index': 3, 'line_number': 9}]},
+    ]
+    assert result['task'] == ['Qualificar lead']
+
+    normal, _ = collect_steps(result)
+    assert [step.key for step in normal] == ['database:crm', 'for:lead', 'tool:resumo', 'for:item']
+    loop = normal[1]
+    assert [step.key for step in loop.body] == ['tool:lead_scorer', 'api:crm.atualizar']
+    assert loop.depends_on == ['database:crm@1'] and loop.body[1].depends_on == ['tool:lead_scorer@4']
+
+
+def test_loop_runs_in_batches_and_streams_item_results():
+    """O corpo roda por item, com os parâmetros ligados ao item e concorrência limitada"""
+    leads = [{'id': i} for i in range(25)]
+    registry = FakeRegistry(responses={'database:crm': {'leads': leads}}, delay=0.005)
+    streamed = []
+    run = run_workflow(parse_tagscript(SCRIPT), registry, batch_size=10, loop_workers=4,
+                       on_item=lambda step, item: streamed.append(item))
+
+    assert run.ok and run.outputs[2] == {'items': 25, 'ok': 25, 'failed': 0, 'skipped': 0}
+    assert sorted(item.index for item in streamed) == list(range(25))
+    assert registry.max_active <= 4
+    assert ('tool:lead_scorer', {'lead_id': 7, 'criterios': ['budget']}) in registry.calls
+    first = next(item for item in streamed if item.index == 0)
+    assert first.outputs[5] == {'ok': True, 'step': 'api:crm.atualizar'}
+
+    # Um item com falha não interrompe os demais, mas o laço falha no fim
+    registry = HandlerRegistry()
+    registry.register('database', lambda step, ctx: {'leads': leads[:5]})
+    registry.register('tool', lambda step, ctx: 1 / step.params['lead_id'] if step.params else 0)
+    registry.register('api', lambda step, ctx: ctx['results']['lead_scorer'])
+    with pytest.raises(WorkflowError) as error:
+        run_workflow(parse_tagscript(SCRIPT), registry, on_item=lambda step, item: streamed.append(item))
+    assert error.value.failure.step.key == 'for:lead'
+    assert [item.status for item in sorted(streamed[25:], key=lambda item: item.index)] == \
+        ['failed', 'ok', 'ok', 'ok', 'ok']
+
+
+def test_loopguard_limits_are_enforced():
+    """max_iterations, max_depth e allow_repeat valem durante a execução"""
+    guard = LoopGuard.from_params([{'max_depth': 3, 'allow_repeat': False}, {'max_depth': 1},
+                                   {'max_iterations': 3}])
+    assert guard.to_dict() == {'max_depth': 1, 'max_iterations': 3, 'allow_repeat': False}
+    assert bind({'id': 'lead.id', 'nome': 'lead', 'outro': 'x.id'}, {'lead': {'id': 1}}) == \
+        {'id': 1, 'nome': {'id': 1}, 'outro': 'x.id'}
+    assert resolve_collection('@db:crm.leads', {'results': {'crm': {'leads': [1]}}}) == [1]
+
+    source = 'LOOPGUARD { max_iterations: 3, allow_repeat: false }\nFOR EACH x IN itens DO\n  @tool:t { v: x }\nEND'
+    registry = FakeRegistry()
+    run = run_workflow(parse_tagscript(source), registry, ctx={'itens': [1, 2, 1, 2, 3]})
+    assert run.outputs[2] == {'items': 5, 'ok': 3, 'failed': 0, 'skipped': 2}
+    assert [params for _, params in registry.calls] == [{'v': 1}, {'v': 2}, {'v': 3}]
+
+    with pytest.raises(WorkflowError) as error:
+        run_workflow(parse_tagscript(source), FakeRegistry(), ctx={'itens': [1, 2, 3, 4]})
+    assert isinstance(error.value.failure.error, LoopGuardError)
+
+    nested = 'LOOPGUARD { max_depth: 1 }\nFOR EACH a IN grupos DO\n  FOR EACH b IN a DO\n    @tool:t\n  END\nEND'
+    with pytest.raises(WorkflowError) as error:
+        run_workflow(parse_tagscript(nested), FakeRegistry(), ctx={'grupos': [[1]]})
+    assert 'max_depth' in str(error.value.failure.error)
+
+
+def test_quoted_literals_are_not_bound():
+    """Só valores sem aspas referenciam a variável do laço; "lead" entre aspas fica como texto"""
+    source = 'FOR EACH lead IN leads DO\n  @tool:notificar { canal: "lead", id: lead.id, quem: lead }\nEND'
+    registry = FakeRegistry()
+    run = run_workflow(parse_tagscript(source), registry, ctx={'leads': [{'id': 1, 'nome': 'A'}]})
+
+    assert run.ok
+    assert registry.calls == [('tool:notificar', {'canal': 'lead', 'id': 1, 'quem': {'id': 1, 'nome': 'A'}})]
+
+
+def test_if_branches_are_chosen_per_item():
+    """Só o ramo escolhido roda, por item; o outro fica como 'skipped'"""
+    source = '\n'.join([
+        'FOR EACH lead IN leads DO',
+        '  IF lead.score > 5 THEN',
+        '    @tool:notificar { id: lead.id }',
+        '  ELSE',
+        '    @tool:arquivar { id: lead.id }',
+        '  END',
+        'END',
+        '@db:metas',
+        'IF metas.total >= 10 THEN',
+        '  @tool:celebrar',
+        'END',
+    ])
+    leads = [{'id': 1, 'score': 1}, {'id': 2, 'score': 9}, {'id': 3, 'score': 5}]
+    registry = FakeRegistry(responses={'database:metas': {'total': 3}})
+    normal, _ = collect_steps(parse_tagscript(source))
+    assert all(branch.batched for step in normal[0].body for branch in step.branches)
+    assert normal[2].depends_on == ['database:metas@8']
+
+    run = run_workflow(parse_tagscript(source), registry, ctx={'leads': leads})
+    assert run.ok
+    tools = sorted((call for call in registry.calls if call[0] != 'database:metas'), key=lambda call: call[1]['id'])
+    assert tools == [('tool:arquivar', {'id': 1}), ('tool:notificar', {'id': 2}), ('tool:arquivar', {'id': 3})]
+    assert [result.status for result in run.steps] == ['ok', 'ok', 'skipped']
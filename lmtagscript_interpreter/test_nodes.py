@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Testes dos nós compactos da AST
+"""
+
+import io
+import json
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import iter_parse, merge_results, parse_ast, parse_tagscript
+from nodes import ApiCall, IfBlock, LLMReference, Node, StatementRef, dump_json, to_plain
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', 'lmtagscript_boilerplate', 'examples', 'comprehensive_llm_example.tag')
+
+
+def load_example() -> str:
+    with open(EXAMPLE_PATH, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_ast_converts_to_the_parse_tagscript_shape():
+    """to_plain() e dump_json() reproduzem exatamente o formato atual"""
+    content = load_example()
+    ast = parse_ast(content)
+    expected = parse_tagscript(content)
+
+    assert to_plain(ast) == expected
+    out = io.StringIO()
+    dump_json(ast, out)
+    assert out.getvalue() == json.dumps(expected, ensure_ascii=False)
+
+
+def test_nodes_are_typed_and_slotted():
+    """Os nós não têm __dict__ e expõem os campos como atributos"""
+    ast = parse_ast('IF x > 1 THEN\n  avisar\nEND\nCALL API @tool:busca WITH { q: "a" }\n@db:vendas')
+    if_block = ast['if_blocks'][0]
+    api_call = ast['api_calls'][0]
+
+    assert isinstance(if_block, IfBlock) and not hasattr(if_block, '__dict__')
+    assert (if_block.then, if_block.line_number) == ('avisar\n', 1)
+    assert isinstance(api_call, ApiCall) and api_call.reference == LLMReference('tool', 'busca')
+    assert api_call.to_dict() == {'type': 'llm_api', 'reference': {'type': 'tool', 'tool': 'busca'},
+                                  'payload': {'q': 'a'}, 'line_number': 4}
+    assert ast['llm_references'][0].to_dict() == {'type': 'database', 'database': 'vendas', 'line_number': 5}
+
+
+def test_blocks_hold_nested_statement_trees():
+    """IF, FOR EACH e ON ERROR apontam para os statements de cada ramo, inclusive blocos aninhados"""
+    script = '\n'.join([
+        'FOR EACH lead IN leads DO',
+        '  IF lead.score >= 80 THEN',
+        '    @tool:notificar',
+        '    IF lead.vip THEN',
+        '      TASK: Ligar',
+        '    END',
+        '    mensagem prioritária',
+        '  ELSE',
+        '    CALL arquivar(lead)',
+        '  END',
+        'END',
+        'ON ERROR',
+        '  @tool:alerta',
+        'END',
+    ])
+    ast = parse_ast(script)
+    outer, inner = ast['if_blocks']
+    assert ast['for_loops'][0].body == [StatementRef('if_blocks', 0, 2)]
+    assert outer.body == [StatementRef('llm_references', 0, 3), StatementRef('if_blocks', 1, 4)]
+    assert outer.else_body == [StatementRef('calls', 0, 9)]
+    assert inner.body == [StatementRef('task', 0, 5)]
+    # O texto depois do IF interno volta para o ramo do IF externo
+    assert (outer.then, outer.else_, inner.then) == ('mensagem prioritária\n', '', '')
+    assert ast['error_handlers'][0].body == [StatementRef('llm_references', 1, 13)]
+
+    # No streaming, os índices dos corpos apontam para as listas combinadas
+    merged = merge_results(event['result'] for event in iter_parse(io.StringIO('@tool:antes\n' + script)))
+    assert merged == parse_tagscript('@tool:antes\n' + script)
+    assert merged['error_handlers'][0]['body'] == [{'kind': 'llm_references', 'index': 2, 'line_number': 14}]
+
+
+def test_default_to_dict_follows_the_slots():
+    """Sem to_dict próprio, um nó vira um campo por slot; os nós existentes batem com o padrão"""
+    class Nota(Node):
+        __slots__ = ('texto', 'ref', 'else_')
+
+        def __init__(self, texto, ref, else_):
+            self.texto = texto
+            self.ref = ref
+            self.else_ = else_
+
+    nota = Nota('oi', StatementRef('task', 0, 1), [StatementRef('goal', 1, 2)])
+    assert nota.to_dict() == {'texto': 'oi', 'ref': {'kind': 'task', 'index': 0, 'line_number': 1},
+                              'else': [{'kind': 'goal', 'index': 1, 'line_number': 2}]}
+
+    ast = parse_ast('IF x > 1 THEN\n  CALL f(x)\nELSE\n  avisar\nEND\nFOR EACH y IN x\nEND', spans=True)
+    for node in (ast['if_blocks'][0], ast['calls'][0], ast['for_loops'][0]):
+        assert Node.to_dict(node) == node.to_dict()
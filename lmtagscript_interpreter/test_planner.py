@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Testes da análise de dependências e do plano de execução
+"""
+
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import parse_tagscript
+from planner import names_in, plan_workflow
+
+SCRIPT = '\n'.join([
+    '@db:vendas { limit: 10 }',
+    '@tool:clima { cidade: "Recife" }',
+    'CALL consolidar(vendas.itens, "bruto")',
+    'IF consolidar.total > 100 THEN',
+    'END',
+    'FOR EACH regiao IN vendas.regioes DO',
+    'CALL API relatorios.gerar WITH { dados: consolidar, regiao: regiao, clima: clima }',
+    'ON ERROR',
+    '  @tool:alerta { erro: consolidar }',
+    'END',
+])
+
+
+def test_dependencies_follow_the_names_each_statement_uses():
+    """Argumentos, condições, coleções e payloads ligam os statements aos produtores"""
+    plan = plan_workflow(parse_tagscript(SCRIPT))
+    depends = {node_id: node.depends_on for node_id, node in plan.nodes.items()}
+
+    assert depends['call:consolidar@3'] == ['database:vendas@1']
+    assert depends['if@4'] == ['call:consolidar@3']
+    assert depends['for:regiao@6'] == ['database:vendas@1']
+    assert depends['api:relatorios.gerar@7'] == ['call:consolidar@3', 'for:regiao@6', 'tool:clima@2']
+    assert plan.nodes['tool:alerta@9'].on_error
+
+
+def test_stages_critical_path_and_width():
+    """Estágios em ordem topológica; o ON ERROR fica em um plano à parte"""
+    plan = plan_workflow(parse_tagscript(SCRIPT))
+
+    assert plan.stages == [['database:vendas@1', 'tool:clima@2'],
+                           ['call:consolidar@3', 'for:regiao@6'],
+                           ['if@4', 'api:relatorios.gerar@7']]
+    assert plan.error_stages == [['tool:alerta@9']]
+    assert plan.critical_path == ['database:vendas@1', 'call:consolidar@3', 'if@4']
+    assert (plan.critical_path_length, plan.max_width) == (3, 2)
+    assert names_in('a.b >= 0.8 AND status = "ok" OR @db:crm.leads') == ['a.b', 'status', 'crm.leads']
+
+
+def test_quoted_parameters_are_literals():
+    """Um texto entre aspas não liga ao statement homônimo; nome sem aspas e ${...} ligam"""
+    plan = plan_workflow(parse_tagscript('\n'.join([
+        '@db:read { limit: 1 }',
+        '@tool:acesso { permission: "read", formato: "csv" }',
+        '@tool:perfil { permission: read }',
+        '@tool:aviso { texto: "Olá ${read.nome}" }',
+    ])))
+    depends = {node_id: node.depends_on for node_id, node in plan.nodes.items()}
+
+    assert depends['tool:acesso@2'] == []
+    assert depends['tool:perfil@3'] == ['database:read@1']
+    assert depends['tool:aviso@4'] == ['database:read@1']
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Testes do profiling embutido do parser
+"""
+
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import TagScriptParser, parse_tagscript
+from profiling import ParserProfile
+
+SCRIPT = '\n'.join([
+    'TASK: Analisar',
+    '@db:vendas {',
+    '  limit: 10',
+    '}',
+    'IF total > 100 THEN',
+    '  notificar',
+    'END',
+])
+
+
+def test_disabled_profile_installs_nothing():
+    """Sem profile os handlers são os métodos originais e nada é sombreado"""
+    parser = TagScriptParser()
+    assert all(getattr(handler, '__self__', None) is parser for handler in parser._handlers.values())
+    assert '_parse_multiline_json' not in vars(parser)
+
+
+def test_profile_counts_calls_bytes_and_slowest_statements():
+    """Cada handler conta chamadas e bytes; os statements trazem linha e tipo"""
+    profile = ParserProfile(slowest=2)
+    result = parse_tagscript(SCRIPT, profile=profile)
+
+    assert result == parse_tagscript(SCRIPT)
+    reference = profile.handlers['_parse_llm_reference_multiline']
+    assert reference.calls == 1
+    assert reference.bytes == len('@db:vendas {\n  limit: 10\n}\n')
+    assert profile.handlers['_parse_condition'].calls == 1
+    assert profile.handlers['_parse_multiline_json'].calls == 1
+
+    slowest = profile.slowest
+    assert len(slowest) == 2
+    assert slowest[0]['seconds'] >= slowest[1]['seconds']
+    assert {'line', 'end_line', 'kind', 'text'} <= set(slowest[0])
+    assert set(profile.to_dict()) == {'handlers', 'slowest'}
+    assert '_parse_tag' in profile.format_table()
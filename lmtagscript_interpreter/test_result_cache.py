@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Testes do cache de resultados de passos (TTL, LRU e single-flight)
+"""
+
+import asyncio
+import sys
+import os
+
+import pytest
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseExecutor, SQLiteAdapter
+from main import parse_tagscript
+from result_cache import ResultCache, result_key
+from runtime import FakeRegistry, HandlerRegistry, Step, WorkflowError, run_workflow
+
+SCRIPT = '\n'.join([
+    '@tool:google_drive { action: "list_files", folder: "vendas" }',
+    '@tool:google_drive { folder: "vendas", action: "list_files" }',
+    '@tool:google_drive { action: "list_files", folder: "metas" }',
+    '@db:vendas { query: "SELECT 1" }',
+    '@tool:enviar { para: "ops" }',
+    '@tool:enviar { para: "ops" }',
+])
+
+
+def test_identical_calls_run_once_within_and_across_runs():
+    """Chamadas idênticas simultâneas são agrupadas; a execução seguinte vem do cache"""
+    results = ResultCache()
+    results.cacheable('tool', 'google_drive', ttl=300)
+    results.cacheable('database')
+    registry = FakeRegistry(delay=0.01)
+
+    run = run_workflow(parse_tagscript(SCRIPT), registry, cache=results)
+    assert run.ok and run.outputs[2] == run.outputs[1]
+    # enviar não é cacheável: roda as duas vezes
+    assert sorted(key for key, _ in registry.calls) == ['database:vendas', 'tool:enviar', 'tool:enviar',
+                                                        'tool:google_drive', 'tool:google_drive']
+    assert (results.misses, results.coalesced, results.hits) == (3, 1, 0)
+
+    registry.calls.clear()
+    run_workflow(parse_tagscript(SCRIPT), registry, cache=results)
+    assert [key for key, _ in registry.calls] == ['tool:enviar', 'tool:enviar']
+    assert results.stats() == {'entries': 3, 'hits': 4, 'misses': 3, 'coalesced': 1,
+                               'evictions': 0, 'expirations': 0, 'hit_rate': 0.625}
+
+
+def test_ttl_expiration_and_lru_eviction():
+    """Entradas vencem após o TTL e o LRU descarta a menos usada"""
+    now = [0.0]
+    results = ResultCache(max_entries=2, clock=lambda: now[0])
+    results.put('a', 1, ttl=10)
+    results.put('b', 2)
+    assert results.get('a') == (True, 1)
+    results.put('c', 3)
+    assert results.get('b') == (False, None) and results.evictions == 1
+
+    now[0] = 10.0
+    assert results.get('a') == (False, None) and results.expirations == 1
+    assert results.get('c') == (True, 3) and len(results) == 1
+
+
+def test_failures_are_not_cached_and_keys_are_canonical():
+    """Uma falha é propagada a todos que esperam e não fica no cache"""
+    assert result_key('tool', 'x', {'a': 1, 'b': [1, 2]}) == result_key('tool', 'x', {'b': [1, 2], 'a': 1})
+    assert result_key('tool', 'x', {'a': 1}) != result_key('tool', 'y', {'a': 1})
+
+    results = ResultCache()
+    results.cacheable('tool')
+    registry = FakeRegistry(failures=('tool:instavel',), delay=0.01)
+    with pytest.raises(WorkflowError):
+        run_workflow(parse_tagscript('@tool:instavel\n@tool:instavel'), registry, cache=results)
+    assert len(results) == 0 and results.coalesced == 1
+
+    step = Step('tool', 'instavel', None, 1, {})
+
+    async def compute():
+        return 'ok'
+
+    assert asyncio.run(results.call(step, compute)) == 'ok' and len(results) == 1
+
+
+def test_cancelling_the_first_caller_keeps_the_shared_call():
+    """Quem se juntou à execução recebe a saída; ela só é cancelada sem ninguém esperando"""
+    results = ResultCache()
+    results.cacheable('tool')
+    started = []
+
+    async def compute():
+        started.append(1)
+        await asyncio.sleep(0.01)
+        return 'ok'
+
+    async def scenario():
+        step = Step('tool', 'lento', None, 1, {})
+        first = asyncio.ensure_future(results.call(step, compute))
+        await asyncio.sleep(0)
+        joined = asyncio.ensure_future(results.call(step, compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await joined == 'ok'
+        assert first.cancelled()
+
+        alone = asyncio.ensure_future(results.call(Step('tool', 'sozinho', None, 2, {}), compute))
+        await asyncio.sleep(0)
+        alone.cancel()
+        await asyncio.sleep(0)
+        return results._inflight
+
+    assert asyncio.run(scenario()) == {}
+    assert len(started) == 2 and len(results) == 1 and results.coalesced == 1
+
+
+def test_writes_and_row_streams_are_not_stored(tmp_path):
+    """Inserts idênticos gravam os dois; o SELECT de uma execução não é reaproveitado na outra"""
+    results = ResultCache()
+    results.cacheable('database')
+    registry = HandlerRegistry()
+    with DatabaseExecutor({'crm': SQLiteAdapter(str(tmp_path / 'crm.db'))}) as databases:
+        databases.execute('crm', {'query': 'CREATE TABLE leads (nome TEXT)'})
+        databases.register(registry)
+        insert = '@db:crm { operation: "insert", table: "leads", values: { nome: "A" } }'
+        assert run_workflow(parse_tagscript(f'{insert}\n{insert}'), registry, cache=results).ok
+
+        query = parse_tagscript('@db:crm { query: "SELECT COUNT(*) AS n FROM leads" }')
+        for _ in range(2):
+            run = run_workflow(query, registry, cache=results)
+            assert list(run.outputs[1]) == [{'n': 2}]
+    assert (results.misses, results.coalesced, results.hits, len(results)) == (2, 0, 0, 0)
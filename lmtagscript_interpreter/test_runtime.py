@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Testes do runtime assíncrono de workflows
+"""
+
+import asyncio
+import sys
+import os
+from functools import partial
+
+import pytest
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import parse_tagscript
+from runtime import FakeRegistry, HandlerRegistry, WorkflowError, collect_steps, run_workflow
+
+SCRIPT = '\n'.join([
+    'TASK: Consolidar vendas',
+    '@db:vendas { limit: 10 }',
+    '@tool:busca { q: "sul" }',
+    '@file:"/dados/metas.csv"',
+    'CALL API relatorios.gerar WITH { formato: "pdf" }',
+    'ON ERROR',
+    '  @tool:alerta { canal: "ops" }',
+    'END',
+])
+
+
+def test_independent_steps_run_concurrently_under_the_limit():
+    """Todos os passos rodam, nunca mais que concurrency ao mesmo tempo"""
+    source = '\n'.join(f'@tool:t{i}' for i in range(9))
+    registry = FakeRegistry(delay=0.02)
+    result = run_workflow(parse_tagscript(source), registry, concurrency=3)
+
+    assert result.ok and len(result.steps) == 9
+    assert registry.max_active == 3
+    assert result.outputs[1] == {'ok': True, 'step': 'tool:t0'}
+
+
+def test_on_error_steps_only_run_after_a_failure():
+    """Sem falha o ON ERROR não roda; com falha roda e recebe o erro no ctx"""
+    normal, on_error = collect_steps(parse_tagscript(SCRIPT))
+    assert [step.key for step in normal] == ['database:vendas', 'tool:busca', 'file:/dados/metas.csv',
+                                             'api:relatorios.gerar']
+    assert [step.key for step in on_error] == ['tool:alerta']
+
+    registry = FakeRegistry()
+    assert run_workflow(parse_tagscript(SCRIPT), registry).error_steps == []
+    assert 'tool:alerta' not in [key for key, _ in registry.calls]
+
+    seen = {}
+    registry = FakeRegistry(failures=('tool:busca',), delay=0.01)
+
+    @registry.handler('tool', 'alerta')
+    async def alerta(step, ctx):
+        seen.update(ctx['error'])
+        return 'notificado'
+
+    result = run_workflow(parse_tagscript(SCRIPT), registry, concurrency=1)
+    assert not result.ok and result.failure.step.key == 'tool:busca'
+    assert [step.status for step in result.steps] == ['ok', 'failed', 'cancelled', 'cancelled']
+    assert result.outputs[7] == 'notificado'
+    assert seen['step'] == 'tool:busca' and seen['line_number'] == 3
+
+
+def test_invalid_if_condition_fails_only_its_steps():
+    """Uma condição inválida não impede a coleta dos passos: o passo do IF falha e o ON ERROR roda"""
+    source = '\n'.join([
+        '@tool:antes',
+        'IF total >>> 1 THEN',
+        '  @tool:dentro',
+        'END',
+        'ON ERROR',
+        '  @tool:alerta',
+        'END',
+    ])
+    normal, _ = collect_steps(parse_tagscript(source))
+    assert [step.key for step in normal] == ['tool:antes', 'tool:dentro']
+
+    registry = FakeRegistry()
+    result = run_workflow(parse_tagscript(source), registry, concurrency=1)
+    assert not result.ok and result.failure.step.key == 'tool:dentro'
+    assert type(result.failure.error).__name__ == 'ConditionError'
+    assert [key for key, _ in registry.calls] == ['tool:antes', 'tool:alerta']
+
+    # No corpo de um FOR EACH, cada item falha no passo do IF (o lote não é decidido de uma vez)
+    loop = 'FOR EACH x IN itens DO\n  IF x >>> 1 THEN\n    @tool:t\n  END\nEND\nON ERROR\n  @tool:alerta\nEND'
+    result = run_workflow(parse_tagscript(loop), FakeRegistry(), ctx={'itens': [1, 2]})
+    assert result.failure.step.key == 'for:x' and '2 de 2 itens falharam' in str(result.failure.error)
+    assert result.outputs[7] == {'ok': True, 'step': 'tool:alerta'}
+
+
+def test_unhandled_failure_raises_workflow_error():
+    """Sem ON ERROR (ou sem handler para o passo) a falha vira WorkflowError"""
+    registry = HandlerRegistry()
+    registry.register('database', lambda step, ctx: {'linhas': step.params['limit']})
+
+    with pytest.raises(WorkflowError) as error:
+        run_workflow(parse_tagscript('@db:vendas { limit: 3 }\n@tool:ausente'), registry)
+    assert isinstance(error.value.failure.error, LookupError)
+    assert error.value.result.outputs == {1: {'linhas': 3}}
+
+
+def test_dependent_steps_wait_for_their_producers():
+    """Um passo que usa a saída de outro só começa depois dele, mesmo via CALL"""
+    source = '@db:vendas\nCALL resumir(vendas)\nCALL API relatorios.gerar WITH { dados: resumir }\n@tool:livre'
+    order = []
+    registry = HandlerRegistry()
+
+    @registry.handler('database')
+    async def vendas(step, ctx):
+        await asyncio.sleep(0.02)
+        order.append(step.key)
+        return [1, 2]
+
+    @registry.handler('api')
+    async def relatorio(step, ctx):
+        order.append(step.key)
+        return len(ctx['results']['vendas'])
+
+    registry.register('tool', lambda step, ctx: order.append(step.key))
+
+    result = run_workflow(parse_tagscript(source), registry)
+    assert order == ['tool:livre', 'database:vendas', 'api:relatorios.gerar']
+    assert result.outputs[3] == 2
+
+
+def test_wrapped_async_handlers_are_awaited():
+    """partial, objetos com __call__ async e lambdas que devolvem corrotinas não vazam corrotinas"""
+    async def buscar(step, ctx, fonte):
+        await asyncio.sleep(0)
+        return fonte
+
+    class Cliente:
+        async def __call__(self, step, ctx):
+            return 'cliente'
+
+    registry = HandlerRegistry()
+    registry.register('tool', partial(buscar, fonte='partial'), 'a')
+    registry.register('tool', Cliente(), 'b')
+    registry.register('tool', lambda step, ctx: buscar(step, ctx, 'lambda'), 'c')
+    registry.register('tool', lambda step, ctx: 'sync', 'd')
+    result = run_workflow(parse_tagscript('@tool:a\n@tool:b\n@tool:c\n@tool:d'), registry)
+
+    assert result.ok and result.outputs == {1: 'partial', 2: 'cliente', 3: 'lambda', 4: 'sync'}
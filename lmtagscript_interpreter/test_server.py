@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Testes do servidor JSON-RPC persistente
+"""
+
+import io
+import json
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import parse_tagscript
+from server import ParseServer, handle_message
+
+VALID = 'TASK: Analisar\nACTION: Consultar\nGOAL: Relatório\n@db:vendas { limit: 10 }'
+
+
+def run_server(messages, **options):
+    reader = io.StringIO(''.join(
+        (message if isinstance(message, str) else json.dumps(message)) + '\n' for message in messages
+    ))
+    writer = io.StringIO()
+    ParseServer(**options).serve(reader, writer)
+    return [json.loads(line) for line in writer.getvalue().splitlines()]
+
+
+def test_compile_and_validate_match_typescript_shapes():
+    """compile traz {ast, json, warnings} e validate {ok, diagnostics}"""
+    compiled = handle_message({'id': 1, 'method': 'lmtagscript/compile', 'params': {'source': VALID}})
+    assert compiled['id'] == 1
+    assert compiled['result']['ast'] == parse_tagscript(VALID)
+    assert compiled['result']['json']['type'] == 'LMTagScript'
+    assert compiled['result']['warnings'] == []
+
+    validated = handle_message({'id': 2, 'method': 'lmtagscript/validate',
+                                'params': {'source': 'TASK: x\n@db:y { a: [1 }'}})
+    diagnostics = validated['result']['diagnostics']
+    assert validated['result']['ok'] is False
+    assert diagnostics[0]['code'] == 'E_SYNTAX' and diagnostics[0]['line'] == 2
+    assert {d['code'] for d in diagnostics[1:]} == {'E_ACTION', 'E_GOAL'}
+
+
+def test_errors_keep_the_request_id():
+    """Método desconhecido e JSON inválido viram respostas de erro sem derrubar o servidor"""
+    responses = run_server(['{não é json', {'id': 'a', 'method': 'desconhecido'},
+                            {'id': 'b', 'method': 'lmtagscript/validate', 'params': {'source': VALID}}],
+                           workers=1)
+    by_id = {response['id']: response for response in responses}
+    assert 'Parse error' in by_id[None]['error']['message']
+    assert by_id['a']['error']['message'] == 'Method not found'
+    assert by_id['b']['result']['ok'] is True
+
+
+def test_pipelined_requests_with_process_pool():
+    """Muitas requisições em andamento são respondidas uma vez cada, pelo id"""
+    messages = [{'id': n, 'method': 'lmtagscript/compile', 'params': {'source': f'TASK: tarefa {n}'}}
+                for n in range(40)]
+    responses = run_server(messages, workers=2, max_pending=4)
+    assert sorted(response['id'] for response in responses) == list(range(40))
+    for response in responses:
+        assert response['result']['ast']['task'] == [f"tarefa {response['id']}"]
+
+
+def test_broken_pool_is_replaced():
+    """Com um worker morto, a requisição recebe um erro, a vaga é liberada e o pool é recriado"""
+    server = ParseServer(workers=2, max_pending=1)
+    server._executor = ProcessPoolExecutor(max_workers=1)
+    assert isinstance(server._executor.submit(os._exit, 1).exception(), BrokenProcessPool)
+    reader = io.StringIO(''.join(json.dumps({'id': n, 'method': 'lmtagscript/compile',
+                                             'params': {'source': f'TASK: t{n}'}}) + '\n' for n in range(3)))
+    writer = io.StringIO()
+    try:
+        server.serve_stream(reader, writer)
+    finally:
+        server._shutdown()
+
+    responses = {response['id']: response for response in map(json.loads, writer.getvalue().splitlines())}
+    assert 'Internal error' in responses[0]['error']['message']
+    assert [responses[n]['result']['ast']['task'] for n in (1, 2)] == [['t1'], ['t2']]
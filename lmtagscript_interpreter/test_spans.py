@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Testes do modo spans do parser: trechos exatos por nó e textos lidos sob demanda
+"""
+
+import sys
+import os
+import io
+import json
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import parse_tagscript
+from nodes import dump_json, to_plain
+from planner import plan_workflow
+from spans import MIN_SPAN_LENGTH, SourceBuffer, Span, ValueSpan
+from tagscript_parser import parse_ast
+
+SCRIPT = '''TASK: Classificar leads
+  @db:crm {
+    "query": "SELECT * FROM leads",
+    "limite": 10
+  }
+IF crm.total > 0 THEN
+  CALL notificar(crm.total, "ação")
+  ELSE
+    nada a fazer
+END
+CALL API email.enviar WITH {"para": "equipe"}
+'''
+
+
+def _without_spans(value):
+    if isinstance(value, dict):
+        return {key: _without_spans(item) for key, item in value.items() if key != 'span'}
+    if isinstance(value, list):
+        return [_without_spans(item) for item in value]
+    return value
+
+
+def test_nodes_carry_exact_spans():
+    """Cada nó aponta o seu trecho: blocos {...} multilinha inteiros e IF até o END"""
+    result = parse_ast(SCRIPT, spans=True)
+    assert _without_spans(to_plain(result)) == parse_tagscript(SCRIPT)
+
+    reference = result['llm_references'][0]
+    assert reference.span.text == '@db:crm {\n    "query": "SELECT * FROM leads",\n    "limite": 10\n  }'
+    assert (reference.span.line, reference.span.column) == (2, 3)
+    if_block = result['if_blocks'][0]
+    assert if_block.span.text.startswith('IF crm.total') and if_block.span.text.endswith('END')
+    assert to_plain(result)['if_blocks'][0]['span']['end_line'] == 10
+    call = result['calls'][0]
+    assert call.span.to_dict()['end_column'] == len('  CALL notificar(crm.total, "ação")') + 1
+
+    # Sem spans=True os nós não têm o atributo preenchido nem a chave no JSON
+    assert 'span' not in to_plain(parse_ast(SCRIPT))['calls'][0]
+
+
+def test_byte_offsets_with_non_ascii_text():
+    """byte_start/byte_end contam UTF-8 e bytes é uma fatia sem cópia do conteúdo codificado"""
+    buffer = SourceBuffer('ação\nfim ç\n')
+    span = Span(buffer, 5, 10)
+    assert span.text == 'fim ç'
+    assert (span.byte_start, span.byte_end) == (7, 13)
+    assert bytes(span.bytes).decode('utf-8') == 'fim ç'
+    assert span.to_dict()['line'] == 2 and span.to_dict()['end_column'] == 6
+
+    result = parse_ast(SCRIPT, spans=True)
+    call = result['calls'][0]
+    encoded = SCRIPT.encode('utf-8')
+    assert encoded[call.span.byte_start:call.span.byte_end].decode('utf-8') == call.span.text
+
+
+def test_copied_text_is_materialised_on_access():
+    """Parâmetros e textos longos ficam como trechos; to_plain, JSON e o planner veem os valores comuns"""
+    long_task = 'x' * MIN_SPAN_LENGTH
+    result = parse_ast(SCRIPT + f'TASK: {long_task}\n', spans=True)
+    parameters = result['llm_references'][0].parameters
+    assert isinstance(parameters, ValueSpan)
+    assert parameters == {'query': 'SELECT * FROM leads', 'limite': 10}
+    assert result['task'][0] == 'Classificar leads' and isinstance(result['task'][0], str)
+    assert isinstance(result['task'][1], Span) and result['task'][1] == long_task
+
+    out = io.StringIO()
+    dump_json(result, out)
+    assert _without_spans(json.loads(out.getvalue())) == parse_tagscript(SCRIPT + f'TASK: {long_task}\n')
+    assert plan_workflow(result).to_dict() == plan_workflow(parse_ast(SCRIPT)).to_dict()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Testes do parsing em streaming (iter_parse)
+"""
+
+import io
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import iter_parse, iter_statement_chunks, merge_results, parse_tagscript
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', 'lmtagscript_boilerplate', 'examples', 'comprehensive_llm_example.tag')
+
+
+def test_stream_matches_full_parse():
+    """Os resultados parciais combinados são iguais ao parse completo"""
+    with open(EXAMPLE_PATH, 'r', encoding='utf-8') as f:
+        content = f.read()
+    events = list(iter_parse(io.StringIO(content)))
+    assert merge_results(event['result'] for event in events) == parse_tagscript(content)
+
+
+def test_statement_spans_and_kinds():
+    """Cada evento traz o tipo e as linhas (1-based) do statement"""
+    script = '\n'.join([
+        'TASK: Inicial',
+        '',
+        '@db:vendas {',
+        '  query: "SELECT 1"',
+        '}',
+        'IF x = 1 THEN',
+        '  @tool:a { b: 1 }',
+        'END',
+        'DEFINE FUNCTION processar(ctx)',
+        '  TASK: Processar',
+    ])
+    events = list(iter_parse(io.StringIO(script)))
+    assert [(e['kind'], e['line_number'], e['end_line']) for e in events] == [
+        ('tag', 1, 1),
+        ('reference', 3, 5),
+        ('if_block', 6, 8),
+        ('function', 9, 10),
+    ]
+    assert events[3]['result']['functions'][0]['line_number'] == 9
+
+
+def test_statements_are_yielded_lazily():
+    """Um statement é emitido antes de o restante da entrada ser lido"""
+    consumed = []
+
+    def lines():
+        for number in range(1000):
+            consumed.append(number)
+            yield f'CALL passo{number}()\n'
+
+    first = next(iter_parse(lines()))
+    assert first['result']['calls'][0]['function'] == 'passo0'
+    assert len(consumed) <= 2
+
+
+def test_chunks_keep_braces_inside_strings():
+    """Chaves dentro de strings não estendem nem encerram o bloco"""
+    lines = ['@tool:x {', '  a: "}",', '  b: 2', '}', 'TASK: depois']
+    chunks = [(start, chunk) for start, _, chunk in iter_statement_chunks(lines)]
+    assert chunks == [(0, lines[:4]), (4, lines[4:])]
+
+
+def test_stream_matches_full_parse_after_error_recovery():
+    """Um bloco {...} malformado que expõe um IF não separa o IF do seu END"""
+    script = '\n'.join([
+        '@tool:x { a: 1',
+        'IF x = 1 THEN',
+        '}',
+        '  passo interno',
+        'END',
+        'TASK: depois',
+    ])
+    events = list(iter_parse(io.StringIO(script)))
+    assert merge_results(event['result'] for event in events) == parse_tagscript(script)
+    assert parse_tagscript(script)['if_blocks'][0]['then'] == '}\npasso interno\n'
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Testes do formato binário pré-compilado (.tagc)
+"""
+
+import os
+import sys
+
+import pytest
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import parse_tagscript
+from tagc import CompiledFormatError, compile_file, load_compiled, load_or_compile
+
+SCRIPT = '\n'.join([
+    'TASK: Analisar',
+    '@db:vendas { limit: 10 }',
+    'DEFINE FUNCTION resumir',
+    '  TASK: Resumir dados',
+    'END',
+    'DEFINE FUNCTION publicar',
+    '  GOAL: Publicar relatório',
+    'END',
+    'ON ERROR',
+])
+
+
+def write_script(tmp_path, content=SCRIPT):
+    path = tmp_path / 'workflow.tag'
+    path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+def test_compiled_script_matches_parse_and_decodes_lazily(tmp_path):
+    """O .tagc reproduz parse_tagscript e busca funções pelo índice de nomes"""
+    output = compile_file(write_script(tmp_path))
+    assert output.endswith('workflow.tagc')
+
+    with load_compiled(output) as compiled:
+        assert compiled.to_dict() == parse_tagscript(SCRIPT)
+        assert compiled.keys() == list(parse_tagscript(SCRIPT))
+        assert compiled.sizes()['functions'] == 2
+        assert compiled['functions'].names() == ['resumir', 'publicar']
+        assert compiled.function('publicar')['goal'] == 'Publicar relatório'
+        assert compiled.function('inexistente') is None
+        assert compiled['functions'][-1] == compiled['functions'][1]
+        assert compiled['error_handling'] is True
+        assert not compiled.is_stale(SCRIPT)
+        assert compiled.is_stale(SCRIPT + '\nGOAL: Novo')
+
+
+def test_load_or_compile_rebuilds_stale_output(tmp_path):
+    """Um .tagc de outra versão do fonte é recompilado ao abrir"""
+    source = write_script(tmp_path)
+    load_or_compile(source).close()
+
+    with open(source, 'a', encoding='utf-8') as f:
+        f.write('\nGOAL: Novo')
+    with load_or_compile(source) as compiled:
+        assert compiled['goal'][-1] == 'Novo'
+
+
+def test_invalid_files_raise_compiled_format_error(tmp_path):
+    """Arquivos vazios, truncados ou de outro formato são rejeitados"""
+    for name, data in (('vazio.tagc', b''), ('curto.tagc', b'TAGC'), ('json.tagc', b'{}' * 40)):
+        path = tmp_path / name
+        path.write_bytes(data)
+        with pytest.raises(CompiledFormatError):
+            load_compiled(str(path))
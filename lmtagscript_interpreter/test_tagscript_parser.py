@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Testes da separação entre a biblioteca do parser e a CLI
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+import tagscript_parser
+
+INTERPRETER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_import_has_no_side_effects():
+    """Importar a biblioteca não configura o logging nem carrega módulos da CLI"""
+    program = (
+        "import json, logging, sys\n"
+        "import tagscript_parser\n"
+        "cli = ['argparse', 'main', 'cache', 'profiling', 'batch', 'server', 'concurrent.futures']\n"
+        "print(json.dumps({'handlers': len(logging.getLogger().handlers),\n"
+        "                  'level': logging.getLogger().level,\n"
+        "                  'loaded': [name for name in cli if name in sys.modules]}))\n"
+    )
+    completed = subprocess.run([sys.executable, '-c', program], capture_output=True, text=True,
+                               cwd=INTERPRETER_DIR, check=True)
+    assert json.loads(completed.stdout) == {'handlers': 0, 'level': 30, 'loaded': []}
+
+
+def test_main_reexports_the_library():
+    """`from main import ...` continua devolvendo os objetos da biblioteca"""
+    for name in ('TagScriptParser', 'parse_tagscript', 'parse_ast', 'iter_parse', 'merge_results'):
+        assert getattr(main, name) is getattr(tagscript_parser, name)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Testes da validação sem montagem do resultado (validate_tagscript)
+"""
+
+import sys
+import os
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import TagScriptParser, validate_tagscript
+from server import validate_source
+from values import ValueParseError, check_value, parse_value
+
+INVALID = ('TASK: Relatório\n'
+           'CALL API @tool:busca {query: [1} WITH "ok"\n'
+           '@db:vendas {\n'
+           '  "filtros": { "ano": 2024,\n'
+           '  "limite": }\n'
+           '}\n'
+           'CALL API sem_endpoint WITH {}\n'
+           '\tLOOPGUARD max_depth: 3, "aberta\n'
+           'GOAL: Enviar\n')
+
+
+def test_diagnostics_match_parser_errors():
+    """Mesmos erros, linhas e colunas que o parser completo, inclusive dentro de trechos inline"""
+    parser = TagScriptParser()
+    parser.parse(INVALID)
+    diagnostics = validate_tagscript(INVALID)
+
+    assert [(d.line, d.column, d.message) for d in diagnostics] == parser.errors
+    assert [d.code for d in diagnostics] == ['E_SYNTAX', 'E_SYNTAX', 'E_API_TARGET', 'E_SYNTAX']
+    # A coluna aponta o '}' no documento, e não no trecho {query: [1}
+    assert (diagnostics[0].line, diagnostics[0].column) == (2, 32)
+    assert (diagnostics[1].line, diagnostics[1].column) == (5, 13)
+    assert diagnostics[3].to_dict() == {'code': 'E_SYNTAX', 'message': 'string não terminada',
+                                        'line': 8, 'column': 26}
+
+    for source in ('{a: [1, {b: "x\\u0041"}], c: f(1, 2)}', '{a: [1 }', '{"x\\q": 1}'):
+        try:
+            expected = parse_value(source)[1]
+        except ValueParseError as e:
+            expected = (e.message, e.position)
+        try:
+            assert check_value(source) == expected
+        except ValueParseError as e:
+            assert (e.message, e.position) == expected
+
+
+def test_payload_after_inline_reference_is_checked():
+    """O bloco validado em CALL API é o payload após WITH, e não os parâmetros da referência"""
+    source = 'CALL API @tool:openai.chat { model: "x" } WITH {\n  prompt: [1 }\n'
+    parser = TagScriptParser()
+    parser.parse(source)
+    diagnostics = validate_tagscript(source)
+    assert [(d.line, d.column, d.message) for d in diagnostics] == parser.errors
+    assert [(d.code, d.line, d.column) for d in diagnostics] == [('E_SYNTAX', 2, 14)]
+
+
+def test_fail_fast_and_required_tags():
+    """fail_fast para no primeiro diagnóstico; require_tags aponta TAGs ausentes sem posição"""
+    assert len(validate_tagscript(INVALID, fail_fast=True)) == 1
+
+    diagnostics = validate_tagscript('ACTION: Consultar\n@db:vendas { limit: 10 }', require_tags=True)
+    assert [(d.code, d.message, d.line) for d in diagnostics] == [('E_TASK', 'Missing TASK', None),
+                                                                 ('E_GOAL', 'Missing GOAL', None)]
+    assert validate_tagscript('', fail_fast=True, require_tags=True)[0].code == 'E_TASK'
+
+
+def test_valid_examples_and_server_shape():
+    """Os exemplos do repositório validam sem diagnósticos; o servidor mantém o formato"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in ('input.tag', 'exemplo_teste.tag', 'teste_loopguard.tag'):
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            assert validate_tagscript(f.read()) == []
+
+    result = validate_source(INVALID)
+    assert result['ok'] is False
+    assert result['diagnostics'][0] == {'message': "esperado ',' ou ']' no array", 'line': 2, 'col': 32,
+                                        'code': 'E_SYNTAX', 'severity': 'error'}
+    assert result['diagnostics'][-1] == {'message': 'Missing ACTION', 'code': 'E_ACTION', 'severity': 'error'}
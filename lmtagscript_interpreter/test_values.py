@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Testes da sublinguagem de valores
+"""
+
+import sys
+import os
+
+import pytest
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from values import ValueParseError, check_value, parse_literal, parse_value
+from main import parse_tagscript
+
+
+def test_multiline_reference_with_braces_in_string():
+    """Um @db com chaves dentro da query consome exatamente o seu bloco"""
+    script = '\n'.join([
+        '  @db:vendas {',
+        '    query: "SELECT \'}\' AS x",',
+        '    limit: 10',
+        '  }',
+        'TASK: depois',
+    ])
+    result = parse_tagscript(script)
+    reference = result['llm_references'][0]
+    assert reference['database'] == 'vendas'
+    assert reference['parameters']['limit'] == 10
+    assert result['task'] == ['depois']
+
+
+def test_parse_literal_native_values():
+    """Objetos, arrays, strings, números, booleanos e null viram valores nativos"""
+    value = parse_literal('{ a: [1, -2.5, 3e2], "b": "x, y", c: true, d: false, e: null, f: {} }')
+    assert value == {'a': [1, -2.5, 300.0], 'b': 'x, y', 'c': True, 'd': False, 'e': None, 'f': {}}
+
+
+def test_parse_literal_keeps_expressions_as_text():
+    """Identificadores, chamadas, expressões e referências @ são preservados"""
+    value = parse_literal('{ f: calc(a, b), g: "Relatório - " + mes, h: @db:vendas, i: lead.id }')
+    assert value == {'f': 'calc(a, b)', 'g': '"Relatório - " + mes', 'h': '@db:vendas', 'i': 'lead.id'}
+
+
+def test_parse_value_returns_end_position():
+    """parse_value trabalha por offset e retorna onde o valor termina"""
+    source = 'LOOPGUARD { max_depth: 3 } # fim'
+    value, end = parse_value(source, source.index('{'))
+    assert value == {'max_depth': 3}
+    assert source[end:] == ' # fim'
+
+
+def test_parse_errors_report_line_and_column():
+    """Erros de sintaxe trazem linha e coluna em vez de cair em {'raw': ...}"""
+    with pytest.raises(ValueParseError) as error:
+        parse_literal('{\n  a: 1\n  b: 2\n}')
+    assert (error.value.line, error.value.column) == (3, 3)
+
+
+def test_deep_nesting():
+    """Aninhamento profundo não depende de re-fatiar strings"""
+    text = '1'
+    for _ in range(50):
+        text = '[' + text + ', {k: "v"}]'
+    value = parse_literal(text)
+    for _ in range(50):
+        value = value[0]
+    assert value == 1
+
+
+def test_check_value_matches_parse_value_over_the_grammar():
+    """check_value e parse_value aceitam e rejeitam o mesmo, com as mesmas posições"""
+    pieces = ['{', '}', '[', ']', ',', ':', ' ', '\n', '"a"', '"b\\n"', '"\\q"', '"', 'x', 'k:', '1',
+              '2.5', '-3e2', 'true', 'null', 'f(1, 2)', '(', ')', '@db:x']
+
+    def outcome(function, source):
+        try:
+            return function(source)
+        except ValueParseError as e:
+            return e.message, e.position
+
+    # Todas as combinações de até 3 peças: cobre cada regra da gramática e os erros de cada uma
+    corpus = [a + b + c for a in pieces for b in pieces for c in [''] + pieces]
+    for source in corpus:
+        assert outcome(check_value, source) == outcome(lambda text: parse_value(text)[1], source), source
@@ -0,0 +1,306 @@
+"""
+Sublinguagem de valores do LMTagScript
+
+Parser recursivo descendente, em tempo linear, para os valores JSON-like
+usados em parâmetros de referências @, payloads de CALL API e LOOPGUARD:
+objetos, arrays, strings, números, booleanos e null. Chaves podem vir sem
+aspas e valores que não são literais (identificadores, expressões,
+referências @) são preservados como texto. Strings entre aspas viram
+QuotedString, que é um str, para que o planner não as confunda com nomes.
+
+Todas as funções trabalham sobre offsets de um único buffer de código-fonte
+e retornam o valor junto com a posição final, sem criar strings
+intermediárias.
+"""
+
+import re
+from json import JSONDecodeError
+from json.decoder import scanstring
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Próximo caractere estrutural relevante para bracket_depth
+_BLOCK_TOKEN_PATTERN = re.compile(r'["{}\[\]]')
+# Corpo de uma string (após a aspa de abertura) até a aspa de fechamento
+_STRING_BODY_PATTERN = re.compile(r'(?:[^"\\\n]|\\.)*"')
+_WHITESPACE_PATTERN = re.compile(r'\s*')
+_INLINE_WHITESPACE_PATTERN = re.compile(r'[ \t]*')
+_BARE_KEY_PATTERN = re.compile(r'[^\s:,{}\[\]"]+')
+# Chave (com ou sem aspas) seguida de ':'
+_KEY_PATTERN = re.compile(r'\s*(?:"((?:[^"\\\n]|\\.)*)"|([^\s:,{}\[\]"]+))\s*:')
+# Separadores: ',' ou fechamento, aceitando vírgula final antes do fechamento
+_OBJECT_SEPARATOR_PATTERN = re.compile(r'\s*(?:(\})|,\s*(\})?)')
+_ARRAY_SEPARATOR_PATTERN = re.compile(r'\s*(?:(\])|,\s*(\])?)')
+# Caminho rápido para escalares simples seguidos de um delimitador
+_SCALAR_PATTERN = re.compile(r'''[ \t\r\n]*(?:
+    "(?P<string>[^"\\\n]*)"
+  | (?P<float>-?\d+(?:\.\d+(?:[eE][-+]?\d+)?|[eE][-+]?\d+))
+  | (?P<int>-?\d+)
+  | (?P<true>true)
+  | (?P<false>false)
+  | (?P<null>null)
+)[ \t\r]*(?=[,}\]\n]|$)''', re.VERBOSE)
+# Trecho de um valor sem aspas que não contém delimitadores
+_BARE_CHUNK_PATTERN = re.compile(r'[^,{}\[\]()"\n]*')
+_NUMBER_PATTERN = re.compile(r'-?\d+(\.\d+)?([eE][-+]?\d+)?')
+
+_CLOSERS = {'{': '}', '[': ']'}
+_KEYWORDS = {'true': True, 'false': False, 'null': None}
+
+
+class QuotedString(str):
+    """Valor escrito entre aspas: um literal, nunca o nome de uma variável.
+
+    Igual a str em comparações, hash e serialização; num resultado que
+    passou por JSON (cache, .tagc) volta a ser um str comum.
+    """
+
+    __slots__ = ()
+
+
+_SCALAR_CONVERTERS = {
+    'string': QuotedString,
+    'float': float,
+    'int': int,
+    'true': lambda text: True,
+    'false': lambda text: False,
+    'null': lambda text: None,
+}
+
+
+class ValueParseError(ValueError):
+    """Erro de sintaxe na sublinguagem de valores, com a posição no buffer"""
+
+    def __init__(self, message: str, position: int, source: str = ''):
+        self.message = message
+        self.position = position
+        self.line = source.count('\n', 0, position) + 1
+        self.column = position - (source.rfind('\n', 0, position) + 1) + 1
+        super().__init__(self._describe())
+
+    def shift_lines(self, delta: int) -> None:
+        """Desloca a linha reportada quando o buffer é um trecho do documento"""
+        self.line += delta
+        self.args = (self._describe(),)
+
+    def _describe(self) -> str:
+        return f"{self.message} (linha {self.line}, coluna {self.column})"
+
+
+def bracket_depth(text: str, depth: int = 0) -> int:
+    """Profundidade de '{' e '[' abertos ao fim de text, partindo de depth.
+
+    Usado para decidir, linha a linha, se um bloco {...} continua aberto.
+    Conteúdo de strings é ignorado (uma string sem aspa de fechamento vai até
+    o fim do texto) e um fechamento sem abertura não deixa a profundidade
+    negativa, como no parser de valores.
+    """
+    pos = 0
+    match = _BLOCK_TOKEN_PATTERN.search(text)
+    while match is not None:
+        char = match.group()
+        pos = match.end()
+        if char == '"':
+            string_end = _STRING_BODY_PATTERN.match(text, pos)
+            if string_end is None:
+                break
+            pos = string_end.end()
+        elif char in _CLOSERS:
+            depth += 1
+        elif depth:
+            depth -= 1
+        match = _BLOCK_TOKEN_PATTERN.search(text, pos)
+    return depth
+
+
+def parse_value(source: str, pos: int = 0, intern: Optional[Callable[[str], str]] = None,
+                build: bool = True) -> Tuple[Any, int]:
+    """Parse do valor que começa em source[pos] (após espaços).
+
+    Retorna o valor Python nativo e o offset logo após o seu fim. intern,
+    se dado, é aplicado às chaves dos objetos (ver interning.py). Com
+    build=False só valida: o valor retornado é None e nenhum dict, lista ou
+    número é montado (ver check_value).
+    """
+    scalar = _SCALAR_PATTERN.match(source, pos)
+    if scalar is not None:
+        if not build:
+            return None, scalar.end()
+        kind = scalar.lastgroup
+        return _SCALAR_CONVERTERS[kind](scalar.group(kind)), scalar.end()
+
+    pos = _WHITESPACE_PATTERN.match(source, pos).end()
+    if pos >= len(source):
+        raise ValueParseError("valor esperado", pos, source)
+
+    char = source[pos]
+    if char == '{':
+        return _parse_object(source, pos, intern, build)
+    if char == '[':
+        return _parse_array(source, pos, intern, build)
+    if char == '"':
+        value, end = _parse_string(source, pos)
+        # Uma string seguida de mais conteúdo é uma expressão ("a" + b)
+        after = _INLINE_WHITESPACE_PATTERN.match(source, end).end()
+        if after >= len(source) or source[after] in ',}]\n':
+            return (QuotedString(value) if build else None), end
+    return _parse_bare(source, pos, build)
+
+
+def parse_literal(text: str, intern: Optional[Callable[[str], str]] = None) -> Any:
+    """Parse de um texto que contém exatamente um valor"""
+    value, end = parse_value(text, 0, intern)
+    end = _WHITESPACE_PATTERN.match(text, end).end()
+    if end != len(text):
+        raise ValueParseError("conteúdo inesperado após o valor", end, text)
+    return value
+
+
+def check_value(source: str, pos: int = 0) -> int:
+    """Como parse_value, mas só valida: retorna o offset final sem montar o valor.
+
+    Levanta os mesmos ValueParseError, nas mesmas posições (é o mesmo parser,
+    com build=False; ver validate_tagscript).
+    """
+    return parse_value(source, pos, build=False)[1]
+
+
+def check_literal(text: str) -> None:
+    """Como parse_literal, mas só valida"""
+    end = _WHITESPACE_PATTERN.match(text, check_value(text, 0)).end()
+    if end != len(text):
+        raise ValueParseError("conteúdo inesperado após o valor", end, text)
+
+
+def _parse_object(source: str, pos: int, intern: Optional[Callable[[str], str]] = None,
+                  build: bool = True) -> Tuple[Optional[Dict[str, Any]], int]:
+    """Parse de um objeto; source[pos] == '{'"""
+    result = {} if build else None
+    pos = _WHITESPACE_PATTERN.match(source, pos + 1).end()
+    if source.startswith('}', pos):
+        return result, pos + 1
+
+    while True:
+        key_match = _KEY_PATTERN.match(source, pos)
+        if key_match is None:
+            key, pos = _parse_key(source, pos)
+            raise ValueParseError(f"esperado ':' após a chave {key!r}", pos, source)
+        key = key_match.group(1)
+        if key is None:
+            key = key_match.group(2)
+        elif '\\' in key:
+            key = _parse_string(source, key_match.start(1) - 1)[0]
+        if not build:
+            pos = parse_value(source, key_match.end(), build=False)[1]
+        else:
+            if intern is not None:
+                key = intern(key)
+            result[key], pos = parse_value(source, key_match.end(), intern)
+
+        separator = _OBJECT_SEPARATOR_PATTERN.match(source, pos)
+        if separator is None:
+            pos = _WHITESPACE_PATTERN.match(source, pos).end()
+            raise ValueParseError("esperado ',' ou '}' no objeto", pos, source)
+        pos = separator.end()
+        if separator.lastindex:
+            return result, pos
+
+
+def _parse_array(source: str, pos: int, intern: Optional[Callable[[str], str]] = None,
+                 build: bool = True) -> Tuple[Optional[List[Any]], int]:
+    """Parse de um array; source[pos] == '['"""
+    result = [] if build else None
+    pos = _WHITESPACE_PATTERN.match(source, pos + 1).end()
+    if source.startswith(']', pos):
+        return result, pos + 1
+
+    while True:
+        # Caminho rápido inline para elementos escalares (o caso comum)
+        scalar = _SCALAR_PATTERN.match(source, pos)
+        if scalar is not None:
+            if build:
+                kind = scalar.lastgroup
+                result.append(_SCALAR_CONVERTERS[kind](scalar.group(kind)))
+            pos = scalar.end()
+        elif build:
+            value, pos = parse_value(source, pos, intern)
+            result.append(value)
+        else:
+            pos = parse_value(source, pos, build=False)[1]
+
+        separator = _ARRAY_SEPARATOR_PATTERN.match(source, pos)
+        if separator is None:
+            pos = _WHITESPACE_PATTERN.match(source, pos).end()
+            raise ValueParseError("esperado ',' ou ']' no array", pos, source)
+        pos = separator.end()
+        if separator.lastindex:
+            return result, pos
+
+
+def _parse_key(source: str, pos: int) -> Tuple[str, int]:
+    """Parse de uma chave de objeto, com ou sem aspas"""
+    if source.startswith('"', pos):
+        return _parse_string(source, pos)
+    match = _BARE_KEY_PATTERN.match(source, pos)
+    if match is None:
+        raise ValueParseError("chave de objeto esperada", pos, source)
+    return match.group(), match.end()
+
+
+def _parse_string(source: str, pos: int) -> Tuple[str, int]:
+    """Parse de uma string entre aspas duplas, com escapes no estilo JSON"""
+    match = _STRING_BODY_PATTERN.match(source, pos + 1)
+    if match is None:
+        raise ValueParseError("string não terminada", pos, source)
+    end = match.end()
+    if source.find('\\', pos + 1, end) == -1:
+        return source[pos + 1:end - 1], end
+    try:
+        return scanstring(source, pos + 1, False)[0], end
+    except JSONDecodeError as e:
+        raise ValueParseError(e.msg.lower(), e.pos, source) from None
+
+
+def _parse_bare(source: str, pos: int, build: bool = True) -> Tuple[Any, int]:
+    """Parse de um valor sem aspas: número, booleano, null ou texto livre.
+
+    O texto vai até a próxima vírgula, fechamento ou quebra de linha fora de
+    parênteses, colchetes, chaves e strings.
+    """
+    start = pos
+    depth = 0
+    length = len(source)
+    while True:
+        pos = _BARE_CHUNK_PATTERN.match(source, pos).end()
+        if pos >= length:
+            break
+        char = source[pos]
+        if char == '"':
+            string_end = _STRING_BODY_PATTERN.match(source, pos + 1)
+            if string_end is None:
+                raise ValueParseError("string não terminada", pos, source)
+            pos = string_end.end()
+        elif char in '([{':
+            depth += 1
+            pos += 1
+        elif depth == 0:
+            break
+        else:
+            if char in ')]}':
+                depth -= 1
+            pos += 1
+
+    if not build:
+        if _WHITESPACE_PATTERN.match(source, start, pos).end() == pos:
+            raise ValueParseError("valor esperado", start, source)
+        return None, pos
+    text = source[start:pos].strip()
+    if not text:
+        raise ValueParseError("valor esperado", start, source)
+    if text in _KEYWORDS:
+        return _KEYWORDS[text], pos
+    number = _NUMBER_PATTERN.fullmatch(text)
+    if number is not None:
+        if number.group(1) or number.group(2):
+            return float(text), pos
+        return int(text), pos
+    return text, pos